@@ -5,3 +5,17 @@ load_dotenv()
 
 class Config:
     TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
+
+    # Stress grid: relative spot moves, absolute implied-vol moves (0.10 = +10 vol points), days elapsed
+    STRESS_SPOT_SHOCKS = [-0.40, -0.30, -0.20, -0.10, -0.05, 0.0, 0.05, 0.10, 0.20]
+    STRESS_VOL_SHOCKS = [-0.10, 0.0, 0.10, 0.25, 0.50]
+    STRESS_TIME_SHOCKS_DAYS = [0, 1, 7]
+
+    # Historical crash replays: approximate close-to-close moves over the episode.
+    # Assets without their own entry take the BTC move.
+    STRESS_HISTORICAL_SCENARIOS = {
+        "COVID crash (12 Mar 2020)": {"spot": {"BTC": -0.37, "ETH": -0.42}, "vol": 0.80, "days": 1},
+        "China mining ban (19 May 2021)": {"spot": {"BTC": -0.14, "ETH": -0.27}, "vol": 0.50, "days": 1},
+        "LUNA collapse (8-12 May 2022)": {"spot": {"BTC": -0.15, "ETH": -0.22}, "vol": 0.30, "days": 4},
+        "FTX collapse (7-9 Nov 2022)": {"spot": {"BTC": -0.23, "ETH": -0.30}, "vol": 0.40, "days": 2},
+    }
@@ -0,0 +1,130 @@
+import os
+import sqlite3
+import numpy as np
+
+# Candles live in their own file so the positions DB stays small
+CANDLE_DB_PATH = os.path.join("db", "candles.db")
+
+# Columnar candle layout; prices["close"] is a zero-copy view of the close column
+OHLCV_DTYPE = np.dtype([
+    ("timestamp", "i8"),
+    ("open", "f8"),
+    ("high", "f8"),
+    ("low", "f8"),
+    ("close", "f8"),
+    ("volume", "f8"),
+])
+
+
+def get_candle_connection():
+    """Returns a connection object to the candle store."""
+    return sqlite3.connect(CANDLE_DB_PATH)
+
+
+def create_candle_tables():
+    """Create the candles and candle_coverage tables if they don't exist."""
+    conn = get_candle_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS candles (
+            exchange TEXT NOT NULL,
+            symbol TEXT NOT NULL,
+            timeframe TEXT NOT NULL,
+            timestamp INTEGER NOT NULL,
+            open REAL NOT NULL,
+            high REAL NOT NULL,
+            low REAL NOT NULL,
+            close REAL NOT NULL,
+            volume REAL NOT NULL,
+            PRIMARY KEY (exchange, symbol, timeframe, timestamp)
+        ) WITHOUT ROWID
+    """)
+    # Earliest timestamp already requested from the exchange, so short listings are not re-backfilled
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS candle_coverage (
+            exchange TEXT NOT NULL,
+            symbol TEXT NOT NULL,
+            timeframe TEXT NOT NULL,
+            backfilled_from INTEGER NOT NULL,
+            PRIMARY KEY (exchange, symbol, timeframe)
+        )
+    """)
+    conn.commit()
+    conn.close()
+
+
+def save_candles(exchange: str, symbol: str, timeframe: str, rows: list):
+    """Insert or refresh OHLCV rows ([timestamp, open, high, low, close, volume])."""
+    if not rows:
+        return
+    conn = get_candle_connection()
+    cur = conn.cursor()
+    cur.executemany(
+        "INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [(exchange, symbol, timeframe, int(r[0]), r[1], r[2], r[3], r[4], r[5] or 0.0) for r in rows]
+    )
+    conn.commit()
+    conn.close()
+
+
+def load_candles(exchange: str, symbol: str, timeframe: str, since: int = None, until: int = None, limit: int = None) -> np.ndarray:
+    """
+    Load stored candles in ascending time order as an OHLCV_DTYPE structured array.
+    `since`/`until` are inclusive/exclusive millisecond bounds; `limit` keeps the most recent rows.
+    """
+    query = """
+        SELECT timestamp, open, high, low, close, volume FROM candles
+        WHERE exchange = ? AND symbol = ? AND timeframe = ? AND timestamp >= ? AND timestamp < ?
+        ORDER BY timestamp DESC
+    """
+    params = [exchange, symbol, timeframe, since or 0, until if until is not None else 2**62]
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    conn = get_candle_connection()
+    cur = conn.cursor()
+    cur.execute(query, params)
+    rows = cur.fetchall()
+    conn.close()
+
+    rows.reverse()
+    return np.array(rows, dtype=OHLCV_DTYPE)
+
+
+def get_candle_bounds(exchange: str, symbol: str, timeframe: str):
+    """Return (first_timestamp, last_timestamp) of stored candles, or (None, None)."""
+    conn = get_candle_connection()
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT MIN(timestamp), MAX(timestamp) FROM candles WHERE exchange = ? AND symbol = ? AND timeframe = ?",
+        (exchange, symbol, timeframe)
+    )
+    row = cur.fetchone()
+    conn.close()
+    return row
+
+
+def get_backfilled_from(exchange: str, symbol: str, timeframe: str):
+    conn = get_candle_connection()
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT backfilled_from FROM candle_coverage WHERE exchange = ? AND symbol = ? AND timeframe = ?",
+        (exchange, symbol, timeframe)
+    )
+    row = cur.fetchone()
+    conn.close()
+    return row[0] if row else None
+
+
+def set_backfilled_from(exchange: str, symbol: str, timeframe: str, timestamp: int):
+    conn = get_candle_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO candle_coverage (exchange, symbol, timeframe, backfilled_from)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(exchange, symbol, timeframe) DO UPDATE SET
+            backfilled_from = MIN(backfilled_from, excluded.backfilled_from)
+    """, (exchange, symbol, timeframe, int(timestamp)))
+    conn.commit()
+    conn.close()
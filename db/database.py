@@ -1,5 +1,6 @@
 import os
 import sqlite3
+from db.candle_store import create_candle_tables
 
 # Define the DB path
 DB_PATH = os.path.join("db", "perpetuals.db")
@@ -31,9 +32,14 @@ def create_auto_hedge_table():
         CREATE TABLE IF NOT EXISTS auto_hedges (
             asset TEXT PRIMARY KEY,
             rebalance_interval INTEGER,
-            last_hedge_amount REAL DEFAULT 0
+            last_hedge_amount REAL DEFAULT 0,
+            last_hedge_time REAL
         )
     """)
+    # Databases created before last_hedge_time existed
+    cur.execute("PRAGMA table_info(auto_hedges)")
+    if "last_hedge_time" not in {row[1] for row in cur.fetchall()}:
+        cur.execute("ALTER TABLE auto_hedges ADD COLUMN last_hedge_time REAL")
     conn.commit()
     conn.close()
 
@@ -42,3 +48,4 @@ def init_db():
     os.makedirs("db", exist_ok=True)
     create_monitored_positions_table()
     create_auto_hedge_table()
+    create_candle_tables()
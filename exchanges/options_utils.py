@@ -1,18 +1,78 @@
-import datetime
-import ccxt.async_support as ccxt
+import asyncio
+import bisect
+import time
 import logging
+from exchanges.registry import get_loaded_exchange, MARKET_LOAD_WEIGHT
+from exchanges.rate_limiter import throttled
+
+
+async def get_deribit_client():
+    """Shared Deribit options client from the exchange registry."""
+    return await get_loaded_exchange("deribit", "option")
+
+
+MARKET_CACHE_TTL = 300  # seconds between full Deribit market reloads
+OPTION_EXPIRY_WINDOW_MS = 10 * 86_400_000  # nearest-option search looks at most 10 days ahead
+
+# Options index: (underlying, option_type) -> sorted expiries and, per expiry, sorted strikes/markets
+_market_cache = {"loaded_at": None, "markets": [], "index": {}}
+_market_cache_lock = asyncio.Lock()
+
+
+def _market_cache_fresh() -> bool:
+    loaded_at = _market_cache["loaded_at"]
+    return loaded_at is not None and time.monotonic() - loaded_at < MARKET_CACHE_TTL
+
+
+def _build_option_index(markets: list) -> dict:
+    grouped = {}
+    for m in markets:
+        if not m.get('option'):
+            continue
+        try:
+            key = (m['base'].upper(), m['optionType'])
+            expiry_ms = int(m['info']['expiration_timestamp'])
+            grouped.setdefault(key, {}).setdefault(expiry_ms, []).append((float(m['strike']), m))
+        except Exception as e:
+            logging.warning(f"[build_option_index] Skipping market {m.get('symbol')}: {e}")
+
+    index = {}
+    for key, by_expiry in grouped.items():
+        expiries = sorted(by_expiry)
+        chains = []
+        for expiry_ms in expiries:
+            legs = sorted(by_expiry[expiry_ms], key=lambda x: x[0])
+            chains.append(([strike for strike, _ in legs], [m for _, m in legs]))
+        index[key] = {"expiries": expiries, "chains": chains}
+    return index
+
+
+async def _get_market_cache() -> dict:
+    """Return the cached Deribit markets, reloading them at most once per MARKET_CACHE_TTL."""
+    if _market_cache_fresh():
+        return _market_cache
+
+    async with _market_cache_lock:
+        # Another caller may have refreshed while we waited for the lock
+        if _market_cache_fresh():
+            return _market_cache
+
+        deribit = await get_deribit_client()
+        # The registry already loaded markets once; only reload when refreshing a stale cache
+        reload = _market_cache["loaded_at"] is not None
+        markets = await throttled("deribit", lambda: deribit.load_markets(reload=reload), weight=MARKET_LOAD_WEIGHT)
+        markets = list(markets.values())
+        _market_cache["markets"] = markets
+        _market_cache["index"] = _build_option_index(markets)
+        _market_cache["loaded_at"] = time.monotonic()
+        return _market_cache
 
-# Initialize Deribit exchange instance
-deribit = ccxt.deribit({
-    'enableRateLimit': True,
-    'options': {'defaultType': 'option'}
-})
 
 # Fetch All Deribit Options for an Asset
 async def get_deribit_options(asset: str):
     try:
-        markets = await deribit.fetch_markets()
-        return [m for m in markets if m.get('option') and asset.upper() in m['symbol']]
+        cache = await _get_market_cache()
+        return [m for m in cache["markets"] if m.get('option') and asset.upper() in m['symbol']]
     except Exception as e:
         logging.error(f"[get_deribit_options] Error fetching markets: {e}")
         return []
@@ -20,96 +80,83 @@ async def get_deribit_options(asset: str):
 #  Spot Price 
 async def get_spot_price(asset: str):
     try:
-        ticker = await deribit.fetch_ticker(f"{asset}/USD")
+        deribit = await get_deribit_client()
+        ticker = await throttled("deribit", lambda: deribit.fetch_ticker(f"{asset}/USD"))
         return ticker['info']['underlying_price']
     except Exception as e:
         logging.error(f"[get_spot_price] {e}")
         return None
 
+
+async def _find_nearest_option(asset: str, option_type: str, spot_price: float, low: float, high: float):
+    """
+    Earliest unexpired option (within 10 days) whose strike lies in [low, high] * spot,
+    picking the strike closest to spot. Strike windows are located by binary search.
+    """
+    try:
+        cache = await _get_market_cache()
+    except Exception as e:
+        logging.error(f"[find_nearest_option] Error fetching markets: {e}")
+        return None
+
+    chain_index = cache["index"].get((asset.upper(), option_type))
+    if not chain_index:
+        return None
+
+    # The index lives for MARKET_CACHE_TTL, so skip expiries that have passed since it was built
+    now_ms = time.time() * 1000
+    first = bisect.bisect_right(chain_index["expiries"], now_ms)
+    last = bisect.bisect_right(chain_index["expiries"], now_ms + OPTION_EXPIRY_WINDOW_MS)
+    lower_strike, upper_strike = low * spot_price, high * spot_price
+
+    for strikes, markets in chain_index["chains"][first:last]:
+        lo = bisect.bisect_left(strikes, lower_strike)
+        hi = bisect.bisect_right(strikes, upper_strike)
+        if lo == hi:
+            continue
+        # Window sits entirely on one side of spot, so the nearest strike is at its edge
+        closest = hi - 1 if upper_strike <= spot_price else lo
+        return markets[closest]
+
+    return None
+
 # Best Protective Put Option 
 async def get_best_put_option(asset: str, spot_price: float = None):
-    options = await get_deribit_options(asset)
     if not spot_price:
         spot_price = await get_spot_price(asset)
     if not spot_price:
         raise ValueError("Failed to fetch spot price.")
 
-    now = datetime.datetime.utcnow()
-    cutoff = now + datetime.timedelta(days=10)
-    puts = []
-
-    for opt in options:
-        if opt['optionType'] != 'put':
-            continue
-        try:
-            expiry_ts = int(opt['info']['expiration_timestamp']) / 1000
-            expiry = datetime.datetime.utcfromtimestamp(expiry_ts)
-            strike = float(opt['strike'])
-
-            if expiry > cutoff:
-                continue
-
-            if 0.85 * spot_price <= strike <= 0.99 * spot_price:
-                puts.append((expiry, abs(strike - spot_price), opt))
-        except Exception as e:
-            logging.warning(f"[put_option_loop] Skipping option due to error: {e}")
-
-    if not puts:
+    best_put = await _find_nearest_option(asset, 'put', spot_price, 0.85, 0.99)
+    if best_put is None:
         raise ValueError("No suitable put options found.")
-    
-    _, _, best_put = sorted(puts, key=lambda x: (x[0], x[1]))[0]
     return best_put
 
 # Best Covered Call Option 
 async def get_best_call_option(asset: str, spot_price: float = None):
-    options = await get_deribit_options(asset)
     if not spot_price:
         spot_price = await get_spot_price(asset)
     if not spot_price:
         raise ValueError("Failed to fetch spot price.")
 
-    now = datetime.datetime.utcnow()
-    cutoff = now + datetime.timedelta(days=10)
-    calls = []
-
-    for opt in options:
-        if opt['optionType'] != 'call':
-            continue
-        try:
-            expiry_ts = int(opt['info']['expiration_timestamp']) / 1000
-            expiry = datetime.datetime.utcfromtimestamp(expiry_ts)
-            strike = float(opt['strike'])
-
-            if expiry > cutoff:
-                continue
-
-            if 1.01 * spot_price <= strike <= 1.15 * spot_price:
-                calls.append((expiry, abs(strike - spot_price), opt))
-        except Exception as e:
-            logging.warning(f"[call_option_loop] Skipping option due to error: {e}")
-
-    if not calls:
+    best_call = await _find_nearest_option(asset, 'call', spot_price, 1.01, 1.15)
+    if best_call is None:
         raise ValueError("No suitable call options found.")
-    
-    _, _, best_call = sorted(calls, key=lambda x: (x[0], x[1]))[0]
     return best_call
 
 # Get mid price of an Option 
 async def get_option_price(option_symbol: str) -> float:
     try:
-        ob = await deribit.fetch_order_book(option_symbol)
+        deribit = await get_deribit_client()
+        ob = await throttled("deribit", lambda: deribit.fetch_order_book(option_symbol))
         best_bid = ob['bids'][0][0] if ob['bids'] else 0
         best_ask = ob['asks'][0][0] if ob['asks'] else 0
         if best_bid and best_ask:
             return (best_bid + best_ask) / 2
 
         # Fallback: try ticker last_price
-        ticker = await deribit.fetch_ticker(option_symbol)
+        ticker = await throttled("deribit", lambda: deribit.fetch_ticker(option_symbol))
         return ticker.get("last", 0) or 0
     except Exception as e:
         logging.error(f"[get_option_price] Error fetching order book/ticker: {e}")
         return 0
-
-# Properly close Deribit connection 
-async def close_deribit():
-    await deribit.close()
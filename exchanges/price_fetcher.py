@@ -1,16 +1,17 @@
+import asyncio
+import time
 import ccxt.async_support as ccxt
 import logging
-# Initialize exchange clients
-okx = ccxt.okx()
-
-deribit = ccxt.deribit()
-bybit = ccxt.bybit({
-    'enableRateLimit': True,
-    'options': {
-        'defaultType': 'future',  # Needed to fetch perpetual contracts
-    }
-})
-
+import numpy as np
+from exchanges.registry import get_loaded_exchange
+from exchanges.rate_limiter import PRIORITY_NORMAL, PRIORITY_BULK, throttled
+from db.candle_store import (
+    save_candles,
+    load_candles,
+    get_candle_bounds,
+    get_backfilled_from,
+    set_backfilled_from
+)
 
 # Mapping of supported symbols per exchange
 EXCHANGE_SYMBOLS = {
@@ -28,19 +29,77 @@ EXCHANGE_SYMBOLS = {
     }
 }
 
-# Mapping of exchange names to objects
-EXCHANGE_OBJECTS = {
-    "okx": okx,
-    "bybit": bybit,
-    "deribit": deribit
+# Market type of the registry client used per exchange
+EXCHANGE_MARKET_TYPES = {
+    "okx": "spot",
+    "bybit": "future",
+    "deribit": "future"
 }
 
+
+def candle_symbol(asset: str, source: str) -> str:
+    """Market symbol for candle history: the mapped perp/spot symbol, else the asset's USDT spot pair."""
+    return EXCHANGE_SYMBOLS[source].get(asset, f"{asset}/USDT")
+
+
+async def get_exchange_client(source: str):
+    """Shared registry client for a supported exchange name."""
+    return await get_loaded_exchange(source, EXCHANGE_MARKET_TYPES[source])
+
+
+async def preload_exchanges():
+    """Load every venue's markets up front so the first quotes do not wait on them."""
+    sources = list(EXCHANGE_MARKET_TYPES)
+    results = await asyncio.gather(*(get_exchange_client(s) for s in sources), return_exceptions=True)
+    for source, result in zip(sources, results):
+        if isinstance(result, BaseException):
+            logging.warning(f"[preload_exchanges] {source}: {result}")
+
+# Short-lived quote cache and in-flight requests, keyed by (kind, exchange, symbol)
+QUOTE_CACHE_TTL = 1.0  # seconds
+_quote_cache = {}
+_inflight = {}
+
+
+def _finish_inflight(key, task):
+    _inflight.pop(key, None)
+    # Mark the exception as retrieved even if every waiter was cancelled
+    if not task.cancelled():
+        task.exception()
+
+
+async def _fetch_and_cache(key, fetch):
+    value = await fetch()
+    _quote_cache[key] = (time.monotonic(), value)
+    return value
+
+
+async def _single_flight(key, fetch, ttl: float = QUOTE_CACHE_TTL):
+    """
+    Serve `key` from the quote cache if fresh, otherwise share one in-flight fetch
+    between every concurrent caller. Failures are not cached.
+    """
+    cached = _quote_cache.get(key)
+    if cached and time.monotonic() - cached[0] < ttl:
+        return cached[1]
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_fetch_and_cache(key, fetch))
+        _inflight[key] = task
+        task.add_done_callback(lambda t: _finish_inflight(key, t))
+
+    # Shield so one cancelled caller does not cancel the request for everyone else
+    return await asyncio.shield(task)
+
+
 async def get_bybit_perp_orderbook(asset: str = "BTC/USDT:USDT"):
     """
     Fetch order book for a given asset from Bybit perpetual futures.
     """
     try:
-        ob = await bybit.fetch_order_book(asset)
+        bybit = await get_exchange_client("bybit")
+        ob = await throttled("bybit", lambda: bybit.fetch_order_book(asset))
         return {
             "bid": ob['bids'][0] if ob['bids'] else [0, 0],
             "ask": ob['asks'][0] if ob['asks'] else [0, 0],
@@ -49,66 +108,145 @@ async def get_bybit_perp_orderbook(asset: str = "BTC/USDT:USDT"):
         logging.error(f"[get_bybit_perp_orderbook] {e}")
         return {"bid": [0, 0], "ask": [0, 0]}
 
-async def close_bybit():
-    """
-    Properly close Bybit connection.
-    """
-    await bybit.close()
-
 #Live Price
-async def get_price(asset: str, source: str = "okx") -> float:
+async def get_price(asset: str, source: str = "okx", priority: int = PRIORITY_NORMAL) -> float:
     asset = asset.upper()
     source = source.lower()
 
-    if source not in EXCHANGE_OBJECTS:
+    if source not in EXCHANGE_SYMBOLS:
         raise ValueError(f" Exchange '{source}' not supported")
 
     if asset not in EXCHANGE_SYMBOLS[source]:
         raise ValueError(f"Asset '{asset}' not available on {source}")
 
     symbol = EXCHANGE_SYMBOLS[source][asset]
-    exchange = EXCHANGE_OBJECTS[source]
+    exchange = await get_exchange_client(source)
 
-    ticker = await exchange.fetch_ticker(symbol)
+    ticker = await _single_flight(
+        ("ticker", source, symbol),
+        lambda: throttled(source, lambda: exchange.fetch_ticker(symbol), priority=priority)
+    )
     return ticker["last"]
 
 # Orderbook 
-async def get_orderbook(asset: str, source: str = "okx", depth: int = 5) -> dict:
+async def get_orderbook(asset: str, source: str = "okx", depth: int = 5, priority: int = PRIORITY_NORMAL) -> dict:
     asset = asset.upper()
     source = source.lower()
 
-    if source not in EXCHANGE_OBJECTS:
+    if source not in EXCHANGE_SYMBOLS:
         raise ValueError(f"Exchange '{source}' not supported")
 
     if asset not in EXCHANGE_SYMBOLS[source]:
         raise ValueError(f"Asset '{asset}' not available on {source}")
 
     symbol = EXCHANGE_SYMBOLS[source][asset]
-    exchange = EXCHANGE_OBJECTS[source]
+    exchange = await get_exchange_client(source)
 
-    ob = await exchange.fetch_order_book(symbol)
+    ob = await _single_flight(
+        ("orderbook", source, symbol),
+        lambda: throttled(source, lambda: exchange.fetch_order_book(symbol), priority=priority)
+    )
     return {
         "bids": ob["bids"][:depth],
         "asks": ob["asks"][:depth]
     }
 
 # historical prices 
-async def get_historical_prices(asset: str, source: str = "okx", timeframe: str = "1h", limit: int = 100) -> list:
+OHLCV_PAGE_LIMIT = 300  # candles per exchange request while paginating
+_candle_locks = {}  # (exchange, symbol, timeframe) -> asyncio.Lock serializing store syncs
+
+
+def _timeframe_ms(timeframe: str) -> int:
+    return ccxt.Exchange.parse_timeframe(timeframe) * 1000
+
+
+async def _fetch_ohlcv_range(exchange, source: str, symbol: str, timeframe: str, since: int, until: int = None):
+    """Page through candles from `since` (inclusive) up to `until` or now, saving each page to the store."""
+    tf_ms = _timeframe_ms(timeframe)
+    cursor = since
+
+    while True:
+        page = await throttled(
+            source,
+            lambda: exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=cursor, limit=OHLCV_PAGE_LIMIT),
+            priority=PRIORITY_BULK
+        )
+        if until is not None:
+            page = [c for c in page if c[0] < until]
+        if not page:
+            break
+
+        save_candles(source, symbol, timeframe, page)
+
+        last_ts = page[-1][0]
+        if last_ts < cursor:
+            break
+        cursor = last_ts + tf_ms
+        if cursor > time.time() * 1000 or (until is not None and cursor >= until):
+            break
+
+
+async def _sync_candles(exchange, source: str, symbol: str, timeframe: str, since: int, until: int = None):
+    """Make the local store cover [since, until or now]: backfill older history once, then fetch only newer candles."""
+    async with _candle_locks.setdefault((source, symbol, timeframe), asyncio.Lock()):
+        await _sync_candles_locked(exchange, source, symbol, timeframe, since, until)
+
+
+async def _sync_candles_locked(exchange, source: str, symbol: str, timeframe: str, since: int, until: int = None):
+    first_ts, last_ts = get_candle_bounds(source, symbol, timeframe)
+    backfilled_from = get_backfilled_from(source, symbol, timeframe)
+
+    if first_ts is None or backfilled_from is None or since < backfilled_from:
+        await _fetch_ohlcv_range(exchange, source, symbol, timeframe, since, until=first_ts)
+        set_backfilled_from(source, symbol, timeframe, since)
+        first_ts, last_ts = get_candle_bounds(source, symbol, timeframe)
+
+    if last_ts is not None and (until is None or last_ts + _timeframe_ms(timeframe) < until):
+        # Re-fetch the last stored candle too, it may still have been open when saved
+        await _fetch_ohlcv_range(exchange, source, symbol, timeframe, last_ts)
+
+
+async def backfill_candles(asset: str, source: str = "okx", timeframe: str = "1h", days: int = 90):
+    """Paginated backfill of the last `days` of candles into the local store."""
+    await get_historical_prices(asset, source, timeframe=timeframe, days=days)
+
+
+async def get_historical_prices(
+    asset: str,
+    source: str = "okx",
+    timeframe: str = "1h",
+    limit: int = None,
+    days: float = None,
+    since: int = None,
+    until: int = None
+) -> np.ndarray:
+    """
+    Candles as an OHLCV_DTYPE structured array (ascending time), e.g. prices["close"].
+
+    Window, in order of precedence:
+    - since: start timestamp in ms (inclusive)
+    - days: the last N days
+    - otherwise the most recent `limit` candles (default 100)
+    `until` is an exclusive end timestamp in ms. With a since/days window, `limit` keeps the most recent rows.
+    """
     asset = asset.upper()
     source = source.lower()
 
-    if source not in EXCHANGE_OBJECTS:
+    if source not in EXCHANGE_SYMBOLS:
         raise ValueError(f" Exchange '{source}' not supported")
 
-    if asset not in EXCHANGE_SYMBOLS[source]:
-        raise ValueError(f"Asset '{asset}' not available on {source}")
+    symbol = candle_symbol(asset, source)
+    exchange = await get_exchange_client(source)
 
-    symbol = EXCHANGE_SYMBOLS[source][asset]
-    exchange = EXCHANGE_OBJECTS[source]
+    tf_ms = _timeframe_ms(timeframe)
+    end = until if until is not None else int(time.time() * 1000)
+    if since is None and days is not None:
+        since = end - int(days * 86_400_000)
+    if since is None:
+        limit = limit or 100
+        since = ((end - 1) // tf_ms - (limit - 1)) * tf_ms
 
-    return await exchange.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
+    # Only candles newer than the last stored one hit the exchange; the rest come from disk
+    await _sync_candles(exchange, source, symbol, timeframe, since, until)
 
-# cleanup 
-async def close_all_exchanges():
-    for exchange in EXCHANGE_OBJECTS.values():
-        await exchange.close()
+    return load_candles(source, symbol, timeframe, since=since, until=until, limit=limit)
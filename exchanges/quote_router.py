@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import time
+from exchanges.price_fetcher import EXCHANGE_SYMBOLS, get_exchange_client, get_orderbook
+from exchanges.rate_limiter import PRIORITY_HEDGE
+
+VENUE_TIMEOUT = 2.0  # seconds a single venue may take before it is skipped
+
+
+async def _timed_orderbook(asset: str, venue: str, depth: int, timeout: float, priority: int):
+    # Market loading sits outside the timeout: it is a one-off per venue, and cutting it short
+    # on every call would keep a slow venue cold forever
+    await get_exchange_client(venue)
+    started = time.perf_counter()
+    book = await asyncio.wait_for(get_orderbook(asset, venue, depth=depth, priority=priority), timeout)
+    return book, (time.perf_counter() - started) * 1000
+
+
+async def get_best_quote(
+    asset: str,
+    venues: list = None,
+    depth: int = 5,
+    timeout: float = VENUE_TIMEOUT,
+    priority: int = PRIORITY_HEDGE
+) -> dict:
+    """
+    Fetch order books for `asset` from every venue that lists it, in parallel, and pick the best prices.
+
+    Returns:
+    - dict: {
+        "best_ask": float, "ask_venue": str,
+        "best_bid": float, "bid_venue": str,
+        "latencies": {venue: ms or None},   # None = timed out or failed
+        "books": {venue: orderbook},
+        "errors": {venue: str}
+    }
+    Raises ValueError when no venue returns a usable book.
+    """
+    asset = asset.upper()
+    candidates = [v.lower() for v in (venues or EXCHANGE_SYMBOLS)]
+    candidates = [v for v in candidates if asset in EXCHANGE_SYMBOLS.get(v, {})]
+    if not candidates:
+        raise ValueError(f"Asset '{asset}' not available on any supported exchange")
+
+    results = await asyncio.gather(
+        *(_timed_orderbook(asset, v, depth, timeout, priority) for v in candidates),
+        return_exceptions=True
+    )
+
+    quote = {
+        "best_ask": None, "ask_venue": None,
+        "best_bid": None, "bid_venue": None,
+        "latencies": {}, "books": {}, "errors": {}
+    }
+
+    for venue, result in zip(candidates, results):
+        if isinstance(result, BaseException):
+            reason = "timeout" if isinstance(result, asyncio.TimeoutError) else str(result)
+            logging.warning(f"[get_best_quote] {asset} on {venue}: {reason}")
+            quote["latencies"][venue] = None
+            quote["errors"][venue] = reason
+            continue
+
+        book, latency_ms = result
+        quote["latencies"][venue] = latency_ms
+        quote["books"][venue] = book
+
+        if book["asks"] and (quote["best_ask"] is None or book["asks"][0][0] < quote["best_ask"]):
+            quote["best_ask"], quote["ask_venue"] = book["asks"][0][0], venue
+        if book["bids"] and (quote["best_bid"] is None or book["bids"][0][0] > quote["best_bid"]):
+            quote["best_bid"], quote["bid_venue"] = book["bids"][0][0], venue
+
+    if quote["best_ask"] is None:
+        raise ValueError(f"No venue returned an order book for {asset}")
+
+    return quote
+
+
+def format_venue_latencies(quote: dict) -> str:
+    """One-line summary such as 'okx 84ms, bybit 120ms, deribit timeout'."""
+    parts = []
+    for venue, latency_ms in quote["latencies"].items():
+        if latency_ms is not None:
+            parts.append(f"{venue} {latency_ms:.0f}ms")
+        else:
+            parts.append(f"{venue} {'timeout' if quote['errors'].get(venue) == 'timeout' else 'error'}")
+    return ", ".join(parts)
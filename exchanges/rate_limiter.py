@@ -0,0 +1,101 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+# Request priorities: lower value is served first
+PRIORITY_HEDGE = 0   # /hedge_now, auto-hedge quotes
+PRIORITY_ALERT = 1   # exposure / risk monitor checks
+PRIORITY_NORMAL = 2  # interactive commands
+PRIORITY_BULK = 3    # history backfills, /forecast_volatility pulls
+
+# Token bucket per exchange: (requests per second, burst capacity)
+RATE_LIMITS = {
+    "okx": (10.0, 20.0),
+    "bybit": (10.0, 20.0),
+    "deribit": (15.0, 30.0),
+}
+DEFAULT_RATE_LIMIT = (5.0, 10.0)
+
+# Share of the bucket bulk requests may never dip into, kept free for hedge/alert traffic
+BULK_RESERVE = 0.25
+
+
+class _TokenBucket:
+    """Priority-ordered token bucket for one exchange."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.waiters = []  # heap of (priority, seq, weight, future)
+        self.dispatcher = None
+        self._seq = itertools.count()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _needed(self, priority: int, weight: float) -> float:
+        needed = weight + (self.capacity * BULK_RESERVE if priority >= PRIORITY_BULK else 0.0)
+        return min(needed, self.capacity)
+
+    async def acquire(self, weight: float, priority: int):
+        self._refill()
+        if not self.waiters and self.tokens >= self._needed(priority, weight):
+            self.tokens -= weight
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (priority, next(self._seq), weight, future))
+
+        if self.dispatcher is None or self.dispatcher.done():
+            self.dispatcher = asyncio.ensure_future(self._dispatch())
+        elif self.waiters[0][3] is future:
+            # New head of the queue: stop sleeping on the old head's (possibly larger) token need.
+            # The cancelled dispatcher is only ever parked in asyncio.sleep, so it just exits.
+            self.dispatcher.cancel()
+            self.dispatcher = asyncio.ensure_future(self._dispatch())
+        await future
+
+    async def _dispatch(self):
+        while self.waiters:
+            priority, _, weight, future = self.waiters[0]
+            if future.done():  # caller gave up (cancelled / timed out)
+                heapq.heappop(self.waiters)
+                continue
+
+            self._refill()
+            needed = self._needed(priority, weight)
+            if self.tokens >= needed:
+                heapq.heappop(self.waiters)
+                self.tokens -= weight
+                future.set_result(None)
+                continue
+
+            # Strict priority: the head waits for tokens, nobody behind it may jump ahead
+            await asyncio.sleep((needed - self.tokens) / self.rate)
+
+
+_buckets = {}
+
+
+def _bucket(exchange: str) -> _TokenBucket:
+    bucket = _buckets.get(exchange)
+    if bucket is None:
+        bucket = _TokenBucket(*RATE_LIMITS.get(exchange, DEFAULT_RATE_LIMIT))
+        _buckets[exchange] = bucket
+    return bucket
+
+
+async def acquire(exchange: str, weight: float = 1.0, priority: int = PRIORITY_NORMAL):
+    """Wait until `exchange` has budget for a request of `weight`, honouring priority order."""
+    await _bucket(exchange.lower()).acquire(weight, priority)
+
+
+async def throttled(exchange: str, call, weight: float = 1.0, priority: int = PRIORITY_NORMAL):
+    """Run `call()` (a coroutine factory) once the exchange's rate limit allows it."""
+    await acquire(exchange, weight, priority)
+    return await call()
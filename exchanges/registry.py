@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import ccxt.async_support as ccxt
+from exchanges.rate_limiter import throttled
+
+MARKET_LOAD_WEIGHT = 5  # load_markets fans out into several REST calls
+
+# Client settings per (exchange, market type).
+# ccxt's own per-client throttle is off: exchanges.rate_limiter budgets each exchange across all clients.
+EXCHANGE_CONFIGS = {
+    ("okx", "spot"): {
+        'enableRateLimit': False,
+        'options': {'defaultType': 'spot'}
+    },
+    ("bybit", "future"): {
+        'enableRateLimit': False,
+        'options': {'defaultType': 'future'}  # Needed to fetch perpetual contracts
+    },
+    ("deribit", "future"): {
+        'enableRateLimit': False,
+        'options': {'defaultType': 'future'}
+    },
+    ("deribit", "option"): {
+        'enableRateLimit': False,
+        'options': {'defaultType': 'option'}
+    },
+}
+
+_clients = {}          # (exchange, market type) -> ccxt client
+_markets_loaded = set()
+_market_loads = {}     # (exchange, market type) -> in-flight load_markets task
+
+
+def get_exchange(name: str, market_type: str):
+    """
+    Return the shared ccxt client for (name, market_type), creating it on first use.
+    One client per key means one HTTP session and one market load for the whole process.
+    """
+    key = (name.lower(), market_type)
+    client = _clients.get(key)
+    if client is None:
+        if key not in EXCHANGE_CONFIGS:
+            raise ValueError(f"Exchange '{name}' ({market_type}) not supported")
+        client = getattr(ccxt, key[0])(EXCHANGE_CONFIGS[key])
+        _clients[key] = client
+    return client
+
+
+async def _load_markets(key, client):
+    try:
+        await throttled(key[0], client.load_markets, weight=MARKET_LOAD_WEIGHT)
+        _markets_loaded.add(key)
+    except Exception as e:
+        logging.warning(f"[registry] {key}: Market load failed ({e})")
+        raise
+    finally:
+        _market_loads.pop(key, None)
+
+
+async def get_loaded_exchange(name: str, market_type: str):
+    """
+    Shared client for (name, market_type) with its markets loaded exactly once.
+    The load runs as its own task: a caller that times out or is cancelled stops waiting for it,
+    but the load keeps going for everyone else, so a slow venue still warms up.
+    """
+    key = (name.lower(), market_type)
+    client = get_exchange(name, market_type)
+    if key in _markets_loaded:
+        return client
+
+    task = _market_loads.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_load_markets(key, client))
+        # Mark the outcome as seen: a failure is logged above even when every waiter has gone
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        _market_loads[key] = task
+    await asyncio.shield(task)
+    return client
+
+
+async def close_all_exchanges():
+    """Close every client created through the registry."""
+    for task in list(_market_loads.values()):
+        task.cancel()
+    _market_loads.clear()
+    for key, client in list(_clients.items()):
+        try:
+            await client.close()
+        except Exception as e:
+            logging.error(f"[close_all_exchanges] {key}: {e}")
+    _clients.clear()
+    _markets_loaded.clear()
@@ -6,8 +6,9 @@ from dotenv import load_dotenv
 from services.risk_monitor import monitor_auto_hedging_loop
 from db.database import init_db, create_auto_hedge_table, get_connection
 from telegram_bot.bot import start_bot, stop_bot
-from exchanges.price_fetcher import close_all_exchanges, close_bybit
-from exchanges.options_utils import close_deribit
+from exchanges.registry import close_all_exchanges
+from exchanges.price_fetcher import preload_exchanges
+from services.compute_executor import shutdown_compute_executor
 
 
 nest_asyncio.apply()
@@ -23,9 +24,8 @@ def clean_invalid_auto_hedges():
     conn.close()
 
 async def on_shutdown():
-    await close_bybit()
-    await close_deribit()
     await close_all_exchanges()
+    shutdown_compute_executor()
 
 async def main():
     load_dotenv()
@@ -37,7 +37,8 @@ async def main():
     print(f"DB location: {os.path.abspath('db/perpetuals.db')}")
     print("Starting bot...")
 
-    # Start bot and monitoring
+    # Start bot and monitoring; venue markets load in the background
+    asyncio.create_task(preload_exchanges())
     await start_bot()
     asyncio.create_task(monitor_auto_hedging_loop())
 
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import numpy as np
+from scipy.signal import lfilter
+from exchanges.price_fetcher import get_historical_prices
+from services.compute_executor import MAX_WORKERS, run_in_process
+from services.garch import fit_garch
+
+BACKTEST_JOB_TIMEOUT = 600.0  # seconds per chunk of refits
+
+
+def _fit_refit_chunk(returns: np.ndarray, refit_points: list, fit_window: int) -> list:
+    """
+    GARCH fits at consecutive walk-forward points, each on returns[t - fit_window:t].
+    Every fit is warm-started from the previous one in the chunk. Runs in the compute process pool.
+    """
+    fits = []
+    starting_values = None
+    for t in refit_points:
+        try:
+            fit = fit_garch(returns[t - fit_window:t], starting_values)
+        except Exception:
+            fit = fit_garch(returns[t - fit_window:t])
+        fits.append(fit)
+        starting_values = fit["params"]
+    return fits
+
+
+def _next_step_variance(returns: np.ndarray, refit_points: list, fits: list, end: int) -> tuple:
+    """
+    One-step-ahead conditional variance for every bar in [refit_points[0], end), using the most
+    recent refit's parameters. Each segment between refits is one linear filter pass.
+    """
+    start = refit_points[0]
+    variance = np.empty(end - start)
+    params = np.empty((end - start, 4))
+
+    bounds = list(refit_points[1:]) + [end]
+    for t0, t1, fit in zip(refit_points, bounds, fits):
+        mu, omega, alpha, beta = fit["params"]
+        first = omega + alpha * fit["last_resid"] ** 2 + beta * fit["last_variance"]
+        # sigma2[s] = omega + alpha * eps[s-1]^2 + beta * sigma2[s-1], seeded with sigma2[t0] = first
+        eps2 = (returns[t0:t1 - 1] - mu) ** 2
+        drive = np.concatenate(([first], omega + alpha * eps2))
+        variance[t0 - start:t1 - start] = lfilter([1.0], [1.0, -beta], drive)
+        params[t0 - start:t1 - start] = fit["params"]
+
+    return variance, params
+
+
+def evaluate_timing_rule(returns: np.ndarray, variance: np.ndarray, params: np.ndarray, start: int,
+                         forecast_horizon: int, threshold: float, cost_bps: float) -> dict:
+    """
+    Score predict_optimal_hedge_time's rule on non-overlapping `forecast_horizon` windows.
+
+    A window is "high vol" when realized RMS return over it exceeds `threshold` (% per bar).
+    Hedging a window costs `cost_bps`; the always-hedge baseline hedges every window.
+    """
+    n_windows = (len(variance)) // forecast_horizon
+    decision_idx = np.arange(n_windows) * forecast_horizon
+
+    # Analytic h-step forecasts for every decision point at once: (windows, horizon)
+    _, omega, alpha, beta = params[decision_idx].T
+    persistence = np.minimum(alpha + beta, 0.999999)
+    long_run = omega / (1 - persistence)
+    steps = np.arange(forecast_horizon)
+    var_path = long_run[:, None] + persistence[:, None] ** steps * (variance[decision_idx] - long_run)[:, None]
+    vol_path = np.sqrt(np.maximum(var_path, 0.0))
+
+    high_vol_hours = (vol_path > threshold).sum(axis=1)
+    signal = high_vol_hours > forecast_horizon / 2
+
+    # Realized outcome over each window
+    window_returns = returns[start:start + n_windows * forecast_horizon].reshape(n_windows, forecast_horizon)
+    realized_rms = np.sqrt((window_returns ** 2).mean(axis=1))
+    high_vol = realized_rms > threshold
+    window_pnl = window_returns.sum(axis=1)              # % move over the window (log-return sum)
+    losses = np.clip(-window_pnl, 0.0, None)
+
+    n_signals = int(signal.sum())
+    total_loss = float(losses.sum())
+
+    return {
+        "windows": int(n_windows),
+        "signals": n_signals,
+        "high_vol_windows": int(high_vol.sum()),
+        "hit_rate": float(high_vol[signal].mean()) if n_signals else None,
+        "recall": float(signal[high_vol].mean()) if high_vol.any() else None,
+        "hedge_cost_bps": n_signals * cost_bps,
+        "baseline_cost_bps": n_windows * cost_bps,
+        "loss_covered_pct": float(losses[signal].sum() / total_loss * 100) if total_loss > 0 else None,
+        "baseline_loss_covered_pct": 100.0 if total_loss > 0 else None,
+        "unhedged_loss_pct": float(losses[~signal].sum()),
+    }
+
+
+async def backtest_hedge_timing(
+    asset: str,
+    exchange: str = "okx",
+    days: int = 365,
+    fit_window: int = 500,
+    refit_stride: int = 24,
+    forecast_horizon: int = 12,
+    threshold: float = 2.5,
+    cost_bps: float = 5.0
+) -> dict:
+    """
+    Walk-forward backtest of the predict_optimal_hedge_time rule on stored hourly candles.
+
+    GARCH(1,1) is refitted every `refit_stride` bars on the trailing `fit_window` returns, with the
+    refits spread across the compute process pool. Between refits the conditional variance is
+    filtered forward with the latest parameters, so every bar gets an out-of-sample forecast.
+    """
+    candles = await get_historical_prices(asset, exchange, timeframe="1h", days=days)
+    closes = candles["close"]
+    if len(closes) < fit_window + refit_stride + forecast_horizon + 1:
+        raise ValueError(f"Not enough history for {asset}: {len(closes)} candles")
+
+    returns = np.diff(np.log(closes)) * 100  # % returns
+    end = len(returns)
+    refit_points = list(range(fit_window, end, refit_stride))
+
+    # Contiguous chunks so each worker can warm-start along its own stretch of history
+    chunks = [list(c) for c in np.array_split(refit_points, min(MAX_WORKERS, len(refit_points))) if len(c)]
+    results = await asyncio.gather(*(
+        run_in_process(_fit_refit_chunk, returns, chunk, fit_window, timeout=BACKTEST_JOB_TIMEOUT)
+        for chunk in chunks
+    ))
+    fits = [fit for chunk_fits in results for fit in chunk_fits]
+
+    variance, params = _next_step_variance(returns, refit_points, fits, end)
+    report = evaluate_timing_rule(returns, variance, params, refit_points[0], forecast_horizon, threshold, cost_bps)
+    report.update({"asset": asset.upper(), "refits": len(fits), "bars": int(end - refit_points[0])})
+
+    logging.info(f"[backtest_hedge_timing] {asset}: {report}")
+    return report
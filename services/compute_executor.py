@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+MAX_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+MAX_PENDING_JOBS = 16        # running + queued jobs; further callers wait for a slot
+DEFAULT_JOB_TIMEOUT = 60.0   # seconds, including time spent waiting for a slot
+
+_executor = None
+_slots = None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: forking a process that runs an event loop and network clients is not safe
+        _executor = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+def _reset_executor(broken: ProcessPoolExecutor):
+    """Drop a pool whose worker died so the next job gets a fresh one."""
+    global _executor
+    if _executor is broken:
+        _executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _get_slots() -> asyncio.Semaphore:
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(MAX_PENDING_JOBS)
+    return _slots
+
+
+def _release_slot(loop, slots: asyncio.Semaphore):
+    # Called from the executor's thread; the loop may already be gone at shutdown
+    if not loop.is_closed():
+        loop.call_soon_threadsafe(slots.release)
+
+
+async def _run_once(func, args, deadline: float):
+    loop = asyncio.get_running_loop()
+    slots = _get_slots()
+
+    await asyncio.wait_for(slots.acquire(), max(deadline - time.monotonic(), 0))
+
+    executor = _get_executor()
+    try:
+        job = executor.submit(func, *args)
+    except BrokenProcessPool:
+        slots.release()
+        _reset_executor(executor)
+        raise
+    except Exception:
+        slots.release()
+        raise
+    # The slot is held until the worker is really free, not just until the caller gives up
+    job.add_done_callback(lambda _: _release_slot(loop, slots))
+
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(job), max(deadline - time.monotonic(), 0))
+    except BrokenProcessPool:
+        _reset_executor(executor)
+        raise
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        if not job.cancel():
+            logging.warning(f"[run_in_process] {getattr(func, '__name__', func)} abandoned while running")
+        raise
+
+
+async def run_in_process(func, *args, timeout: float = DEFAULT_JOB_TIMEOUT):
+    """
+    Run a CPU-bound, picklable top-level `func(*args)` in the compute process pool.
+
+    The pool accepts at most MAX_PENDING_JOBS jobs at once. Raises asyncio.TimeoutError when the job
+    (queue wait included) exceeds `timeout`. On timeout or caller cancellation a queued job is dropped;
+    a job already running finishes in its worker and its result is discarded. If a worker process
+    dies, the broken pool is replaced and the job retried once.
+    """
+    deadline = time.monotonic() + timeout
+    try:
+        return await _run_once(func, args, deadline)
+    except BrokenProcessPool:
+        logging.warning(f"[run_in_process] Process pool broken during {getattr(func, '__name__', func)}, retrying on a new pool")
+        return await _run_once(func, args, deadline)
+
+
+def shutdown_compute_executor():
+    """Stop the worker processes, dropping queued jobs."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,71 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def drawdown_series(values: np.ndarray, absolute: bool = False) -> np.ndarray:
+    """
+    Drawdown from the running peak along the last axis (0 at new highs): a fraction of the peak, or
+    peak - value in the series' own units when `absolute`. Fractions need a positive running peak, so
+    curves that can reach zero or go negative (e.g. P&L of short positions) must use `absolute`.
+    """
+    values = np.asarray(values, dtype=float)
+    peak = np.maximum.accumulate(values, axis=-1)
+    if absolute:
+        return peak - values
+    if np.any(peak <= 0):
+        raise ValueError("Fractional drawdown needs a positive running peak; use absolute=True")
+    return 1 - values / peak
+
+
+def max_drawdown(values: np.ndarray, absolute: bool = False) -> np.ndarray:
+    """Maximum drawdown (fraction, or value units when `absolute`) of every series along the last axis."""
+    return drawdown_series(values, absolute).max(axis=-1)
+
+
+def drawdown_stats(values: np.ndarray, absolute: bool = False) -> dict:
+    """
+    Drawdown statistics for one or many series at once (time on the last axis, durations in bars).
+
+    Returns arrays over the leading axes:
+    - max_drawdown: deepest peak-to-trough drop (fraction, or value units when `absolute`)
+    - peak_index / trough_index: where the deepest drawdown started and bottomed
+    - recovery_time: bars from that trough back to the old peak, -1 if not yet recovered
+      (0 when there was no drawdown)
+    - longest_duration: longest stretch spent below a prior peak
+    - current_duration: bars since the last peak (0 when at a high)
+    - current_drawdown: drawdown at the last point
+    """
+    dd = drawdown_series(values, absolute)
+    n = dd.shape[-1]
+    idx = np.broadcast_to(np.arange(n), dd.shape)
+
+    at_peak = dd <= 0
+    last_peak = np.maximum.accumulate(np.where(at_peak, idx, 0), axis=-1)
+    underwater_for = idx - last_peak
+
+    trough = dd.argmax(axis=-1)
+    peak = np.take_along_axis(last_peak, trough[..., None], axis=-1)[..., 0]
+
+    recovered = at_peak & (idx > trough[..., None])
+    worst = dd.max(axis=-1)
+    recovery_time = np.where(recovered.any(axis=-1), recovered.argmax(axis=-1) - trough, -1)
+    recovery_time = np.where(worst > 0, recovery_time, 0)
+
+    return {
+        "max_drawdown": worst,
+        "peak_index": peak,
+        "trough_index": trough,
+        "recovery_time": recovery_time,
+        "longest_duration": underwater_for.max(axis=-1),
+        "current_duration": underwater_for[..., -1],
+        "current_drawdown": dd[..., -1],
+    }
+
+
+def rolling_max_drawdown(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Max drawdown inside each trailing `window`-point window, for every series along the last axis.
+    Output has window - 1 fewer points than the input.
+    """
+    windows = sliding_window_view(np.asarray(values, dtype=float), window, axis=-1)
+    return max_drawdown(windows)
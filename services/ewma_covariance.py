@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import time
+import ccxt.async_support as ccxt
+import numpy as np
+from exchanges.price_fetcher import get_historical_prices
+
+RISKMETRICS_LAMBDA = 0.94  # RiskMetrics daily decay
+EWMA_WARMUP_CANDLES = 250
+
+# (exchange, timeframe, lambda, assets) -> EwmaCovarianceStore
+_stores = {}
+_store_locks = {}
+
+
+class EwmaCovarianceStore:
+    """
+    RiskMetrics EWMA covariance of log returns, folded forward one closed candle at a time:
+    cov = lam * cov + (1 - lam) * r r'  (zero mean, per-candle units).
+    """
+
+    def __init__(self, assets, lam: float = RISKMETRICS_LAMBDA):
+        self.assets = tuple(assets)
+        self.lam = lam
+        self.cov = None
+        self.last_ts = None
+        self.last_close = None
+        self.n_obs = 0
+
+    def update(self, timestamps: np.ndarray, closes: np.ndarray):
+        """
+        Fold in candles aligned on `timestamps` (ascending); closes is (candles, assets).
+        Candles at or before the last folded timestamp are ignored.
+        """
+        timestamps = np.asarray(timestamps)
+        closes = np.asarray(closes, dtype=float).reshape(len(timestamps), len(self.assets))
+        if self.last_ts is not None:
+            new = timestamps > self.last_ts
+            timestamps, closes = timestamps[new], closes[new]
+        if not len(timestamps):
+            return
+
+        path = closes if self.last_close is None else np.vstack((self.last_close, closes))
+        returns = np.diff(np.log(path), axis=0)
+
+        if len(returns):
+            if self.cov is None:
+                self.cov = returns.T @ returns / len(returns)  # seed with the equally weighted estimate
+            # Closed form of len(returns) recursive steps
+            weights = (1 - self.lam) * self.lam ** np.arange(len(returns) - 1, -1, -1)
+            self.cov = self.lam ** len(returns) * self.cov + (returns * weights[:, None]).T @ returns
+            self.n_obs += len(returns)
+
+        self.last_ts = int(timestamps[-1])
+        self.last_close = closes[-1].copy()
+
+    def _select(self, assets):
+        if assets is None:
+            return slice(None)
+        return [self.assets.index(a.upper()) for a in assets]
+
+    def covariance(self, assets=None) -> np.ndarray:
+        if self.cov is None:
+            raise ValueError("EWMA covariance has no observations yet")
+        idx = self._select(assets)
+        return self.cov[np.ix_(idx, idx)] if assets is not None else self.cov.copy()
+
+    def volatility(self, assets=None) -> np.ndarray:
+        """Per-candle EWMA volatility (fraction, not %)."""
+        return np.sqrt(np.diag(self.covariance(assets)))
+
+    def correlation(self, assets=None) -> np.ndarray:
+        cov = self.covariance(assets)
+        vol = np.sqrt(np.diag(cov))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = cov / np.outer(vol, vol)
+        np.fill_diagonal(corr, 1.0)
+        return corr
+
+
+def _align_on_timestamps(candle_sets: list) -> tuple:
+    """Common timestamps of every candle set and the (candles, assets) close matrix on them."""
+    common = candle_sets[0]["timestamp"]
+    for candles in candle_sets[1:]:
+        common = np.intersect1d(common, candles["timestamp"])
+    closes = np.column_stack([
+        c["close"][np.searchsorted(c["timestamp"], common)] for c in candle_sets
+    ]) if len(common) else np.empty((0, len(candle_sets)))
+    return common, closes
+
+
+async def get_ewma_covariance(assets, exchange: str = "okx", timeframe: str = "1d",
+                              lam: float = RISKMETRICS_LAMBDA) -> EwmaCovarianceStore:
+    """
+    Shared EWMA covariance store for a set of assets, brought up to date with every candle
+    that has closed since the last call. The first call warms up on EWMA_WARMUP_CANDLES candles.
+    """
+    assets = tuple(sorted(a.upper() for a in assets))
+    if not assets:
+        raise ValueError("No assets for EWMA covariance")
+    key = (exchange, timeframe, lam, assets)
+
+    async with _store_locks.setdefault(key, asyncio.Lock()):
+        store = _stores.get(key) or EwmaCovarianceStore(assets, lam)
+
+        tf_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+        closed_until = int(time.time() * 1000) // tf_ms * tf_ms  # excludes the forming candle
+        if store.last_ts is None:
+            window = {"limit": EWMA_WARMUP_CANDLES + 1}
+        else:
+            window = {"since": store.last_ts + 1}
+
+        if store.last_ts is None or store.last_ts + tf_ms < closed_until:
+            candle_sets = await asyncio.gather(*(
+                get_historical_prices(asset, exchange, timeframe=timeframe, until=closed_until, **window)
+                for asset in assets
+            ))
+            timestamps, closes = _align_on_timestamps(list(candle_sets))
+            store.update(timestamps, closes)
+
+        if store.cov is None:
+            raise ValueError(f"Not enough aligned history for {', '.join(assets)}")
+
+        _stores[key] = store
+        logging.debug(f"[ewma_covariance] {assets} up to {store.last_ts} ({store.n_obs} returns)")
+        return store
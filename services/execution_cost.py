@@ -0,0 +1,110 @@
+import numpy as np
+
+HEDGE_BOOK_DEPTH = 50  # order book levels fetched for hedge cost estimates
+
+# Venues whose perpetual books quote amounts in USD rather than in the base asset
+QUOTE_SIZED_VENUES = {"deribit"}
+
+
+def book_levels(book: dict, side: str, venue: str = None) -> np.ndarray:
+    """
+    (n, 2) array of [price, base amount] for the side a hedge of `side` would take:
+    asks for "buy", bids for "sell".
+    """
+    levels = book["asks"] if side == "buy" else book["bids"]
+    levels = np.asarray([lvl[:2] for lvl in levels], dtype=float).reshape(-1, 2)
+    if venue in QUOTE_SIZED_VENUES and len(levels):
+        levels[:, 1] = levels[:, 1] / levels[:, 0]
+    return levels
+
+
+def _walk_levels(prices: np.ndarray, amounts: np.ndarray, size: float):
+    """Amount taken from each (already price-ordered) level to fill `size`."""
+    consumed_before = np.cumsum(amounts) - amounts
+    return np.clip(size - consumed_before, 0.0, amounts)
+
+
+def _fill_summary(prices, taken, size: float, side: str) -> dict:
+    filled = float(taken.sum())
+    unfilled = size - filled
+    if unfilled <= 1e-9 * max(size, 1.0):  # float residue from the cumulative sums
+        unfilled = 0.0
+    best = float(prices[0]) if len(prices) else 0.0
+
+    if filled > 0:
+        vwap = float(np.dot(prices, taken) / filled)
+    else:
+        vwap = best
+
+    # Whatever the book cannot absorb is priced at the worst level seen
+    worst = float(prices[taken > 0][-1]) if filled > 0 else best
+    cost = float(np.dot(prices, taken)) + unfilled * worst
+
+    if best > 0:
+        slippage_bps = (vwap / best - 1) * 1e4 if side == "buy" else (1 - vwap / best) * 1e4
+    else:
+        slippage_bps = 0.0
+
+    return {
+        "vwap": vwap,
+        "best_price": best,
+        "slippage_bps": slippage_bps,
+        "levels_consumed": int(np.count_nonzero(taken)),
+        "filled": filled,
+        "unfilled": unfilled,
+        "cost": cost,
+    }
+
+
+def estimate_fill(levels, size: float, side: str = "buy") -> dict:
+    """
+    Walk one order book side for an order of `size` (base units).
+
+    Parameters:
+    - levels: [[price, amount], ...] ordered best first (see book_levels)
+    - size: Order size in base units
+    - side: "buy" walks asks, "sell" walks bids (only affects the slippage sign)
+
+    Returns:
+    - dict: vwap, best_price, slippage_bps, levels_consumed, filled, unfilled, cost
+    """
+    levels = np.asarray(levels, dtype=float).reshape(-1, 2)
+    taken = _walk_levels(levels[:, 0], levels[:, 1], size)
+    return _fill_summary(levels[:, 0], taken, size, side)
+
+
+def split_across_books(books: dict, size: float, side: str = "buy") -> dict:
+    """
+    Fill `size` against the merged depth of several venues, cheapest levels first.
+
+    Parameters:
+    - books: {venue: orderbook} as returned by get_orderbook / get_best_quote()["books"]
+
+    Returns:
+    - estimate_fill's dict plus "allocation": {venue: base amount} and "venue_fills": {venue: estimate_fill dict}
+    """
+    venues, per_venue = [], []
+    for venue, book in books.items():
+        levels = book_levels(book, side, venue)
+        venues.append(venue)
+        per_venue.append(levels)
+
+    if not per_venue:
+        raise ValueError("No order books to split across")
+
+    merged = np.concatenate(per_venue)
+    owner = np.repeat(np.arange(len(venues)), [len(lvls) for lvls in per_venue])
+
+    # Best prices first: ascending asks for buys, descending bids for sells
+    order = np.argsort(merged[:, 0] if side == "buy" else -merged[:, 0], kind="stable")
+    prices, amounts, owner = merged[order, 0], merged[order, 1], owner[order]
+
+    taken = _walk_levels(prices, amounts, size)
+    result = _fill_summary(prices, taken, size, side)
+
+    allocation = np.bincount(owner, weights=taken, minlength=len(venues))
+    result["allocation"] = {v: float(a) for v, a in zip(venues, allocation) if a > 0}
+    result["venue_fills"] = {
+        v: estimate_fill(lvls, size, side) for v, lvls in zip(venues, per_venue) if len(lvls)
+    }
+    return result
@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import numpy as np
+from arch import arch_model
+from services.compute_executor import run_in_process
+
+# Refit from the cached parameters when at most this many new candles arrived; otherwise fit cold
+WARM_START_MAX_NEW_CANDLES = 24
+
+# (exchange, asset, timeframe) -> fitted GARCH(1,1) state, see fit_garch()
+_garch_cache = {}
+_garch_locks = {}  # one fit per key at a time; concurrent callers reuse its result
+
+
+def fit_garch(returns, starting_values=None) -> dict:
+    """
+    Fit a constant-mean GARCH(1,1) on percentage returns.
+
+    Returns:
+    - dict: {
+        "params": [mu, omega, alpha, beta],
+        "last_resid": float,      # last residual (in % return units)
+        "last_variance": float,   # last conditional variance
+        "n_obs": int
+    }
+    """
+    model = arch_model(np.asarray(returns, dtype=float), vol="Garch", p=1, q=1)
+    res = model.fit(disp="off", starting_values=starting_values)
+
+    return {
+        "params": np.asarray(res.params, dtype=float),
+        "last_resid": float(np.asarray(res.resid)[-1]),
+        "last_variance": float(np.asarray(res.conditional_volatility)[-1] ** 2),
+        "n_obs": len(returns),
+    }
+
+
+def garch_forecast(fit: dict, horizon: int) -> np.ndarray:
+    """
+    Analytic multi-step volatility forecast (std dev, % units) from a fitted GARCH(1,1) state.
+    Matches arch's analytic forecast for this model.
+    """
+    _, omega, alpha, beta = fit["params"]
+    variance = np.empty(horizon)
+    next_var = omega + alpha * fit["last_resid"] ** 2 + beta * fit["last_variance"]
+    for h in range(horizon):
+        variance[h] = next_var
+        next_var = omega + (alpha + beta) * next_var
+    return np.sqrt(variance)
+
+
+async def get_garch_fit(asset: str, exchange: str, timeframe: str, df) -> dict:
+    """
+    Fitted GARCH(1,1) for the candles in `df` (needs a "log_return" column and a timestamp index),
+    shared by every caller through a cache keyed by (exchange, asset, timeframe, last candle timestamp).
+
+    - Same last candle: the cached fit is returned as-is.
+    - A few new candles: refit warm-started from the cached parameters.
+    - Otherwise: fit from scratch.
+    Fits run in the compute process pool.
+    """
+    key = (exchange.lower(), asset.upper(), timeframe)
+    last_ts = df.index[-1]
+
+    async with _garch_locks.setdefault(key, asyncio.Lock()):
+        cached = _garch_cache.get(key)
+        if cached and cached["last_ts"] == last_ts:
+            return cached["fit"]
+
+        returns = (df["log_return"] * 100).to_numpy()  # % returns
+        starting_values = None
+        if cached:
+            new_candles = int((df.index > cached["last_ts"]).sum())
+            if new_candles <= WARM_START_MAX_NEW_CANDLES:
+                starting_values = cached["fit"]["params"]
+
+        try:
+            fit = await run_in_process(fit_garch, returns, starting_values)
+        except Exception as e:
+            if starting_values is None:
+                raise
+            logging.warning(f"[get_garch_fit] Warm start failed for {key}, refitting cold: {e}")
+            fit = await run_in_process(fit_garch, returns)
+
+        _garch_cache[key] = {"last_ts": last_ts, "fit": fit}
+        return fit
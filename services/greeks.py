@@ -1,6 +1,10 @@
 import math
+import numpy as np
+from scipy.special import ndtr
 from scipy.stats import norm
 
+_SQRT_2PI = math.sqrt(2 * math.pi)
+
 def calculate_greeks(option_type: str, S: float, K: float, T: float, r: float, sigma: float):
     """
     Calculate option greeks: Delta, Gamma, Vega, Theta using Black-Scholes
@@ -39,3 +43,87 @@ def calculate_greeks(option_type: str, S: float, K: float, T: float, r: float, s
         "vega": vega / 100,   # per 1% change in vol
         "theta": theta / 365  # per day
     }
+
+
+def calculate_greeks_batch(is_call, S, K, T, r, sigma):
+    """
+    Vectorized Black-Scholes Greeks for a whole option chain in one pass.
+
+    Parameters (array-like, broadcast against each other):
+    - is_call: True for calls, False for puts
+    - S: Spot prices
+    - K: Strike prices
+    - T: Times to expiration in years
+    - r: Risk-free rates (annual, decimal)
+    - sigma: Implied volatilities (decimal)
+
+    Returns:
+    - Dictionary of NumPy arrays with Delta, Gamma, Vega, Theta (same units as calculate_greeks).
+      Entries with T <= 0 or sigma <= 0 are zero, like the scalar version.
+    """
+    is_call, S, K, T, r, sigma = np.broadcast_arrays(
+        np.asarray(is_call, dtype=bool),
+        np.asarray(S, dtype=float),
+        np.asarray(K, dtype=float),
+        np.asarray(T, dtype=float),
+        np.asarray(r, dtype=float),
+        np.asarray(sigma, dtype=float),
+    )
+
+    valid = (T > 0) & (sigma > 0)
+    # Substitute harmless values for expired / zero-vol entries so nothing divides by zero
+    T_safe = np.where(valid, T, 1.0)
+    sigma_safe = np.where(valid, sigma, 1.0)
+
+    sqrt_T = np.sqrt(T_safe)
+    sig_sqrt_T = sigma_safe * sqrt_T
+    d1 = (np.log(S / K) + (r + sigma_safe**2 / 2) * T_safe) / sig_sqrt_T
+    d2 = d1 - sig_sqrt_T
+
+    pdf_d1 = np.exp(-0.5 * d1**2) / _SQRT_2PI
+    discounted_K = r * K * np.exp(-r * T_safe)
+    decay = -S * pdf_d1 * sigma_safe / (2 * sqrt_T)
+
+    delta = np.where(is_call, ndtr(d1), -ndtr(-d1))
+    theta = np.where(is_call, decay - discounted_K * ndtr(d2), decay + discounted_K * ndtr(-d2))
+    gamma = pdf_d1 / (S * sig_sqrt_T)
+    vega = S * pdf_d1 * sqrt_T
+
+    return {
+        "delta": np.where(valid, delta, 0.0),
+        "gamma": np.where(valid, gamma, 0.0),
+        "vega": np.where(valid, vega / 100, 0.0),    # per 1% change in vol
+        "theta": np.where(valid, theta / 365, 0.0)   # per day
+    }
+
+
+def calculate_option_price_batch(is_call, S, K, T, r, sigma):
+    """
+    Vectorized Black-Scholes prices. Entries with T <= 0 or sigma <= 0 are priced at intrinsic value.
+    """
+    is_call, S, K, T, r, sigma = np.broadcast_arrays(
+        np.asarray(is_call, dtype=bool),
+        np.asarray(S, dtype=float),
+        np.asarray(K, dtype=float),
+        np.asarray(T, dtype=float),
+        np.asarray(r, dtype=float),
+        np.asarray(sigma, dtype=float),
+    )
+
+    valid = (T > 0) & (sigma > 0)
+    T_safe = np.where(valid, T, 1.0)
+    sigma_safe = np.where(valid, sigma, 1.0)
+
+    sig_sqrt_T = sigma_safe * np.sqrt(T_safe)
+    d1 = (np.log(S / K) + (r + sigma_safe**2 / 2) * T_safe) / sig_sqrt_T
+    d2 = d1 - sig_sqrt_T
+    discounted_K = K * np.exp(-r * T_safe)
+
+    price = np.where(
+        is_call,
+        S * ndtr(d1) - discounted_K * ndtr(d2),
+        discounted_K * ndtr(-d2) - S * ndtr(-d1),
+    )
+    intrinsic = np.where(is_call, np.maximum(S - K, 0.0), np.maximum(K - S, 0.0))
+
+    return np.where(valid, price, intrinsic)
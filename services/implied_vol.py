@@ -0,0 +1,92 @@
+import numpy as np
+from scipy.special import ndtr
+
+from services.greeks import _SQRT_2PI
+
+# Search bracket for implied volatility (decimal)
+IV_LOWER = 1e-4
+IV_UPPER = 5.0
+
+
+def implied_volatility_batch(prices, is_call, S, K, T, r, tol: float = 1e-6, max_iter: int = 50):
+    """
+    Invert Black-Scholes for a whole option chain at once.
+
+    Uses Newton steps on vega, safeguarded by a per-option bisection bracket:
+    any step that leaves the bracket (or stalls on a tiny vega) falls back to bisection.
+    Only options that have not converged yet are iterated on.
+
+    Parameters (array-like, broadcast against each other):
+    - prices: Option prices, in the same currency as S and K
+    - is_call: True for calls, False for puts
+    - S, K, T, r: Spot, strike, years to expiry, risk-free rate
+    - tol: Relative price tolerance (also used as the bracket width at which to stop)
+    - max_iter: Iteration cap
+
+    Returns:
+    - (iv, converged): NumPy arrays. iv is NaN where the price violates
+      no-arbitrage bounds, T <= 0, or the solver did not converge.
+    """
+    prices, is_call, S, K, T, r = np.broadcast_arrays(
+        np.asarray(prices, dtype=float),
+        np.asarray(is_call, dtype=bool),
+        np.asarray(S, dtype=float),
+        np.asarray(K, dtype=float),
+        np.asarray(T, dtype=float),
+        np.asarray(r, dtype=float),
+    )
+    shape = prices.shape
+    prices, is_call, S, K, T, r = (a.ravel() for a in (prices, is_call, S, K, T, r))
+
+    iv = np.full(prices.shape, np.nan)
+    converged = np.zeros(prices.shape, dtype=bool)
+
+    # No-arbitrage bounds; anything outside has no implied vol
+    T_safe = np.where(T > 0, T, 1.0)
+    discounted_K = K * np.exp(-r * T_safe)
+    lower_bound = np.where(is_call, np.maximum(S - discounted_K, 0.0), np.maximum(discounted_K - S, 0.0))
+    upper_bound = np.where(is_call, S, discounted_K)
+    solvable = (T > 0) & (prices > lower_bound) & (prices < upper_bound)
+
+    idx = np.flatnonzero(solvable)
+    if idx.size == 0:
+        return iv.reshape(shape), converged.reshape(shape)
+
+    p, c, s, k, t, rr = prices[idx], is_call[idx], S[idx], K[idx], T[idx], r[idx]
+    lo = np.full(idx.size, IV_LOWER)
+    hi = np.full(idx.size, IV_UPPER)
+
+    # Brenner-Subrahmanyam initial guess, kept inside the bracket
+    sigma = np.clip(_SQRT_2PI * p / (s * np.sqrt(t)), lo * 2, hi / 2)
+
+    for _ in range(max_iter):
+        sqrt_t = np.sqrt(t)
+        d1 = (np.log(s / k) + (rr + sigma**2 / 2) * t) / (sigma * sqrt_t)
+        d2 = d1 - sigma * sqrt_t
+        discounted = k * np.exp(-rr * t)
+        model = np.where(c, s * ndtr(d1) - discounted * ndtr(d2), discounted * ndtr(-d2) - s * ndtr(-d1))
+        diff = model - p
+
+        done = (np.abs(diff) <= tol * p) | (hi - lo < tol)
+        if done.any():
+            iv[idx[done]] = sigma[done]
+            converged[idx[done]] = True
+            keep = ~done
+            idx, p, c, s, k, t, rr = idx[keep], p[keep], c[keep], s[keep], k[keep], t[keep], rr[keep]
+            lo, hi, sigma, diff, d1 = lo[keep], hi[keep], sigma[keep], diff[keep], d1[keep]
+            sqrt_t = sqrt_t[keep]
+            if idx.size == 0:
+                break
+
+        # Price is increasing in sigma, so the sign of diff tightens the bracket
+        too_high = diff > 0
+        hi = np.where(too_high, sigma, hi)
+        lo = np.where(too_high, lo, sigma)
+
+        vega = s * np.exp(-0.5 * d1**2) / _SQRT_2PI * sqrt_t
+        with np.errstate(divide="ignore", invalid="ignore"):
+            newton = sigma - diff / vega
+        use_newton = (vega > 1e-12) & (newton > lo) & (newton < hi)
+        sigma = np.where(use_newton, newton, (lo + hi) / 2)
+
+    return iv.reshape(shape), converged.reshape(shape)
@@ -0,0 +1,191 @@
+import logging
+import math
+import numpy as np
+from services.compute_executor import run_in_process
+from services.ewma_covariance import get_ewma_covariance
+from services.greeks import calculate_option_price_batch
+from services.portfolio_snapshot import RISK_FREE_RATE, PortfolioSnapshot, build_portfolio_snapshot
+
+DEFAULT_CONFIDENCES = (0.95, 0.99)
+DEFAULT_HORIZONS = (1, 10)  # days
+DEFAULT_PATHS = 1_000_000
+MIN_PATHS = 1_000
+MAX_PATHS = 1_000_000
+PATH_CHUNK_SIZE = 50_000
+MC_JOB_TIMEOUT = 300.0
+
+
+def covariance_factor(cov: np.ndarray) -> np.ndarray:
+    """
+    Matrix L with L @ L.T == cov. Cholesky when cov is positive definite, otherwise an
+    eigendecomposition with negative eigenvalues clipped to zero.
+    """
+    cov = np.asarray(cov, dtype=float)
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        eigvals, eigvecs = np.linalg.eigh((cov + cov.T) / 2)
+        return eigvecs * np.sqrt(np.clip(eigvals, 0.0, None))
+
+
+def _merge_tail(tail: np.ndarray, losses: np.ndarray, k: int) -> np.ndarray:
+    """Keep the k largest losses seen so far."""
+    combined = np.concatenate((tail, losses))
+    if len(combined) <= k:
+        return combined
+    return np.partition(combined, len(combined) - k)[-k:]
+
+
+def simulate_var_es(
+    spots: np.ndarray,
+    sizes: np.ndarray,
+    cov: np.ndarray,
+    option_legs: dict = None,
+    confidences=DEFAULT_CONFIDENCES,
+    horizons=DEFAULT_HORIZONS,
+    n_paths: int = DEFAULT_PATHS,
+    chunk_size: int = PATH_CHUNK_SIZE,
+    seed: int = None
+) -> dict:
+    """
+    Monte Carlo VaR and Expected Shortfall of a spot + option portfolio (runs in the compute process pool).
+
+    cov is the daily log-return covariance of the underlyings (the shared EWMA store in practice). Paths are zero-drift correlated
+    lognormal moves scaled to each horizon. option_legs holds arrays "index" (underlying of each leg),
+    "is_call", "strike", "expiry" (years), "sigma" and "size"; legs are fully repriced on every path.
+
+    Paths are generated chunk by chunk. Only the worst (1 - min confidence) share of losses is kept
+    across chunks, so memory stays flat however many paths are drawn. VaR and ES are positive USD losses.
+    """
+    if n_paths < 1:
+        raise ValueError(f"n_paths must be positive, got {n_paths}")
+
+    spots = np.asarray(spots, dtype=float)
+    sizes = np.asarray(sizes, dtype=float)
+    factor = covariance_factor(cov)
+    rng = np.random.default_rng(seed)
+
+    if option_legs:
+        leg_index = np.asarray(option_legs["index"], dtype=int)
+        leg_call = np.asarray(option_legs["is_call"], dtype=bool)
+        leg_strike = np.asarray(option_legs["strike"], dtype=float)
+        leg_expiry = np.asarray(option_legs["expiry"], dtype=float)
+        leg_sigma = np.asarray(option_legs["sigma"], dtype=float)
+        leg_size = np.asarray(option_legs["size"], dtype=float)
+        leg_value_now = calculate_option_price_batch(
+            leg_call, spots[leg_index], leg_strike, leg_expiry, RISK_FREE_RATE, leg_sigma
+        )
+
+    confidences = np.asarray(confidences, dtype=float)
+    k_by_conf = np.maximum(1, np.ceil((1 - confidences) * n_paths).astype(int))
+    k_max = int(k_by_conf.max())
+
+    var = np.zeros((len(horizons), len(confidences)))
+    es = np.zeros_like(var)
+    mean_pnl = np.zeros(len(horizons))
+    std_pnl = np.zeros(len(horizons))
+
+    for h, horizon in enumerate(horizons):
+        scale = math.sqrt(horizon)
+        tail = np.empty(0)
+        pnl_sum = 0.0
+        pnl_sq_sum = 0.0
+
+        for start in range(0, n_paths, chunk_size):
+            n = min(chunk_size, n_paths - start)
+            shocks = rng.standard_normal((n, len(spots))) @ factor.T * scale
+            shocked = spots * np.exp(shocks)
+            pnl = (shocked - spots) @ sizes
+
+            if option_legs:
+                leg_values = calculate_option_price_batch(
+                    leg_call, shocked[:, leg_index], leg_strike,
+                    np.maximum(leg_expiry - horizon / 365, 0.0), RISK_FREE_RATE, leg_sigma
+                )
+                pnl += (leg_values - leg_value_now) @ leg_size
+
+            pnl_sum += pnl.sum()
+            pnl_sq_sum += np.dot(pnl, pnl)
+            tail = _merge_tail(tail, -pnl, k_max)
+
+        tail = np.sort(tail)[::-1]
+        var[h] = tail[k_by_conf - 1]
+        es[h] = [tail[:k].mean() for k in k_by_conf]
+        mean_pnl[h] = pnl_sum / n_paths
+        std_pnl[h] = math.sqrt(max(pnl_sq_sum / n_paths - mean_pnl[h] ** 2, 0.0))
+
+    return {
+        "confidences": list(confidences),
+        "horizons": list(horizons),
+        "var": var,
+        "es": es,
+        "mean_pnl": mean_pnl,
+        "std_pnl": std_pnl,
+        "n_paths": n_paths,
+    }
+
+
+async def snapshot_inputs(snapshot: PortfolioSnapshot) -> tuple:
+    """
+    Spots, sizes, shared EWMA daily log-return covariance and protective-put legs of a snapshot,
+    restricted to positions with enough history.
+    """
+    positions = [p for p in snapshot.positions if len(p.closes) >= 3]
+    if not positions:
+        raise ValueError("Insufficient return data for Monte Carlo VaR")
+
+    assets = [p.asset for p in positions]
+    store = await get_ewma_covariance(assets)
+    cov = store.covariance(assets)
+
+    spots = np.array([p.spot for p in positions], dtype=float)
+    sizes = np.array([p.size for p in positions], dtype=float)
+
+    option_legs = snapshot.option_legs(positions)
+
+    return assets, spots, sizes, cov, option_legs
+
+
+async def calculate_monte_carlo_var(
+    confidences=DEFAULT_CONFIDENCES,
+    horizons=DEFAULT_HORIZONS,
+    n_paths: int = DEFAULT_PATHS,
+    seed: int = None,
+    days: int = 90,
+    snapshot: PortfolioSnapshot = None
+):
+    """
+    Monte Carlo VaR / Expected Shortfall for the monitored positions and their protective puts.
+    n_paths is clamped to [MIN_PATHS, MAX_PATHS].
+    """
+    n_paths = min(max(int(n_paths), MIN_PATHS), MAX_PATHS)
+    try:
+        if snapshot is None:
+            snapshot = await build_portfolio_snapshot(days)
+
+        if not snapshot.positions:
+            return "No monitored positions for Monte Carlo VaR."
+
+        assets, spots, sizes, cov, option_legs = await snapshot_inputs(snapshot)
+        result = await run_in_process(
+            simulate_var_es, spots, sizes, cov, option_legs, confidences, horizons, n_paths,
+            PATH_CHUNK_SIZE, seed, timeout=MC_JOB_TIMEOUT
+        )
+
+        message = (
+            f"🎲 Monte Carlo VaR / ES ({n_paths:,} paths, {', '.join(assets)}):\n"
+            f"• Total Exposure: ${float(np.dot(spots, sizes)):,.2f}\n"
+        )
+        for h, horizon in enumerate(result["horizons"]):
+            message += f"\n{horizon}d horizon (σ ${result['std_pnl'][h]:,.2f}):\n"
+            for c, confidence in enumerate(result["confidences"]):
+                message += (
+                    f"• {confidence * 100:g}%: VaR ${result['var'][h, c]:,.2f}, "
+                    f"ES ${result['es'][h, c]:,.2f}\n"
+                )
+
+        return message
+
+    except Exception as e:
+        logging.error(f"[calculate_monte_carlo_var] {e}")
+        return f"Error calculating Monte Carlo VaR: {e}"
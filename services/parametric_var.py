@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Optional, Tuple
+import numpy as np
+from scipy.special import ndtri
+from services.greeks import calculate_greeks_batch
+from services.monte_carlo import snapshot_inputs
+from services.portfolio_snapshot import RISK_FREE_RATE, PortfolioSnapshot, build_portfolio_snapshot
+
+RISK_MODEL_TTL = 900  # seconds before the covariance and option legs are rebuilt
+RISK_MODEL_MIN_REBUILD = 60  # seconds between rebuilds triggered by a new position
+COVARIANCE_DAYS = 90
+LIVE_VAR_CONFIDENCE = 0.99
+LIVE_VAR_HORIZON_DAYS = 1
+
+
+@dataclass(frozen=True)
+class RiskModel:
+    """EWMA daily log-return covariance and protective-put legs, frozen until the next rebuild."""
+    assets: Tuple[str, ...]
+    cov: np.ndarray
+    option_legs: Optional[dict]
+    built_at: float
+
+    def index(self, asset: str) -> Optional[int]:
+        try:
+            return self.assets.index(asset.upper())
+        except ValueError:
+            return None
+
+
+_risk_model: Optional[RiskModel] = None
+_risk_model_lock = asyncio.Lock()
+
+
+async def build_risk_model(snapshot: PortfolioSnapshot) -> RiskModel:
+    assets, _, _, cov, option_legs = await snapshot_inputs(snapshot)
+    cov = np.array(cov)
+    cov.setflags(write=False)
+    return RiskModel(assets=tuple(assets), cov=cov, option_legs=option_legs, built_at=time.time())
+
+
+async def get_risk_model(required_assets=None) -> RiskModel:
+    """
+    Cached risk model; rebuilt after RISK_MODEL_TTL, or sooner when a required asset is missing.
+    """
+    global _risk_model
+
+    def usable(model):
+        if model is None:
+            return False
+        age = time.time() - model.built_at
+        if age > RISK_MODEL_TTL:
+            return False
+        missing = any(model.index(a) is None for a in required_assets or ())
+        return not missing or age < RISK_MODEL_MIN_REBUILD
+
+    if usable(_risk_model):
+        return _risk_model
+
+    async with _risk_model_lock:
+        if not usable(_risk_model):
+            snapshot = await build_portfolio_snapshot(COVARIANCE_DAYS)
+            _risk_model = await build_risk_model(snapshot)
+            logging.info(f"[parametric_var] Risk model rebuilt for {', '.join(_risk_model.assets)}")
+        return _risk_model
+
+
+def delta_gamma_var(
+    spots: np.ndarray,
+    sizes: np.ndarray,
+    cov: np.ndarray,
+    option_legs: dict = None,
+    confidence: float = LIVE_VAR_CONFIDENCE,
+    horizon_days: float = LIVE_VAR_HORIZON_DAYS
+) -> dict:
+    """
+    Delta-gamma VaR with a Cornish-Fisher skew correction.
+
+    P&L is approximated as d'x + x'Gx / 2 for returns x ~ N(0, cov * horizon), where d and G are the
+    cash delta and (diagonal) cash gamma of spot plus option legs, with leg Greeks evaluated at the
+    given spots. Without option legs this is plain delta-normal VaR. Losses are positive USD.
+    """
+    spots = np.asarray(spots, dtype=float)
+    sigma = np.asarray(cov, dtype=float) * horizon_days
+    cash_delta = spots * np.asarray(sizes, dtype=float)
+    cash_gamma = np.zeros_like(spots)
+
+    if option_legs:
+        idx = option_legs["index"]
+        leg_spots = spots[idx]
+        greeks = calculate_greeks_batch(
+            option_legs["is_call"], leg_spots, option_legs["strike"], option_legs["expiry"],
+            RISK_FREE_RATE, option_legs["sigma"]
+        )
+        np.add.at(cash_delta, idx, leg_spots * greeks["delta"] * option_legs["size"])
+        np.add.at(cash_gamma, idx, leg_spots ** 2 * greeks["gamma"] * option_legs["size"])
+
+    sigma_delta = sigma @ cash_delta
+    gamma_sigma = cash_gamma[:, None] * sigma
+    gamma_sigma_sq = gamma_sigma @ gamma_sigma
+
+    delta_variance = float(cash_delta @ sigma_delta)
+    mean = 0.5 * float(np.trace(gamma_sigma))
+    variance = delta_variance + 0.5 * float(np.trace(gamma_sigma_sq))
+    third = 3 * float(sigma_delta @ (cash_gamma * sigma_delta)) + float(np.trace(gamma_sigma_sq @ gamma_sigma))
+
+    z = ndtri(1 - confidence)
+    std = np.sqrt(variance)
+    skew = third / variance ** 1.5 if variance > 0 else 0.0
+    z_cf = z + (z ** 2 - 1) * skew / 6
+
+    return {
+        "var": float(-(mean + z_cf * std)),
+        "delta_normal_var": float(-z * np.sqrt(delta_variance)),
+        "mean": mean,
+        "std": float(std),
+    }
+
+
+def position_var(model: RiskModel, asset: str, spot: float, size: float,
+                 confidence: float = LIVE_VAR_CONFIDENCE, horizon_days: float = LIVE_VAR_HORIZON_DAYS) -> Optional[float]:
+    """
+    Delta-gamma VaR of a standalone position plus the model's protective puts on it (delta-normal when it
+    has none), at the live spot. None if the model has no history for the asset.
+    """
+    i = model.index(asset)
+    if i is None:
+        return None
+
+    legs = None
+    if model.option_legs:
+        own = np.asarray(model.option_legs["index"]) == i
+        if own.any():
+            legs = {key: np.asarray(values)[own] for key, values in model.option_legs.items()}
+            legs["index"] = np.zeros(int(own.sum()), dtype=int)
+
+    result = delta_gamma_var([spot], [size], model.cov[i:i + 1, i:i + 1], legs, confidence, horizon_days)
+    return result["var"]
+
+
+async def calculate_parametric_var(confidence: float = LIVE_VAR_CONFIDENCE, horizon_days: float = LIVE_VAR_HORIZON_DAYS,
+                                   snapshot: PortfolioSnapshot = None):
+    """
+    Delta-normal and delta-gamma VaR of the monitored positions and their protective puts.
+    """
+    try:
+        if snapshot is None:
+            snapshot = await build_portfolio_snapshot(COVARIANCE_DAYS)
+        model = await build_risk_model(snapshot)
+
+        live = {p.asset: p for p in snapshot.positions}
+        if not live or not model.assets:
+            return "No monitored positions for parametric VaR."
+
+        spots = np.array([live[a].spot if a in live else 0.0 for a in model.assets])
+        sizes = np.array([live[a].size if a in live else 0.0 for a in model.assets])
+        result = delta_gamma_var(spots, sizes, model.cov, model.option_legs, confidence, horizon_days)
+
+        return (
+            f"📐 Parametric VaR @ {confidence * 100:g}% over {horizon_days:g}d:\n"
+            f"• Delta-Normal: ${result['delta_normal_var']:,.2f}\n"
+            f"• Delta-Gamma: ${result['var']:,.2f}"
+        )
+
+    except Exception as e:
+        logging.error(f"[calculate_parametric_var] {e}")
+        return f"Error calculating parametric VaR: {e}"
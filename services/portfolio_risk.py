@@ -1,58 +1,43 @@
 import asyncio
-import datetime
 import logging
 from db.database import get_connection
 from exchanges.price_fetcher import get_price, get_historical_prices
-from exchanges.options_utils import get_best_put_option
-from services.greeks import calculate_greeks
+from services.portfolio_snapshot import RISK_FREE_RATE, PortfolioSnapshot, build_portfolio_snapshot
+from services.parametric_var import calculate_parametric_var
+from services.greeks import calculate_greeks_batch
+from services.stress import run_stress_test
+from services.ewma_covariance import get_ewma_covariance
+from services.drawdown import drawdown_stats, max_drawdown
 import numpy as np
 import  pandas as pd
 
 
+def compute_historical_var(returns_matrix: np.ndarray, weights: np.ndarray, confidence: float) -> float:
+    """Historical-simulation VaR as a return quantile (negative = loss)."""
+    portfolio_returns = np.dot(returns_matrix, weights)
+    return float(np.percentile(portfolio_returns, (1 - confidence) * 100))
 
-async def calculate_correlation_matrix(days: int = 90):
+
+async def calculate_correlation_matrix(days: int = 90, snapshot: PortfolioSnapshot = None):
     """
-    Calculates and returns the correlation matrix of asset returns in the portfolio.
+    Returns the EWMA correlation matrix of daily asset returns from the shared covariance store.
     """
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT asset FROM monitored_positions")
-        assets = [row[0] for row in cur.fetchall()]
-        conn.close()
+        if snapshot is None:
+            snapshot = await build_portfolio_snapshot(days, include_options=False)
 
-        if not assets:
+        assets = [p.asset for p in snapshot.positions if len(p.closes) >= 3]
+        if not snapshot.positions:
             return "No monitored assets for correlation matrix."
 
-        returns_dict = {}
-
-        for asset in assets:
-            try:
-                prices = await get_historical_prices(asset, source="okx", days=days)
-                closes = [p["close"] for p in prices]
-
-                if len(closes) < 2:
-                    continue
-
-                daily_returns = np.diff(closes) / closes[:-1]
-                returns_dict[asset] = daily_returns
-
-            except Exception as e:
-                logging.warning(f"[Correlation] Error for {asset}: {e}")
-
-        if len(returns_dict) < 2:
+        if len(assets) < 2:
             return "Not enough valid assets to compute correlation."
 
-        # Normalize all return series to the same length
-        min_len = min(len(r) for r in returns_dict.values())
-        aligned_returns = {k: v[-min_len:] for k, v in returns_dict.items()}
-
-        # Build DataFrame
-        df = pd.DataFrame(aligned_returns)
-        corr_matrix = df.corr()
+        store = await get_ewma_covariance(assets)
+        corr_matrix = pd.DataFrame(store.correlation(assets), index=assets, columns=assets)
 
         # Format result
-        formatted = " Correlation Matrix (last 90 days):\n\n"
+        formatted = f" EWMA Correlation Matrix (daily, λ={store.lam}):\n\n"
         formatted += corr_matrix.round(2).to_string()
 
         return formatted
@@ -62,74 +47,39 @@ async def calculate_correlation_matrix(days: int = 90):
         return f"Error calculating correlation matrix: {e}"
     
 
-async def calculate_portfolio_var(days: int = 90, confidence: float = 0.95):
+async def calculate_portfolio_var(days: int = 90, confidence: float = 0.95, snapshot: PortfolioSnapshot = None):
     """
     Calculates Value at Risk (VaR) for the portfolio using historical simulation method.
     """
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT asset, position_size FROM monitored_positions")
-        positions = cur.fetchall()
-        conn.close()
+        if snapshot is None:
+            snapshot = await build_portfolio_snapshot(days, include_options=False)
 
-        if not positions:
+        if not snapshot.positions:
             return "No monitored positions for VaR calculation."
 
-        historical_returns = {}
-        exposures = {}
-        all_dates = None
-
-        for asset, size in positions:
-            try:
-                prices = await get_historical_prices(asset, source="okx", days=days)
-                closes = [p["close"] for p in prices]
-
-                if len(closes) < 2:
-                    continue
-
-                # Daily returns
-                returns = np.diff(closes) / closes[:-1]
-                historical_returns[asset] = returns
-
-                # Exposure in USD
-                spot_price = await get_price(asset, source="okx")
-                exposures[asset] = spot_price * size
-
-                # Capture shortest return series length
-                if all_dates is None or len(returns) < len(all_dates):
-                    all_dates = returns
-
-            except Exception as e:
-                logging.warning(f"[VaR] Error for {asset}: {e}")
+        historical_returns = snapshot.aligned_returns()
 
         if not historical_returns:
             return " Insufficient return data for VaR calculation."
 
-        # Normalize return lengths
-        min_len = min(len(r) for r in historical_returns.values())
-        for asset in historical_returns:
-            historical_returns[asset] = historical_returns[asset][-min_len:]
-
         # Stack into array
         asset_names = list(historical_returns.keys())
         returns_matrix = np.stack([historical_returns[a] for a in asset_names], axis=1)
 
         # Portfolio weights based on exposure
+        exposures = {p.asset: p.exposure for p in snapshot.positions}
         total_exposure = sum(exposures[a] for a in asset_names)
         weights = np.array([exposures[a] / total_exposure for a in asset_names])
 
-        # Portfolio returns
-        portfolio_returns = np.dot(returns_matrix, weights)
-
-        # Calculate 5% percentile
-        var_percentile = np.percentile(portfolio_returns, (1 - confidence) * 100)
+        # A percentile over a few hundred rows is cheaper inline than a round trip to the process pool
+        var_percentile = compute_historical_var(returns_matrix, weights, confidence)
 
         # Convert to USD loss
         portfolio_var = -var_percentile * total_exposure
 
         return (
-            f"📉 Value at Risk (VaR @ {int(confidence * 100)}%) over {days}d:\n"
+            f"📉 Value at Risk (VaR @ {int(confidence * 100)}%) over {snapshot.days}d:\n"
             f"• Total Exposure: ${total_exposure:,.2f}\n"
             f"• Portfolio VaR: ${portfolio_var:,.2f}"
         )
@@ -138,48 +88,31 @@ async def calculate_portfolio_var(days: int = 90, confidence: float = 0.95):
         logging.error(f"[calculate_portfolio_var] {e}")
         return f"Error calculating VaR: {e}"
     
-async def calculate_portfolio_greeks():
+def _option_leg_arrays(snapshot: PortfolioSnapshot):
+    """Sizes, spots, strikes, expiries and implied vols of every position with a protective put."""
+    legs = snapshot.option_legs()
+    if legs is None:
+        return (np.empty(0),) * 5
+    spots = snapshot.spots[legs["index"]]
+    return legs["size"], spots, legs["strike"], legs["expiry"], legs["sigma"]
+
+
+async def calculate_portfolio_greeks(snapshot: PortfolioSnapshot = None):
     """
     Aggregate Delta, Gamma, Vega, Theta across all monitored option positions.
     """
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT asset, position_size FROM monitored_positions")
-        positions = cur.fetchall()
-        conn.close()
+        if snapshot is None:
+            snapshot = await build_portfolio_snapshot()
+
+        # Solve implied vols and price every leg in one vectorized pass
+        sizes, spots, strikes, expiries, sigma = _option_leg_arrays(snapshot)
+        greeks = calculate_greeks_batch(False, spots, strikes, expiries, RISK_FREE_RATE, sigma)
 
         total_greeks = {
-            "delta": 0.0,
-            "gamma": 0.0,
-            "vega": 0.0,
-            "theta": 0.0
+            name: float(np.dot(values, sizes)) for name, values in greeks.items()
         }
 
-        for asset, size in positions:
-            try:
-                spot = await get_price(asset, source="okx")
-                option = await get_best_put_option(asset, spot)
-                strike = float(option['strike'])
-
-                expiry_ts = int(option['info']['expiration_timestamp']) / 1000
-                expiry = datetime.datetime.utcfromtimestamp(expiry_ts)
-                T = (expiry - datetime.datetime.utcnow()).days / 365
-
-                r = 0.05  # Risk-free rate
-                sigma = 0.5  # Assumed volatility
-
-                greeks = calculate_greeks("put", spot, strike, T, r, sigma)
-
-                total_greeks["delta"] += greeks["delta"] * size
-                total_greeks["gamma"] += greeks["gamma"] * size
-                total_greeks["vega"] += greeks["vega"] * size
-                total_greeks["theta"] += greeks["theta"] * size
-
-            except Exception as e:
-                logging.warning(f"[Portfolio Greeks] Failed for {asset}: {e}")
-                continue
-
         return total_greeks
 
     except Exception as e:
@@ -187,65 +120,53 @@ async def calculate_portfolio_greeks():
         return None
 
 
-def calculate_max_drawdown(prices: list[float]) -> float:
+def calculate_max_drawdown(prices) -> float:
     """
-    Calculate maximum drawdown from a list of historical prices.
+    Calculate maximum drawdown (%) from a list of historical prices.
     """
-    peak = prices[0]
-    max_dd = 0.0
+    return round(float(max_drawdown(prices)) * 100, 2)
 
-    for price in prices:
-        if price > peak:
-            peak = price
-        drawdown = (peak - price) / peak
-        max_dd = max(max_dd, drawdown)
 
-    return round(max_dd * 100, 2)
-
-
-async def get_portfolio_max_drawdown(days=90):
+async def get_portfolio_max_drawdown(days=90, snapshot: PortfolioSnapshot = None):
     """
-    Calculate weighted max drawdown across portfolio.
+    Drawdown of the portfolio equity curve (current sizes held over the window), with per-asset detail.
     """
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT asset, position_size FROM monitored_positions")
-        positions = cur.fetchall()
-        conn.close()
+        if snapshot is None:
+            snapshot = await build_portfolio_snapshot(days, include_options=False)
 
-        if not positions:
+        if not snapshot.positions:
             return "No monitored positions for drawdown calculation."
 
-        message = f"Maximum Drawdown (last {days} days):\n\n"
-        total_exposure = 0.0
-        weighted_dd_sum = 0.0
-
-        for asset, size in positions:
-            try:
-                prices = await get_historical_prices(asset, source="okx", days=days)
-                closes = [p[4] for p in prices]  # Index 4 = close
-
-                if len(closes) < 2:
-                    continue
+        assets, _, closes = snapshot.aligned_closes()
+        if closes.shape[-1] < 2:
+            return "No valid price data for drawdown calculation."
 
-                drawdown_pct = calculate_max_drawdown(closes)
-                spot_price = await get_price(asset, source="okx")
-                exposure = size * spot_price
+        sizes = np.array([next(p.size for p in snapshot.positions if p.asset == a) for a in assets])
+        equity = sizes @ closes
 
-                total_exposure += exposure
-                weighted_dd_sum += drawdown_pct * exposure
+        # Prices are positive, so assets use fractional drawdown; the equity curve can reach zero or go
+        # negative with short sizes, so it is measured in USD against gross exposure at its peak
+        stats = drawdown_stats(closes)
+        portfolio = drawdown_stats(equity, absolute=True)
 
-                message += f"• {asset}: {drawdown_pct:.2f}%\n"
+        def describe(s, depth, current):
+            recovery = s["recovery_time"]
+            recovery_text = f"recovered in {recovery}d" if recovery >= 0 else "not recovered"
+            return f"{depth} ({recovery_text}, longest underwater {s['longest_duration']}d, now {current})"
 
-            except Exception as e:
-                logging.warning(f"[Drawdown] Error for {asset}: {e}")
+        message = f"Maximum Drawdown (last {snapshot.days} days):\n\n"
+        for i, asset in enumerate(assets):
+            s = {key: values[i] for key, values in stats.items()}
+            depth, current = f"{s['max_drawdown'] * 100:.2f}%", f"{s['current_drawdown'] * 100:.2f}%"
+            message += f"• {asset}: {describe(s, depth, current)}\n"
 
-        if total_exposure > 0:
-            portfolio_dd = weighted_dd_sum / total_exposure
-            message += f"\n Portfolio-Weighted Max Drawdown: {portfolio_dd:.2f}%"
-        else:
-            message += "\nNo valid price data for weighted drawdown."
+        gross_at_peak = float(np.abs(sizes) @ closes[:, portfolio["peak_index"]])
+        depth = f"${portfolio['max_drawdown']:,.2f}"
+        if gross_at_peak > 0:
+            depth += f" = {portfolio['max_drawdown'] / gross_at_peak * 100:.2f}% of gross exposure"
+        current = f"${portfolio['current_drawdown']:,.2f}"
+        message += f"\n Portfolio Max Drawdown: {describe(portfolio, depth, current)}"
 
         return message
 
@@ -254,105 +175,69 @@ async def get_portfolio_max_drawdown(days=90):
         return f"Error calculating drawdown: {e}"
 
 
-async def simulate_stress_scenarios():
+async def simulate_stress_scenarios(snapshot: PortfolioSnapshot = None, spot_shocks=None, vol_shocks=None,
+                                    time_shocks_days=None):
     """
-    Simulate price shocks and evaluate impact on portfolio value and delta.
+    Fully reprice the portfolio over a spot × IV × time shock grid and historical crash replays.
     """
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT asset, position_size FROM monitored_positions")
-        positions = cur.fetchall()
-        conn.close()
+        if snapshot is None:
+            snapshot = await build_portfolio_snapshot()
 
-        if not positions:
+        if not snapshot.positions:
             return "No monitored positions for stress testing."
 
-        # Define stress scenarios: % drop in spot price
-        shocks = [-0.05, -0.10, -0.20]  # -5%, -10%, -20%
-        results = {f"{int(s * 100)}%": {"value": 0.0, "delta_pnl": 0.0} for s in shocks}
-        total_initial_value = 0.0
+        return run_stress_test(snapshot, spot_shocks, vol_shocks, time_shocks_days)
 
-        for asset, size in positions:
-            try:
-                spot = await get_price(asset, source="okx")
-                option = await get_best_put_option(asset, spot)
-                strike = float(option["strike"])
-                expiry_ts = int(option["info"]["expiration_timestamp"]) / 1000
-                expiry = datetime.datetime.utcfromtimestamp(expiry_ts)
-                T = (expiry - datetime.datetime.utcnow()).days / 365
-                r = 0.05
-                sigma = 0.5
-
-                initial_value = size * spot
-                total_initial_value += initial_value
-
-                greeks = calculate_greeks("put", spot, strike, T, r, sigma)
-                delta = greeks["delta"]
-
-                for s in shocks:
-                    shocked_price = spot * (1 + s)
-                    shocked_value = size * shocked_price
-                    delta_pnl = delta * size * (shocked_price - spot)
-
-                    label = f"{int(s * 100)}%"
-                    results[label]["value"] += shocked_value
-                    results[label]["delta_pnl"] += delta_pnl
+    except Exception as e:
+        logging.error(f"[simulate_stress_scenarios] {e}")
+        return f"Error simulating stress scenarios: {e}"
 
-            except Exception as e:
-                logging.warning(f"[Stress Test] Error for {asset}: {e}")
-
-        message = "Stress Testing Scenarios:\n(Price drops: impact on portfolio)\n\n"
-        for label in results:
-            value = results[label]["value"]
-            delta_pnl = results[label]["delta_pnl"]
-            loss_pct = ((total_initial_value - value) / total_initial_value) * 100
-            message += (
-                f"• {label} drop: Value = ${value:,.2f}, Loss = {loss_pct:.2f}%, "
-                f"Delta PnL = ${delta_pnl:,.2f}\n"
-            )
 
-        return message
+PNL_REFERENCE_TIMEFRAME_MS = 3_600_000
+
 
+async def _reference_price(position, since_ms: int):
+    """Close of the last 1h candle completed by `since_ms`; the snapshot's daily close if none is available."""
+    try:
+        candles = await get_historical_prices(
+            position.asset, source="okx", timeframe="1h",
+            since=since_ms - 2 * PNL_REFERENCE_TIMEFRAME_MS, until=since_ms
+        )
+        closed = candles[candles["timestamp"] + PNL_REFERENCE_TIMEFRAME_MS <= since_ms]
+        if len(closed):
+            return float(closed["close"][-1])
     except Exception as e:
-        logging.error(f"[simulate_stress_scenarios] {e}")
-        return f"Error simulating stress scenarios: {e}"
+        logging.warning(f"[get_portfolio_pnl] {position.asset}: No 1h reference price ({e})")
+    return position.price_at(since_ms)
 
 
-async def get_portfolio_pnl(days: int = 1):
+async def get_portfolio_pnl(days: int = 1, snapshot: PortfolioSnapshot = None):
     """
     Calculate portfolio-level P&L over the last N days.
     """
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT asset, position_size FROM monitored_positions")
-        positions = cur.fetchall()
-        conn.close()
+        if snapshot is None:
+            snapshot = await build_portfolio_snapshot(days + 1, include_options=False)
 
-        if not positions:
+        if not snapshot.positions:
             return "No monitored positions for PnL calculation."
 
         total_pnl = 0.0
         message = f"Portfolio P&L (last {days} day(s)):\n\n"
+        since_ms = int((snapshot.taken_at - days * 86400) * 1000)
 
-        for asset, size in positions:
-            try:
-                prices = await get_historical_prices(asset, source="okx", days=days + 1)
-                if len(prices) < 2:
-                    continue
+        past_prices = await asyncio.gather(*(_reference_price(p, since_ms) for p in snapshot.positions))
 
-                past_price = prices[0]["close"]
-                current_price = await get_price(asset, source="okx")
+        for position, past_price in zip(snapshot.positions, past_prices):
+            if past_price is None:
+                continue
 
-                pnl = (current_price - past_price) * size
-                total_pnl += pnl
+            pnl = (position.spot - past_price) * position.size
+            total_pnl += pnl
 
-                sign = "🔺" if pnl >= 0 else "🔻"
-                message += f"• {asset}: {sign} ${pnl:,.2f}\n"
-
-            except Exception as e:
-                logging.warning(f"[PnL] Error for {asset}: {e}")
+            sign = "🔺" if pnl >= 0 else "🔻"
+            message += f"• {position.asset}: {sign} ${pnl:,.2f}\n"
 
         message += f"\nTotal P&L: {'🔺' if total_pnl >= 0 else '🔻'} ${total_pnl:,.2f}"
         return message
@@ -394,3 +279,29 @@ async def calculate_portfolio_pnl():
     except Exception as e:
         logging.error(f"[calculate_portfolio_pnl] {e}")
         return f"Error calculating portfolio PnL: {e}"
+
+
+async def generate_risk_report(days: int = 90, confidence: float = 0.95) -> str:
+    """
+    Full portfolio risk report computed from one concurrently fetched market-data snapshot.
+    """
+    snapshot = await build_portfolio_snapshot(days)
+    if not snapshot.positions:
+        return "No monitored positions for risk report."
+
+    var, parametric, drawdown, stress, pnl, correlation, greeks = await asyncio.gather(
+        calculate_portfolio_var(confidence=confidence, snapshot=snapshot),
+        calculate_parametric_var(confidence=confidence, snapshot=snapshot),
+        get_portfolio_max_drawdown(snapshot=snapshot),
+        simulate_stress_scenarios(snapshot=snapshot),
+        get_portfolio_pnl(snapshot=snapshot),
+        calculate_correlation_matrix(snapshot=snapshot),
+        calculate_portfolio_greeks(snapshot=snapshot),
+    )
+
+    if greeks:
+        greeks_text = "Portfolio Greeks:\n" + "\n".join(f"• {name.capitalize()}: {value:,.4f}" for name, value in greeks.items())
+    else:
+        greeks_text = "Portfolio Greeks: unavailable"
+
+    return "\n\n".join([var, parametric, pnl, drawdown, stress, greeks_text, correlation])
@@ -0,0 +1,226 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, replace
+from typing import Optional, Tuple
+import numpy as np
+from db.database import get_connection
+from exchanges.price_fetcher import get_price, get_historical_prices
+from exchanges.options_utils import get_best_put_option, get_option_price
+from services.implied_vol import implied_volatility_batch
+
+SNAPSHOT_HISTORY_TIMEFRAME = "1d"
+SNAPSHOT_BAR_MS = 86_400_000
+RISK_FREE_RATE = 0.05
+FALLBACK_SIGMA = 0.5  # Used when an option's implied vol cannot be solved
+
+
+def _frozen(values, dtype=float) -> np.ndarray:
+    arr = np.array(values, dtype=dtype)
+    arr.setflags(write=False)
+    return arr
+
+
+def solve_put_vols(premiums, spots, strikes, expiries):
+    """Implied vols for a batch of puts, falling back to FALLBACK_SIGMA where unsolvable."""
+    iv, converged = implied_volatility_batch(premiums, False, spots, strikes, expiries, RISK_FREE_RATE)
+    return np.where(converged, iv, FALLBACK_SIGMA)
+
+
+@dataclass(frozen=True)
+class OptionLeg:
+    """Protective put chosen for a position, priced at snapshot time."""
+    symbol: str
+    strike: float
+    expiry_years: float
+    premium_usd: float
+    sigma: float = FALLBACK_SIGMA  # implied vol, solved once when the snapshot is built
+
+
+@dataclass(frozen=True)
+class PositionSnapshot:
+    asset: str
+    size: float
+    spot: float
+    timestamps: np.ndarray  # candle open times (ms), read-only
+    closes: np.ndarray      # read-only
+    option: Optional[OptionLeg] = None
+
+    @property
+    def exposure(self) -> float:
+        return self.size * self.spot
+
+    def returns(self) -> np.ndarray:
+        """Simple returns of the snapshot history."""
+        if len(self.closes) < 2:
+            return np.empty(0)
+        return np.diff(self.closes) / self.closes[:-1]
+
+    def price_at(self, ts_ms: int) -> Optional[float]:
+        """Last close completed by `ts_ms`, or the oldest close if the history starts later."""
+        if not len(self.closes):
+            return None
+        idx = int(np.searchsorted(self.timestamps + SNAPSHOT_BAR_MS, ts_ms, side="right")) - 1
+        return float(self.closes[max(idx, 0)])
+
+
+@dataclass(frozen=True)
+class PortfolioSnapshot:
+    """
+    Immutable view of every monitored position's market data, gathered once.
+    Positions whose spot price could not be fetched are left out.
+    """
+    taken_at: float
+    days: int
+    positions: Tuple[PositionSnapshot, ...]
+
+    @property
+    def assets(self) -> list:
+        return [p.asset for p in self.positions]
+
+    @property
+    def sizes(self) -> np.ndarray:
+        return np.array([p.size for p in self.positions], dtype=float)
+
+    @property
+    def spots(self) -> np.ndarray:
+        return np.array([p.spot for p in self.positions], dtype=float)
+
+    @property
+    def total_exposure(self) -> float:
+        return float(np.dot(self.sizes, self.spots))
+
+    def option_positions(self) -> list:
+        return [p for p in self.positions if p.option is not None]
+
+    def option_legs(self, positions=None) -> Optional[dict]:
+        """
+        Protective puts of `positions` (default: all) as arrays, with the implied vols solved at build time.
+        "index" points into `positions`; None when no position has a put.
+        """
+        positions = self.positions if positions is None else positions
+        legs = [(i, p) for i, p in enumerate(positions) if p.option is not None]
+        if not legs:
+            return None
+
+        index = np.array([i for i, _ in legs])
+        return {
+            "index": index,
+            "is_call": np.zeros(len(legs), dtype=bool),
+            "strike": np.array([p.option.strike for _, p in legs], dtype=float),
+            "expiry": np.array([p.option.expiry_years for _, p in legs], dtype=float),
+            "sigma": np.array([p.option.sigma for _, p in legs], dtype=float),
+            "size": np.array([p.size for _, p in legs], dtype=float),
+        }
+
+    def aligned_closes(self, min_points: int = 2) -> tuple:
+        """
+        (assets, timestamps, closes) for every position with enough history, on the candle
+        timestamps they all share; closes is (assets, candles).
+        """
+        positions = [p for p in self.positions if len(p.closes) >= min_points]
+        if not positions:
+            return [], np.empty(0, dtype=np.int64), np.empty((0, 0))
+        common = positions[0].timestamps
+        for p in positions[1:]:
+            common = np.intersect1d(common, p.timestamps)
+        closes = np.vstack([p.closes[np.searchsorted(p.timestamps, common)] for p in positions])
+        return [p.asset for p in positions], common, closes
+
+    def aligned_returns(self, min_points: int = 2) -> dict:
+        """Return series of every position with enough history, on the candle timestamps they all share."""
+        assets, _, closes = self.aligned_closes(min_points)
+        if closes.shape[1] < 2:
+            return {asset: np.empty(0) for asset in assets}
+        returns = np.diff(closes, axis=1) / closes[:, :-1]
+        return dict(zip(assets, returns))
+
+
+async def _snapshot_option(asset: str, spot: float) -> Optional[OptionLeg]:
+    option = await get_best_put_option(asset, spot)
+    premium = await get_option_price(option["symbol"])
+    if option.get("inverse", True):
+        premium *= spot
+
+    expiry_ts = int(option["info"]["expiration_timestamp"]) / 1000
+    T = max(expiry_ts - time.time(), 0.0) / (365 * 86400)  # fractional years; dailies are often < 1 day out
+
+    return OptionLeg(
+        symbol=option["symbol"],
+        strike=float(option["strike"]),
+        expiry_years=T,
+        premium_usd=float(premium),
+    )
+
+
+async def _snapshot_position(asset: str, size: float, days: int, include_options: bool):
+    spot_task = asyncio.ensure_future(get_price(asset, source="okx"))
+    history_task = asyncio.ensure_future(
+        get_historical_prices(asset, source="okx", timeframe=SNAPSHOT_HISTORY_TIMEFRAME, days=days)
+    )
+
+    try:
+        spot = await spot_task
+    except Exception as e:
+        history_task.cancel()
+        logging.warning(f"[Snapshot] {asset}: No spot price ({e})")
+        return None
+
+    option = None
+    if include_options:
+        try:
+            option = await _snapshot_option(asset, spot)
+        except Exception as e:
+            logging.warning(f"[Snapshot] {asset}: No option data ({e})")
+
+    try:
+        candles = await history_task
+    except Exception as e:
+        logging.warning(f"[Snapshot] {asset}: No history ({e})")
+        candles = np.empty(0, dtype=[("timestamp", "i8"), ("close", "f8")])
+
+    return PositionSnapshot(
+        asset=asset,
+        size=float(size),
+        spot=float(spot),
+        timestamps=_frozen(candles["timestamp"], dtype=np.int64),
+        closes=_frozen(candles["close"]),
+        option=option,
+    )
+
+
+def _with_put_vols(positions: list) -> tuple:
+    """Solve every protective put's implied vol in one batch and store it on the leg."""
+    hedged = [i for i, p in enumerate(positions) if p.option is not None]
+    if hedged:
+        legs = [positions[i] for i in hedged]
+        sigmas = solve_put_vols(
+            np.array([p.option.premium_usd for p in legs], dtype=float),
+            np.array([p.spot for p in legs], dtype=float),
+            np.array([p.option.strike for p in legs], dtype=float),
+            np.array([p.option.expiry_years for p in legs], dtype=float),
+        )
+        for i, sigma in zip(hedged, sigmas):
+            positions[i] = replace(positions[i], option=replace(positions[i].option, sigma=float(sigma)))
+    return tuple(positions)
+
+
+async def build_portfolio_snapshot(days: int = 90, include_options: bool = True) -> PortfolioSnapshot:
+    """
+    Fetch spot, daily history and the protective put for every monitored position concurrently.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT asset, position_size FROM monitored_positions")
+    positions = cur.fetchall()
+    conn.close()
+
+    snapshots = await asyncio.gather(*(
+        _snapshot_position(asset, size, days, include_options) for asset, size in positions
+    ))
+
+    return PortfolioSnapshot(
+        taken_at=time.time(),
+        days=days,
+        positions=_with_put_vols([s for s in snapshots if s is not None]),
+    )
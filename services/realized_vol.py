@@ -0,0 +1,146 @@
+import math
+from collections import deque
+from exchanges.price_fetcher import get_historical_prices
+
+_LN2 = math.log(2)
+_GK_CLOSE_WEIGHT = 2 * _LN2 - 1
+
+# Per-candle terms kept in the window, and the running sums over them
+_CC, _CC2, _PARK, _GK, _OVN, _OVN2, _OC, _OC2, _RS = range(9)
+_N_TERMS = 9
+
+
+class StreamingVolatility:
+    """
+    Rolling close-to-close, Parkinson, Garman-Klass and Yang-Zhang volatility over the last
+    `window` candles, updated in O(1) per candle. Values are per-candle std devs in %.
+
+    Feeding a candle with the same timestamp as the last one replaces it (an open candle updating).
+    """
+
+    def __init__(self, window: int = 24):
+        if window < 2:
+            raise ValueError("window must be at least 2 candles")
+        self.window = window
+        self.terms = deque()
+        self.sums = [0.0] * _N_TERMS
+        self.last_ts = None
+        self.prev_close = None    # close before the newest candle
+        self.last_candle = None
+        self._evicted = None      # terms pushed out by the newest candle, restored if it is replaced
+        self._updates = 0
+
+    def _add(self, terms):
+        self.terms.append(terms)
+        for i, v in enumerate(terms):
+            self.sums[i] += v
+
+    def _remove_oldest(self):
+        self._evicted = self.terms.popleft()
+        for i, v in enumerate(self._evicted):
+            self.sums[i] -= v
+
+    def _remove_newest(self):
+        for i, v in enumerate(self.terms.pop()):
+            self.sums[i] -= v
+
+    def update(self, timestamp: int, open_: float, high: float, low: float, close: float):
+        if self.last_ts is not None and timestamp < self.last_ts:
+            return
+
+        if timestamp == self.last_ts:
+            # Same candle again: take back its contribution and re-add with the new values
+            if self.terms and self.prev_close is not None:
+                self._remove_newest()
+                if self._evicted is not None:
+                    self.terms.appendleft(self._evicted)
+                    for i, v in enumerate(self._evicted):
+                        self.sums[i] += v
+        else:
+            self.prev_close = self.last_candle[3] if self.last_candle else None
+        self._evicted = None
+
+        self.last_ts = timestamp
+        self.last_candle = (open_, high, low, close)
+        if self.prev_close is None:
+            return  # first candle only anchors the previous close
+
+        cc = math.log(close / self.prev_close)
+        hl = math.log(high / low)
+        co = math.log(close / open_)
+        ovn = math.log(open_ / self.prev_close)
+        rs = math.log(high / close) * math.log(high / open_) + math.log(low / close) * math.log(low / open_)
+
+        self._add((cc, cc * cc, hl * hl, 0.5 * hl * hl - _GK_CLOSE_WEIGHT * co * co, ovn, ovn * ovn, co, co * co, rs))
+        while len(self.terms) > self.window:
+            self._remove_oldest()
+
+        # Re-sum from the window now and then so floating-point drift never builds up
+        self._updates += 1
+        if self._updates % (self.window * 16) == 0:
+            self.sums = [math.fsum(t[i] for t in self.terms) for i in range(_N_TERMS)]
+
+    @staticmethod
+    def _sample_var(s, s2, n):
+        return max((s2 - s * s / n) / (n - 1), 0.0)
+
+    def current(self) -> dict:
+        """Latest estimates (None until two candles with a previous close are in the window)."""
+        n = len(self.terms)
+        if n < 2:
+            return {"close_to_close": None, "parkinson": None, "garman_klass": None, "yang_zhang": None, "candles": n}
+
+        s = self.sums
+        cc_var = self._sample_var(s[_CC], s[_CC2], n)
+        park_var = s[_PARK] / (4 * _LN2 * n)
+        gk_var = max(s[_GK] / n, 0.0)
+
+        k = 0.34 / (1.34 + (n + 1) / (n - 1))
+        yz_var = (
+            self._sample_var(s[_OVN], s[_OVN2], n)
+            + k * self._sample_var(s[_OC], s[_OC2], n)
+            + (1 - k) * max(s[_RS] / n, 0.0)
+        )
+
+        return {
+            "close_to_close": math.sqrt(cc_var) * 100,
+            "parkinson": math.sqrt(park_var) * 100,
+            "garman_klass": math.sqrt(gk_var) * 100,
+            "yang_zhang": math.sqrt(yz_var) * 100,
+            "candles": n,
+        }
+
+
+# (exchange, asset, timeframe, window) -> StreamingVolatility
+_trackers = {}
+
+
+def get_tracker(asset: str, exchange: str = "okx", timeframe: str = "1h", window: int = 24) -> StreamingVolatility:
+    key = (exchange.lower(), asset.upper(), timeframe, window)
+    tracker = _trackers.get(key)
+    if tracker is None:
+        tracker = StreamingVolatility(window)
+        _trackers[key] = tracker
+    return tracker
+
+
+def feed_candles(tracker: StreamingVolatility, candles):
+    """Feed an OHLCV structured array; candles older than the tracker's last one are skipped."""
+    if tracker.last_ts is not None:
+        candles = candles[candles["timestamp"] >= tracker.last_ts]
+    for ts, o, h, l, c in zip(candles["timestamp"], candles["open"], candles["high"], candles["low"], candles["close"]):
+        tracker.update(int(ts), float(o), float(h), float(l), float(c))
+
+
+async def get_realized_vol(asset: str, exchange: str = "okx", timeframe: str = "1h", window: int = 24) -> dict:
+    """
+    Current streaming realized-vol estimates for an asset. The first call primes the window;
+    later calls only feed candles from the tracker's last timestamp on (served from the candle store).
+    """
+    tracker = get_tracker(asset, exchange, timeframe, window)
+    if tracker.last_ts is None:
+        candles = await get_historical_prices(asset, exchange, timeframe=timeframe, limit=window + 1)
+    else:
+        candles = await get_historical_prices(asset, exchange, timeframe=timeframe, since=tracker.last_ts)
+    feed_candles(tracker, candles)
+    return tracker.current()
@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import numpy as np
+from db.database import get_connection
+from exchanges.price_fetcher import get_historical_prices
+from exchanges.quote_router import get_best_quote
+from services.execution_cost import HEDGE_BOOK_DEPTH, split_across_books
+
+DEFAULT_THRESHOLDS = (0.0025, 0.005, 0.01, 0.02, 0.05)  # fractional change that triggers a rebalance
+DEFAULT_INTERVALS = (1, 5, 15, 60, 240)  # minutes between checks, as in /auto_hedge
+TAKER_FEE_BPS = 5.0
+
+
+def simulate_rebalance_policy(values: np.ndarray, thresholds, interval_bars, cost_bps) -> dict:
+    """
+    Replay the auto-hedge rule over a grid of thresholds and check intervals in one pass.
+
+    values: (assets, bars) hedge notional the loop would compute at each bar (size * price).
+    interval_bars: check interval of each grid column, in bars.
+    cost_bps: (assets,) per-trade cost applied to the notional traded at each rebalance. It is one
+    constant per asset: no historical order-book snapshots are stored, so replay_rebalance_policy
+    estimates it from the current live books (see _book_cost_bps), not from the book at each bar.
+
+    The hedge starts matched at bar 0. On every due check the rule fires when
+    |value - last_amount| / value >= threshold, trading the difference. Residual exposure is
+    the unhedged notional |value - last_amount| at every bar, checked or not.
+    Every output array is (assets, thresholds, intervals).
+    """
+    values = np.asarray(values, dtype=float)
+    thresholds = np.asarray(thresholds, dtype=float)[None, :, None]
+    steps = np.asarray(interval_bars, dtype=int)
+    cost_rate = np.asarray(cost_bps, dtype=float)[:, None, None] / 1e4
+
+    n_assets, n_bars = values.shape
+    shape = (n_assets, thresholds.shape[1], len(steps))
+
+    last = np.broadcast_to(values[:, :1, None], shape).copy()
+    rebalances = np.zeros(shape, dtype=int)
+    traded = np.zeros(shape)
+    cost = np.zeros(shape)
+    residual_sum = np.zeros(shape)
+    residual_max = np.zeros(shape)
+
+    for t in range(1, n_bars):
+        value = values[:, t, None, None]
+        gap = np.abs(value - last)
+
+        due = (t % steps == 0)[None, None, :]
+        fire = due & (gap / value >= thresholds)
+        if fire.any():
+            trade = np.where(fire, gap, 0.0)
+            rebalances += fire
+            traded += trade
+            cost += trade * cost_rate
+            last = np.where(fire, value, last)
+            gap = np.where(fire, 0.0, gap)
+
+        residual_sum += gap
+        np.maximum(residual_max, gap, out=residual_max)
+
+    mean_value = values.mean(axis=1)[:, None, None]
+    return {
+        "rebalances": rebalances,
+        "traded_notional": traded,
+        "transaction_cost": cost,
+        "mean_residual": residual_sum / max(n_bars - 1, 1),
+        "max_residual": residual_max,
+        "mean_residual_pct": residual_sum / max(n_bars - 1, 1) / mean_value * 100,
+    }
+
+
+def _align_closes(candle_sets: list) -> tuple:
+    """Closes of every asset on the timestamps they all share."""
+    common = candle_sets[0]["timestamp"]
+    for candles in candle_sets[1:]:
+        common = np.intersect1d(common, candles["timestamp"])
+    closes = np.vstack([c["close"][np.isin(c["timestamp"], common)] for c in candle_sets])
+    return common, closes
+
+
+async def _book_cost_bps(asset: str, size: float) -> float:
+    """
+    Fee plus the slippage of filling the whole position on the current live books. Used as a stand-in
+    for historical execution cost, which would need order-book snapshots the app does not record.
+    """
+    try:
+        quote = await get_best_quote(asset, depth=HEDGE_BOOK_DEPTH)
+        fill = split_across_books(quote["books"], size, side="sell")
+        return TAKER_FEE_BPS + max(fill["slippage_bps"], 0.0)
+    except Exception as e:
+        logging.warning(f"[rebalance_sim] {asset}: No usable book, fee-only cost ({e})")
+        return TAKER_FEE_BPS
+
+
+async def replay_rebalance_policy(
+    assets: list = None,
+    thresholds=DEFAULT_THRESHOLDS,
+    intervals=DEFAULT_INTERVALS,
+    days: int = 30,
+    timeframe: str = "1m",
+    source: str = "okx"
+) -> list:
+    """
+    Replay stored candles for the monitored positions through the auto-rebalance rule over
+    every threshold/interval pair. Returns one row per (asset, threshold, interval).
+
+    Intervals are in minutes and are rounded to whole bars of `timeframe`. Transaction costs use
+    today's order-book depth for every bar of the replay.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT asset, position_size FROM monitored_positions")
+    positions = {asset.upper(): size for asset, size in cur.fetchall()}
+    conn.close()
+
+    assets = [a.upper() for a in assets] if assets else sorted(positions)
+    assets = [a for a in assets if a in positions]
+    if not assets:
+        raise ValueError("No monitored positions to simulate")
+
+    candle_sets = await asyncio.gather(*(
+        get_historical_prices(asset, source, timeframe=timeframe, days=days) for asset in assets
+    ))
+    timestamps, closes = _align_closes(list(candle_sets))
+    if len(timestamps) < 2:
+        raise ValueError("Not enough overlapping candles to simulate")
+
+    bar_minutes = float(np.median(np.diff(timestamps))) / 60_000
+    interval_bars = [max(1, round(m / bar_minutes)) for m in intervals]
+
+    sizes = np.array([positions[a] for a in assets], dtype=float)
+    cost_bps = await asyncio.gather(*(_book_cost_bps(a, positions[a]) for a in assets))
+
+    result = simulate_rebalance_policy(closes * sizes[:, None], thresholds, interval_bars, cost_bps)
+
+    rows = []
+    for a, asset in enumerate(assets):
+        for t, threshold in enumerate(thresholds):
+            for i, interval in enumerate(intervals):
+                rows.append({
+                    "asset": asset,
+                    "threshold": threshold,
+                    "interval_minutes": interval,
+                    "cost_bps": cost_bps[a],
+                    **{key: float(arr[a, t, i]) for key, arr in result.items()},
+                })
+
+    logging.info(f"[rebalance_sim] {len(assets)} assets x {len(thresholds)} thresholds x {len(intervals)} intervals over {closes.shape[1]} bars")
+    return rows
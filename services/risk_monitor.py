@@ -5,7 +5,14 @@ import logging
 import asyncio
 import hashlib
 import time
-from exchanges.price_fetcher import get_price, get_orderbook
+from exchanges.price_fetcher import get_price
+from exchanges.quote_router import get_best_quote
+from exchanges.rate_limiter import PRIORITY_HEDGE, PRIORITY_ALERT
+from services.realized_vol import get_realized_vol
+from services.execution_cost import HEDGE_BOOK_DEPTH, split_across_books
+from services.parametric_var import LIVE_VAR_CONFIDENCE, get_risk_model, position_var
+from services.rolling_var import get_rolling_var
+from services.hedge_optimizer import MIN_HEDGE_UNITS, optimize_portfolio_hedge, perp_hedge_sizes
 from db.database import get_connection
 from telegram import Bot
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
@@ -28,6 +35,15 @@ async def monitor_auto_hedging_loop(bot: Bot):
             auto_hedges = cur.fetchall()
             conn.close()
 
+            # Re-solve the portfolio cross-hedge once per cycle; assets fall back to 1:1 only without a plan
+            optimal_shorts = None
+            if auto_hedges:
+                try:
+                    plan = await optimize_portfolio_hedge(include_options=False)
+                    optimal_shorts = perp_hedge_sizes(plan)
+                except Exception as e:
+                    logging.warning(f"[auto hedge] Optimizer unavailable, using 1:1 ({e})")
+
             for asset, interval, last_amount in auto_hedges:
                 # Check if asset is still monitored
                 conn = get_connection()
@@ -42,18 +58,41 @@ async def monitor_auto_hedging_loop(bot: Bot):
 
                 position_size = row[0]
 
+                if optimal_shorts is None:
+                    hedge_size = position_size
+                elif asset in optimal_shorts:
+                    hedge_size = optimal_shorts[asset]
+                else:
+                    logging.warning(f"[auto hedge] {asset}: Perp not in the optimizer plan, using 1:1")
+                    hedge_size = position_size
+
+                # A negative size means the optimizer goes long this perp, which fills against the asks
+                side = "sell" if hedge_size > 0 else "buy"
+                direction, touch_label = ("Short", "Bid") if side == "sell" else ("Long", "Ask")
+
                 try:
                     # Try fetching price/orderbook early
-                    spot_price = await get_price(asset, source="okx")
-                    orderbook = await get_orderbook(asset, source="okx")
-                    best_ask = orderbook["asks"][0][0]
+                    spot_price = await get_price(asset, source="okx", priority=PRIORITY_HEDGE)
+                    quote = await get_best_quote(asset, depth=HEDGE_BOOK_DEPTH)
+                    touch_price = quote["best_bid"] if side == "sell" else quote["best_ask"]
+                    venue = quote["bid_venue"] if side == "sell" else quote["ask_venue"]
+                    if touch_price is None and abs(hedge_size) >= MIN_HEDGE_UNITS:
+                        raise ValueError(f"no {touch_label.lower()}s to fill the hedge against")
                 except Exception as e:
-                    logging.warning(f"[auto hedge] {asset}: Asset not available on okx ({e})")
+                    logging.warning(f"[auto hedge] {asset}: No usable quote ({e})")
                     continue
 
-                hedge_cost = best_ask * position_size
-
-                if abs(hedge_cost - last_amount) / hedge_cost >= 0.01:  # ≥ 1% change
+                # Depth-aware cost of filling the recommended hedge across venues;
+                # a zero size is the optimizer leaving this asset to the cross-hedge
+                if abs(hedge_size) < MIN_HEDGE_UNITS:
+                    fill = None
+                    hedge_cost = 0.0
+                else:
+                    fill = split_across_books(quote["books"], abs(hedge_size), side=side)
+                    hedge_cost = fill["cost"]
+
+                reference = max(abs(hedge_cost), abs(last_amount or 0.0))
+                if reference > 0 and abs(hedge_cost - (last_amount or 0.0)) / reference >= 0.01:  # ≥ 1% change
                     hedge_hash = generate_hedge_hash(asset, hedge_cost)
 
                     # Prevent duplicate alert
@@ -64,10 +103,21 @@ async def monitor_auto_hedging_loop(bot: Bot):
                     message = (
                         f"*Auto Rebalancing Alert for {asset}*\n\n"
                         f"• Spot Price: ${spot_price:,.2f}\n"
-                        f"• Perpetual Best Ask: ${best_ask:,.2f}\n"
-                        f"• Position Size: {position_size} {asset}\n"
-                        f"• Updated Hedge Cost: ${hedge_cost:,.2f}"
                     )
+                    if fill is None:
+                        message += (
+                            f"• Position Size: {position_size} {asset}\n"
+                            f"• Recommended Short: 0 {asset} (covered by cross-hedge)\n"
+                            f"• Updated Hedge Cost: $0.00"
+                        )
+                    else:
+                        message += (
+                            f"• Perpetual Best {touch_label}: ${touch_price:,.2f} ({venue.upper()})\n"
+                            f"• VWAP Fill: ${fill['vwap']:,.2f} ({fill['slippage_bps']:.1f} bps slippage)\n"
+                            f"• Position Size: {position_size} {asset}\n"
+                            f"• Recommended {direction}: {abs(hedge_size):,.4f} {asset}\n"
+                            f"• Updated Hedge Cost: ${hedge_cost:,.2f}"
+                        )
 
                     if chat_id:
                         keyboard = InlineKeyboardMarkup([
@@ -105,23 +155,59 @@ async def monitor_exposure_loop(bot: Bot):
             rows = cur.fetchall()
             conn.close()
 
+            try:
+                risk_model = await get_risk_model([asset for asset, _, _ in rows])
+            except Exception as e:
+                logging.warning(f"[Risk Model] {e}")
+                risk_model = None
+
             for asset, size, threshold_pct in rows:
                 try:
-                    price = await get_price(asset)
+                    price = await get_price(asset, priority=PRIORITY_ALERT)
                     exposure = size * price
                     allowed_exposure = exposure * (threshold_pct / 100)
 
+                    # Live 1-day VaR of the position against the user's loss threshold:
+                    # delta-gamma from the cached covariance and puts, historical from the rolling hourly window
+                    parametric_var = position_var(risk_model, asset, price, size) if risk_model else None
+                    try:
+                        tracker = await get_rolling_var(asset, confidence=LIVE_VAR_CONFIDENCE)
+                        historical_var = tracker.var(exposure, horizon_candles=24)
+                    except Exception as e:
+                        logging.warning(f"[Rolling VaR] {asset}: {e}")
+                        historical_var = None
+
+                    estimates = [v for v in (parametric_var, historical_var) if v is not None]
+                    if not estimates:
+                        logging.warning(f"[Risk Model] {asset}: No VaR estimate, skipping check")
+                        continue
+                    var = max(estimates)
+
                     alert_hash = generate_alert_hash(asset, size, threshold_pct)
 
-                    if exposure > allowed_exposure and chat_id:
+                    if var > allowed_exposure and chat_id:
                         if alert_hash not in triggered_alerts:
+                            try:
+                                vol = await get_realized_vol(asset)
+                                vol_line = (
+                                    f"Realized Vol (24h): {vol['yang_zhang']:.2f}% YZ / {vol['close_to_close']:.2f}% C-C per hour\n"
+                                    if vol["yang_zhang"] is not None else ""
+                                )
+                            except Exception as e:
+                                logging.warning(f"[Realized Vol] {asset}: {e}")
+                                vol_line = ""
+
                             message = (
                                 f"Risk Breach Detected!\n\n"
                                 f"Asset: {asset}\n"
                                 f"Position Size: {size}\n"
                                 f"Price: ${price:,.2f}\n"
                                 f"Exposure: ${exposure:,.2f}\n"
-                                f"Threshold: {threshold_pct:.2f}% of exposure (${allowed_exposure:,.2f})\n\n"
+                                f"1d VaR ({LIVE_VAR_CONFIDENCE * 100:g}%): ${var:,.2f}"
+                                f" (parametric {'n/a' if parametric_var is None else f'${parametric_var:,.2f}'},"
+                                f" historical {'n/a' if historical_var is None else f'${historical_var:,.2f}'})\n"
+                                f"Threshold: {threshold_pct:.2f}% of exposure (${allowed_exposure:,.2f})\n"
+                                f"{vol_line}\n"
                                 f"Use /hedge_now {asset} to hedge."
                             )
                             await bot.send_message(chat_id=chat_id, text=message)
@@ -0,0 +1,192 @@
+import math
+import random
+from collections import deque
+from exchanges.price_fetcher import get_historical_prices
+
+
+class _Node:
+    __slots__ = ("value", "next", "width")
+
+    def __init__(self, value, next_, width):
+        self.value = value
+        self.next = next_
+        self.width = width
+
+
+_NIL = _Node(math.inf, [], [])  # tail sentinel; compares above every finite value
+
+
+class IndexableSkiplist:
+    """
+    Sorted multiset with O(log n) insert, remove and access by rank.
+    Each link stores how many bottom-level nodes it skips, so rank lookups walk down the levels.
+    """
+
+    def __init__(self, expected_size: int = 100):
+        self.size = 0
+        self.maxlevels = int(1 + math.log(max(expected_size, 2), 2))
+        self.head = _Node(None, [_NIL] * self.maxlevels, [1] * self.maxlevels)
+        self._random = random.Random(0)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i: int) -> float:
+        if not 0 <= i < self.size:
+            raise IndexError(i)
+        node = self.head
+        i += 1
+        for level in reversed(range(self.maxlevels)):
+            while node.width[level] <= i:
+                i -= node.width[level]
+                node = node.next[level]
+        return node.value
+
+    def insert(self, value: float):
+        chain = [None] * self.maxlevels
+        steps_at_level = [0] * self.maxlevels
+        node = self.head
+        for level in reversed(range(self.maxlevels)):
+            while node.next[level].value <= value:
+                steps_at_level[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+
+        depth = min(self.maxlevels, 1 - int(math.log(1.0 - self._random.random(), 2.0)))
+        new = _Node(value, [None] * depth, [None] * depth)
+        steps = 0
+        for level in range(depth):
+            prev = chain[level]
+            new.next[level] = prev.next[level]
+            prev.next[level] = new
+            new.width[level] = prev.width[level] - steps
+            prev.width[level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(depth, self.maxlevels):
+            chain[level].width[level] += 1
+        self.size += 1
+
+    def remove(self, value: float):
+        chain = [None] * self.maxlevels
+        node = self.head
+        for level in reversed(range(self.maxlevels)):
+            while node.next[level].value < value:
+                node = node.next[level]
+            chain[level] = node
+
+        target = chain[0].next[0]
+        if target.value != value:
+            raise KeyError(value)
+        for level in range(len(target.next)):
+            prev = chain[level]
+            prev.width[level] += target.width[level] - 1
+            prev.next[level] = target.next[level]
+        for level in range(len(target.next), self.maxlevels):
+            chain[level].width[level] -= 1
+        self.size -= 1
+
+
+class RollingHistoricalVar:
+    """
+    Historical-simulation VaR over a sliding window of per-candle simple returns.
+
+    Returns live in an indexable skiplist, so each candle costs O(log n) and the quantile is two
+    rank lookups (linear interpolation, as np.percentile). A repeated timestamp replaces that
+    candle's return, so a still-forming candle can be fed on every poll.
+    """
+
+    def __init__(self, window: int = 720, confidence: float = 0.99):
+        self.window = window
+        self.confidence = confidence
+        self.returns = deque()
+        self.sorted = IndexableSkiplist(window)
+        self.last_ts = None
+        self.last_close = None
+        self.prev_close = None
+        self._evicted = None
+
+    def _append(self, r: float):
+        self.returns.append(r)
+        self.sorted.insert(r)
+
+    def update(self, timestamp: int, close: float):
+        if self.last_ts is not None and timestamp < self.last_ts:
+            return
+
+        if timestamp == self.last_ts:
+            # Same candle again: take back its return and restore whatever it pushed out
+            if self.returns and self.prev_close is not None:
+                self.sorted.remove(self.returns.pop())
+                if self._evicted is not None:
+                    self.returns.appendleft(self._evicted)
+                    self.sorted.insert(self._evicted)
+        else:
+            self.prev_close = self.last_close
+        self._evicted = None
+
+        self.last_ts = timestamp
+        self.last_close = close
+        if self.prev_close is None or not self.prev_close > 0:
+            return  # first candle only anchors the previous close
+
+        self._append(close / self.prev_close - 1)
+        if len(self.returns) > self.window:
+            self._evicted = self.returns.popleft()
+            self.sorted.remove(self._evicted)
+
+    def quantile(self, q: float = None):
+        """Return quantile of the window (default: the loss tail at 1 - confidence), None when empty."""
+        n = len(self.sorted)
+        if n == 0:
+            return None
+        q = 1 - self.confidence if q is None else q
+        pos = q * (n - 1)
+        lo = int(pos)
+        frac = pos - lo
+        value = self.sorted[lo]
+        if frac > 0:
+            value += frac * (self.sorted[lo + 1] - value)
+        return value
+
+    def var(self, exposure: float, horizon_candles: float = 1):
+        """USD VaR (positive = loss) of `exposure`, square-root-of-time scaled to `horizon_candles`."""
+        q = self.quantile()
+        if q is None:
+            return None
+        return -q * abs(exposure) * math.sqrt(horizon_candles)
+
+
+_trackers = {}
+
+
+def get_var_tracker(asset: str, exchange: str = "okx", timeframe: str = "1h", window: int = 720,
+                    confidence: float = 0.99) -> RollingHistoricalVar:
+    key = (exchange.lower(), asset.upper(), timeframe, window, confidence)
+    tracker = _trackers.get(key)
+    if tracker is None:
+        tracker = RollingHistoricalVar(window, confidence)
+        _trackers[key] = tracker
+    return tracker
+
+
+def feed_closes(tracker: RollingHistoricalVar, candles):
+    """Feed an OHLCV structured array; candles older than the tracker's last one are skipped."""
+    if tracker.last_ts is not None:
+        candles = candles[candles["timestamp"] >= tracker.last_ts]
+    for ts, close in zip(candles["timestamp"], candles["close"]):
+        tracker.update(int(ts), float(close))
+
+
+async def get_rolling_var(asset: str, exchange: str = "okx", timeframe: str = "1h", window: int = 720,
+                          confidence: float = 0.99) -> RollingHistoricalVar:
+    """
+    Up-to-date rolling historical-VaR tracker for an asset. The first call primes the window;
+    later calls only feed candles from the tracker's last timestamp on (served from the candle store).
+    """
+    tracker = get_var_tracker(asset, exchange, timeframe, window, confidence)
+    if tracker.last_ts is None:
+        candles = await get_historical_prices(asset, exchange, timeframe=timeframe, limit=window + 1)
+    else:
+        candles = await get_historical_prices(asset, exchange, timeframe=timeframe, since=tracker.last_ts)
+    feed_closes(tracker, candles)
+    return tracker
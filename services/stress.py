@@ -0,0 +1,130 @@
+import numpy as np
+from config.config import Config
+from services.greeks import calculate_option_price_batch
+from services.portfolio_snapshot import RISK_FREE_RATE, PortfolioSnapshot
+
+MIN_STRESSED_VOL = 0.01
+
+
+def _reprice_legs(option_legs: dict, spots: np.ndarray, spot_moves, vol_moves, days) -> np.ndarray:
+    """
+    Value change of every option leg under broadcast shocks. spot_moves has the leg axis last,
+    vol_moves and days broadcast against it. Returns USD P&L per leg (size included).
+    """
+    idx = option_legs["index"]
+    leg_spots = spots[idx]
+    base = calculate_option_price_batch(
+        option_legs["is_call"], leg_spots, option_legs["strike"], option_legs["expiry"],
+        RISK_FREE_RATE, option_legs["sigma"]
+    )
+    stressed = calculate_option_price_batch(
+        option_legs["is_call"],
+        leg_spots * (1 + spot_moves),
+        option_legs["strike"],
+        np.maximum(option_legs["expiry"] - np.asarray(days)[..., None] / 365, 0.0),
+        RISK_FREE_RATE,
+        np.maximum(option_legs["sigma"] + np.asarray(vol_moves)[..., None], MIN_STRESSED_VOL),
+    )
+    return (stressed - base) * option_legs["size"]
+
+
+def stress_grid(spots, sizes, option_legs, spot_shocks, vol_shocks, time_shocks_days) -> dict:
+    """
+    Full revaluation over every (spot, vol, time) combination in one broadcast pass.
+
+    Spot shocks apply to all underlyings at once. Returns "spot_pnl" (spot,) for the positions alone,
+    and "hedged_pnl" (spot, vol, time) including the option legs, or None without legs.
+    """
+    spots = np.asarray(spots, dtype=float)
+    sizes = np.asarray(sizes, dtype=float)
+    spot_shocks = np.asarray(spot_shocks, dtype=float)
+
+    spot_pnl = spot_shocks * float(np.dot(spots, sizes))
+    hedged_pnl = None
+
+    if option_legs:
+        leg_pnl = _reprice_legs(
+            option_legs, spots,
+            spot_shocks[:, None, None, None],
+            np.asarray(vol_shocks, dtype=float)[None, :, None],
+            np.asarray(time_shocks_days, dtype=float)[None, None, :],
+        )
+        hedged_pnl = spot_pnl[:, None, None] + leg_pnl.sum(axis=-1)
+
+    return {"spot_pnl": spot_pnl, "hedged_pnl": hedged_pnl}
+
+
+def historical_replay(assets, spots, sizes, option_legs, scenarios: dict) -> list:
+    """
+    Replay named crash scenarios (per-asset spot moves plus an IV and time shock) in one pass.
+    """
+    names = list(scenarios)
+    spots = np.asarray(spots, dtype=float)
+    sizes = np.asarray(sizes, dtype=float)
+
+    # (scenarios, assets) spot moves; unknown assets follow BTC
+    moves = np.array([
+        [scenarios[n]["spot"].get(a, scenarios[n]["spot"].get("BTC", 0.0)) for a in assets]
+        for n in names
+    ], dtype=float).reshape(len(names), len(assets))
+    vol = np.array([scenarios[n].get("vol", 0.0) for n in names], dtype=float)
+    days = np.array([scenarios[n].get("days", 0) for n in names], dtype=float)
+
+    spot_pnl = moves @ (spots * sizes)
+    hedged_pnl = spot_pnl.copy()
+    if option_legs:
+        hedged_pnl += _reprice_legs(option_legs, spots, moves[:, option_legs["index"]], vol, days).sum(axis=-1)
+
+    return [
+        {"name": n, "spot_pnl": float(spot_pnl[k]), "hedged_pnl": float(hedged_pnl[k]) if option_legs else None}
+        for k, n in enumerate(names)
+    ]
+
+
+def _nearest(values, target=0.0) -> int:
+    return int(np.argmin(np.abs(np.asarray(values, dtype=float) - target)))
+
+
+def run_stress_test(snapshot: PortfolioSnapshot, spot_shocks=None, vol_shocks=None, time_shocks_days=None,
+                    scenarios=None) -> str:
+    """
+    Stress grid plus historical replays for a snapshot, formatted for Telegram.
+    Shock lists default to the Config grid.
+    """
+    spot_shocks = Config.STRESS_SPOT_SHOCKS if spot_shocks is None else spot_shocks
+    vol_shocks = Config.STRESS_VOL_SHOCKS if vol_shocks is None else vol_shocks
+    time_shocks_days = Config.STRESS_TIME_SHOCKS_DAYS if time_shocks_days is None else time_shocks_days
+    scenarios = Config.STRESS_HISTORICAL_SCENARIOS if scenarios is None else scenarios
+
+    spots, sizes = snapshot.spots, snapshot.sizes
+    option_legs = snapshot.option_legs()
+    total_value = snapshot.total_exposure
+
+    grid = stress_grid(spots, sizes, option_legs, spot_shocks, vol_shocks, time_shocks_days)
+    replays = historical_replay(snapshot.assets, spots, sizes, option_legs, scenarios)
+
+    base_vol, base_time = _nearest(vol_shocks), _nearest(time_shocks_days)
+    message = (
+        f"Stress Testing Scenarios ({len(spot_shocks)}×{len(vol_shocks)}×{len(time_shocks_days)} grid):\n"
+        f"Portfolio Value: ${total_value:,.2f}\n\n"
+    )
+    for s, shock in enumerate(spot_shocks):
+        line = f"• Spot {shock * 100:+.0f}%: Spot P&L ${grid['spot_pnl'][s]:,.2f}"
+        if grid["hedged_pnl"] is not None:
+            line += (
+                f", With Puts ${grid['hedged_pnl'][s, base_vol, base_time]:,.2f}"
+                f" (worst over IV/time ${grid['hedged_pnl'][s].min():,.2f})"
+            )
+        message += line + "\n"
+
+    message += "\nHistorical Replays:\n"
+    for replay in replays:
+        line = f"• {replay['name']}: Spot P&L ${replay['spot_pnl']:,.2f}"
+        if replay["hedged_pnl"] is not None:
+            line += f", With Puts ${replay['hedged_pnl']:,.2f}"
+        message += line + "\n"
+
+    if option_legs is None:
+        message += "\n(No protective put data; option legs not repriced.)"
+
+    return message
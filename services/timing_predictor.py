@@ -1,7 +1,6 @@
-import pandas as pd
 import numpy as np
-from arch import arch_model
-from exchanges.price_fetcher import get_historical_prices
+from services.garch import get_garch_fit, garch_forecast
+from services.volatility import fetch_ohlcv
 
 # Predict optimal hedge time based on vol forecast
 async def predict_optimal_hedge_time(asset: str, exchange: str = "okx", forecast_horizon: int = 12, threshold: float = 2.5):
@@ -16,23 +15,14 @@ async def predict_optimal_hedge_time(asset: str, exchange: str = "okx", forecast
         "recommended_hour": int
     }
     """
-    raw_data = await get_historical_prices(asset, exchange, timeframe="1h", limit=500)
-
-    df = pd.DataFrame(raw_data, columns=["timestamp", "open", "high", "low", "close", "volume"])
-    df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
-    df.set_index("timestamp", inplace=True)
+    df = await fetch_ohlcv(asset, exchange, timeframe="1h", limit=500)
 
     df["log_return"] = np.log(df["close"] / df["close"].shift(1))
     df.dropna(inplace=True)
 
-    returns = df["log_return"] * 100
-
-    model = arch_model(returns, vol="Garch", p=1, q=1)
-    res = model.fit(disp="off")
-
-    forecast = res.forecast(horizon=forecast_horizon)
-    variance_array = forecast.variance.values[-1]
-    vol_forecast = np.sqrt(variance_array)
+    # Same cached fit as /forecast_volatility
+    fit = await get_garch_fit(asset, exchange, "1h", df)
+    vol_forecast = garch_forecast(fit, forecast_horizon)
 
     # which hours exceed the threshold
     hedge_hours = [i for i, v in enumerate(vol_forecast) if v > threshold]
@@ -1,72 +1,230 @@
-import ccxt.async_support as ccxt
+import asyncio
+import logging
 import pandas as pd
-import matplotlib.pyplot as plt
+import matplotlib
+matplotlib.use("Agg")  # off-screen rendering, also inside pool workers
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 import io
-from arch import arch_model
+from collections import OrderedDict
 import numpy as np
+from exchanges.price_fetcher import get_historical_prices
+from services.garch import get_garch_fit, garch_forecast
+from services.compute_executor import run_in_process
 
 # Fetch Historical OHLCV Data
 async def fetch_ohlcv(asset: str, exchange: str = "okx", timeframe="1h", limit=500):
-    ex = getattr(ccxt, exchange)()
-    symbol = f"{asset}/USDT"
-    ohlcv = await ex.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
-    await ex.close()
+    ohlcv = await get_historical_prices(asset, exchange, timeframe=timeframe, limit=limit)
 
-    df = pd.DataFrame(ohlcv, columns=["timestamp", "open", "high", "low", "close", "volume"])
+    df = pd.DataFrame(ohlcv)
     df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
     df.set_index("timestamp", inplace=True)
     return df
 
-# GARCH Forecast and Historical Volatility Plots
-async def forecast_volatility(asset: str, exchange: str = "okx", forecast_steps: int = 10):
-    df = await fetch_ohlcv(asset, exchange)
+# Rendered PNG pairs keyed by (exchange, asset, forecast_steps, last candle timestamp), LRU by total size
+CHART_CACHE_MAX_BYTES = 16 * 1024 * 1024
+MAX_CHART_POINTS = 300  # longer realized-vol series are downsampled before plotting
+_chart_cache = OrderedDict()
+_chart_cache_bytes = 0
+_chart_renders = {}  # key -> in-flight render task shared by concurrent requests
 
-    # Compute log ret   
-    df["log_return"] = np.log(df["close"] / df["close"].shift(1))
-    df.dropna(inplace=True)
+# Figures reused across renders within one (pool worker) process
+_figures = {}
 
-    # Compute rolling realized volatility (std dev of returns)
-    df["realized_vol"] = df["log_return"].rolling(window=24).std() * np.sqrt(24) * 100  # annualized-ish for hourly
 
-    # Fit GARCH(1,1) model on returns
-    returns = df["log_return"] * 100  # % returns
-    model = arch_model(returns, vol="Garch", p=1, q=1)
-    res = model.fit(disp="off")
+def _get_figure(name: str) -> Figure:
+    fig = _figures.get(name)
+    if fig is None:
+        fig = Figure(figsize=(10, 4))
+        FigureCanvasAgg(fig)
+        # Fixed margins instead of tight_layout on every render
+        fig.subplots_adjust(left=0.08, right=0.98, top=0.9, bottom=0.14)
+        _figures[name] = fig
+    fig.clf()
+    return fig
+
+
+def _downsample(index, values, max_points: int = MAX_CHART_POINTS):
+    step = -(-len(values) // max_points)  # ceil division
+    if step <= 1:
+        return index, values
+    return index[::step], values[::step]
 
-    # Forecast future volatility
-    forecast = res.forecast(horizon=forecast_steps)
-    forecast_vol = forecast.variance.values[-1] ** 0.5  # std dev
 
-    future_dates = [df.index[-1] + pd.Timedelta(hours=i+1) for i in range(forecast_steps)]
+def _figure_png(fig: Figure) -> bytes:
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png")
+    return buf.getvalue()
+
+
+# Realized-vol and forecast charts (CPU-bound, runs in the compute process pool)
+def render_volatility_charts(asset: str, log_returns: pd.Series, forecast_vol, forecast_steps: int, history_points: int = 200):
+    # Compute rolling realized volatility (std dev of returns)
+    realized_vol = log_returns.rolling(window=24).std() * np.sqrt(24) * 100  # annualized-ish for hourly
+    realized_vol = realized_vol.dropna()[-history_points:]
+
+    future_dates = [log_returns.index[-1] + pd.Timedelta(hours=i+1) for i in range(forecast_steps)]
 
     # Plot 1: Historical Realized Volatility 
-    fig1, ax1 = plt.subplots(figsize=(10, 4))
-    ax1.plot(df.index[-200:], df["realized_vol"].dropna()[-200:], label="Realized Volatility")
+    fig1 = _get_figure("realized")
+    ax1 = fig1.add_subplot()
+    ax1.plot(*_downsample(realized_vol.index, realized_vol.to_numpy()), label="Realized Volatility")
     ax1.set_title(f"Historical Realized Volatility for {asset}")
     ax1.set_xlabel("Time")
     ax1.set_ylabel("Volatility (%)")
     ax1.legend()
     ax1.grid(True)
-
-    buf1 = io.BytesIO()
-    fig1.tight_layout()
-    fig1.savefig(buf1, format="png")
-    buf1.seek(0)
-    plt.close(fig1)
+    ax1.tick_params(axis="x", labelsize=8)
+    png1 = _figure_png(fig1)
 
     #Plot 2: Forecasted Volatility
-    fig2, ax2 = plt.subplots(figsize=(10, 4))
+    fig2 = _get_figure("forecast")
+    ax2 = fig2.add_subplot()
     ax2.plot(future_dates, forecast_vol, label="Forecasted Volatility", color="red")
     ax2.set_title(f"GARCH Forecasted Volatility ({forecast_steps} steps ahead) for {asset}")
     ax2.set_xlabel("Future Time")
     ax2.set_ylabel("Volatility (%)")
     ax2.legend()
     ax2.grid(True)
+    ax2.tick_params(axis="x", labelsize=8)
+    png2 = _figure_png(fig2)
+
+    return png1, png2
+
+
+def _cache_charts(key, charts):
+    global _chart_cache_bytes
+    size = sum(len(png) for png in charts)
+    if size > CHART_CACHE_MAX_BYTES:
+        return
+    _chart_cache[key] = charts
+    _chart_cache_bytes += size
+    while _chart_cache_bytes > CHART_CACHE_MAX_BYTES:
+        _, evicted = _chart_cache.popitem(last=False)
+        _chart_cache_bytes -= sum(len(png) for png in evicted)
+
+
+async def _render_and_cache(key, asset: str, exchange: str, df, forecast_steps: int):
+    # GARCH(1,1) fit on % returns, shared with the timing predictor (fitted off the event loop)
+    fit = await get_garch_fit(asset, exchange, "1h", df)
+
+    # Forecast future volatility
+    forecast_vol = garch_forecast(fit, forecast_steps)  # std dev
+
+    charts = await run_in_process(render_volatility_charts, asset, df["log_return"], forecast_vol, forecast_steps)
+    _cache_charts(key, charts)
+    return charts
+
+
+# GARCH Forecast and Historical Volatility Plots
+async def forecast_volatility(asset: str, exchange: str = "okx", forecast_steps: int = 10):
+    df = await fetch_ohlcv(asset, exchange)
+
+    # Compute log ret   
+    df["log_return"] = np.log(df["close"] / df["close"].shift(1))
+    df.dropna(inplace=True)
+
+    # Nothing changed since the last render: serve the cached PNGs
+    key = (exchange.lower(), asset.upper(), forecast_steps, df.index[-1])
+    charts = _chart_cache.get(key)
+    if charts is not None:
+        _chart_cache.move_to_end(key)
+        return charts
+
+    # Concurrent identical requests share one render
+    task = _chart_renders.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_render_and_cache(key, asset, exchange, df, forecast_steps))
+        _chart_renders[key] = task
+        task.add_done_callback(lambda _: _chart_renders.pop(key, None))
+    return await asyncio.shield(task)
+
+
+EWMA_LAMBDA = 0.94  # RiskMetrics decay for hourly EWMA volatility
+
+
+async def load_aligned_returns(assets: list, exchange: str = "okx", timeframe: str = "1h", limit: int = 500):
+    """
+    Fetch candles for every asset concurrently.
+
+    Returns:
+    - (frames, returns): per-asset OHLCV DataFrames (with "log_return") and a
+      timestamp-aligned DataFrame of log returns (one column per asset, common timestamps only)
+    """
+    results = await asyncio.gather(
+        *(fetch_ohlcv(asset, exchange, timeframe=timeframe, limit=limit) for asset in assets),
+        return_exceptions=True
+    )
+
+    frames = {}
+    for asset, df in zip(assets, results):
+        if isinstance(df, BaseException):
+            logging.warning(f"[load_aligned_returns] {asset}: {df}")
+            continue
+        df["log_return"] = np.log(df["close"] / df["close"].shift(1))
+        df.dropna(inplace=True)
+        if len(df) > 1:
+            frames[asset] = df
+
+    returns = pd.concat({asset: df["log_return"] for asset, df in frames.items()}, axis=1, join="inner")
+    return frames, returns
+
+
+def ewma_volatility(returns: pd.DataFrame, lam: float = EWMA_LAMBDA) -> pd.Series:
+    """Latest EWMA volatility (% per period) for every column at once."""
+    variance = (returns ** 2).ewm(alpha=1 - lam, adjust=False).mean().iloc[-1]
+    return np.sqrt(variance) * 100
+
+
+def render_vol_dashboard_chart(garch_paths: dict, ewma_vols: dict, forecast_steps: int) -> bytes:
+    """One chart with every asset's GARCH path and its EWMA level (runs in the compute process pool)."""
+    fig = _get_figure("dashboard")
+    ax = fig.add_subplot()
+    steps = np.arange(1, forecast_steps + 1)
+    for asset, path in garch_paths.items():
+        line, = ax.plot(steps, path, marker="o", markersize=3, label=f"{asset} GARCH")
+        if asset in ewma_vols:
+            ax.axhline(ewma_vols[asset], color=line.get_color(), linestyle="--", linewidth=1, label=f"{asset} EWMA")
+    ax.set_title(f"Portfolio Volatility Forecast ({forecast_steps} steps ahead)")
+    ax.set_xlabel("Hours Ahead")
+    ax.set_ylabel("Volatility (%)")
+    ax.legend(fontsize=8, ncol=2)
+    ax.grid(True)
+    return _figure_png(fig)
+
+
+async def forecast_volatility_batch(assets: list, exchange: str = "okx", forecast_steps: int = 10):
+    """
+    Portfolio-wide volatility view: one concurrent history load, one aligned return matrix,
+    vectorized EWMA for all assets and GARCH fits spread across the compute pool.
+
+    Returns:
+    - (table, chart): DataFrame indexed by asset with columns
+      garch_next, garch_avg, ewma, realized_24h (all % per hour), and a combined PNG chart
+    """
+    frames, returns = await load_aligned_returns(assets, exchange)
+    if not frames:
+        raise ValueError("No price history available for the requested assets.")
+
+    fits = await asyncio.gather(
+        *(get_garch_fit(asset, exchange, "1h", df) for asset, df in frames.items()),
+        return_exceptions=True
+    )
+    garch_paths = {}
+    for asset, fit in zip(frames, fits):
+        if isinstance(fit, BaseException):
+            logging.warning(f"[forecast_volatility_batch] GARCH failed for {asset}: {fit}")
+            continue
+        garch_paths[asset] = garch_forecast(fit, forecast_steps)
+
+    ewma = ewma_volatility(returns) if len(returns) else pd.Series(dtype=float)
+    realized = returns.iloc[-24:].std() * 100 if len(returns) else pd.Series(dtype=float)
 
-    buf2 = io.BytesIO()
-    fig2.tight_layout()
-    fig2.savefig(buf2, format="png")
-    buf2.seek(0)
-    plt.close(fig2)
+    table = pd.DataFrame(index=list(frames))
+    table["garch_next"] = pd.Series({a: p[0] for a, p in garch_paths.items()})
+    table["garch_avg"] = pd.Series({a: p.mean() for a, p in garch_paths.items()})
+    table["ewma"] = ewma
+    table["realized_24h"] = realized
 
-    return buf1.getvalue(), buf2.getvalue()
+    chart = await run_in_process(render_vol_dashboard_chart, garch_paths, ewma.to_dict(), forecast_steps)
+    return table, chart
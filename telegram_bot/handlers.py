@@ -5,12 +5,15 @@ from exchanges.options_utils import (
     get_option_price
 )
 import matplotlib.pyplot as plt
-from services.portfolio_risk import calculate_portfolio_pnl
+from services.portfolio_risk import calculate_portfolio_pnl, generate_risk_report, simulate_stress_scenarios
+from services.monte_carlo import DEFAULT_PATHS, MAX_PATHS, MIN_PATHS, calculate_monte_carlo_var
+from services.hedge_optimizer import MIN_HEDGE_UNITS, format_hedge_plan, optimize_portfolio_hedge, perp_hedge_sizes
 from arch import arch_model
 import io
 import logging
 import asyncio
 import datetime
+import time
 from db.database import get_connection, create_auto_hedge_table
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InputFile
 from telegram.ext import (
@@ -25,8 +28,11 @@ from services.risk_monitor import monitor_auto_hedging_loop
 from db.database import get_connection
 from services import risk_monitor
 from services.risk_monitor import monitor_auto_hedging_loop, monitor_exposure_loop
-from services.volatility import forecast_volatility
-from exchanges.price_fetcher import get_orderbook, get_price
+from services.volatility import forecast_volatility, forecast_volatility_batch
+from exchanges.price_fetcher import get_price
+from exchanges.quote_router import get_best_quote, format_venue_latencies
+from exchanges.rate_limiter import PRIORITY_HEDGE
+from services.execution_cost import HEDGE_BOOK_DEPTH, split_across_books
 from exchanges.options_utils import get_best_put_option, get_best_call_option, get_option_price
 
 
@@ -51,15 +57,20 @@ async def help_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "/help - Show this help message\n"
         "/monitor\\_risk <asset> <position\\_size> <risk\\_threshold> - Start monitoring risk\n"
         "/hedge\\_now <asset> [exchange] - View hedge suggestion\n"
+        "/optimize\\_hedge [options] - Minimum-variance cross-hedge for the whole portfolio\n"
         "/hedge\\_options <asset> <strategy> - Hedge with options (protective\\_put, covered\\_call, collar)\n"
         "/forecast\\_volatility <asset> [steps_ahead] - Forecast volatility and view plots\n"
         "/predict\\_hedge <asset> - Predict whether and when to hedge based on forecasted volatility\n"
+        "/vol\\_dashboard [steps_ahead] - Volatility forecasts for all monitored assets\n"
         "/status or /hedge\\_status <asset> - View hedge status\n"
         "/hedge\\_history <asset> - View historical hedge records\n"
         "/auto\\_hedge <asset> <interval\\_minutes> - Enable auto hedging for an asset\n"
         "/price - View latest prices (interactive buttons)\n"
         "/greeks <asset> <call/put> <strike> <expiry_days> <volatility> - Compute option Greeks\n"
         "/pnl\\_report - Show portfolio P&L report\n"
+        "/risk\\_report - VaR, drawdown, stress, Greeks and correlation for the portfolio\n"
+        "/mc\\_var [paths] [seed] - Monte Carlo VaR and Expected Shortfall\n"
+        "/stress\\_test [spot%,...] [vol\\_pts,...] [days,...] - Stress grid and crash replays\n"
         "/show\\_db - View monitored positions\n"
         "/delete\\_all\\_db - Clear all monitored positions\n",
         parse_mode="Markdown"
@@ -84,7 +95,7 @@ async def monitor_risk(update: Update, context: ContextTypes.DEFAULT_TYPE):
         conn.commit()
         conn.close()
         await update.effective_message.reply_text(
-            f"Now monitoring {asset}:\n• Size: {size}\n• Risk Threshold: {threshold}%"
+            f"Now monitoring {asset}:\n• Size: {size}\n• Risk Threshold: {threshold}% of exposure as 1d 99% VaR"
         )
     except (IndexError, ValueError):
         await update.effective_message.reply_text("Usage: /monitor_risk <asset> <position_size> <risk_threshold>")
@@ -97,7 +108,8 @@ async def hedge_now(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
 
         asset = context.args[0].upper()
-        exchange = context.args[1].lower() if len(context.args) > 1 else "okx"
+        # Without an explicit exchange, route across every venue that lists the asset
+        venues = [context.args[1].lower()] if len(context.args) > 1 else None
 
         conn = get_connection()
         cur = conn.cursor()
@@ -111,31 +123,90 @@ async def hedge_now(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         position_size = row[0]
 
-        # Fetch orderbook from selected exchange
-        orderbook = await get_orderbook(asset, exchange)
-        best_ask = orderbook["asks"][0]
-        hedge_price = best_ask[0]
-        hedge_cost = hedge_price * position_size
+        # Portfolio-wide minimum-variance perp size for this asset; 1:1 only if the optimizer cannot size it
+        hedge_size = position_size
+        hedge_basis = "1:1"
+        try:
+            plan = await optimize_portfolio_hedge(include_options=False)
+            optimal = perp_hedge_sizes(plan)
+            if asset in optimal:
+                hedge_size = optimal[asset]
+                hedge_basis = "min-variance cross-hedge, see /optimize_hedge"
+            else:
+                logging.warning(f"[hedge_now] {asset}: Perp not in the optimizer plan, using 1:1")
+        except Exception as e:
+            logging.warning(f"[hedge_now] {asset}: Optimizer unavailable, using 1:1 ({e})")
+
+        if abs(hedge_size) < MIN_HEDGE_UNITS:
+            cur.execute(
+                "UPDATE auto_hedges SET last_hedge_amount = ?, last_hedge_time = ? WHERE asset = ?",
+                (0.0, time.time(), asset)
+            )
+            conn.commit()
+            conn.close()
+            await update.effective_message.reply_text(
+                f"Hedge Suggestion for {asset}:\n\n"
+                f"Spot Position Size: {position_size} {asset}\n"
+                f"Recommended Short (Perp): 0 {asset} (covered by cross-hedge, see /optimize_hedge)"
+            )
+            return
+
+        # Best top-of-book across venues (or the selected exchange), then walk the full depth;
+        # a negative size means the optimizer goes long this perp, which fills against the asks
+        side = "sell" if hedge_size > 0 else "buy"
+        direction, touch_label = ("Short", "Bid") if side == "sell" else ("Long", "Ask")
+        quote = await get_best_quote(asset, venues, depth=HEDGE_BOOK_DEPTH)
+        touch_price = quote["best_bid"] if side == "sell" else quote["best_ask"]
+        exchange = quote["bid_venue"] if side == "sell" else quote["ask_venue"]
+        if touch_price is None:
+            conn.close()
+            await update.effective_message.reply_text(f"No {touch_label.lower()}s available to {direction.lower()} {asset} against right now.")
+            return
+        fill = split_across_books(quote["books"], abs(hedge_size), side=side)
+        hedge_price = fill["vwap"]
+        hedge_cost = fill["cost"]
+        venue_split = ", ".join(f"{v.upper()} {amt:g}" for v, amt in fill["allocation"].items())
 
         # Update hedge record
-        cur.execute("UPDATE auto_hedges SET last_hedge_amount = ? WHERE asset = ?", (hedge_price, asset))
+        cur.execute(
+            "UPDATE auto_hedges SET last_hedge_amount = ?, last_hedge_time = ? WHERE asset = ?",
+            (hedge_cost, time.time(), asset)
+        )
         conn.commit()
         conn.close()
 
-        await update.effective_message.reply_text(
+        message = (
             f"Hedge Suggestion for {asset} on {exchange.upper()}:\n\n"
             f"Spot Position Size: {position_size} {asset}\n"
-            f"Best Ask Price: ${hedge_price:,.2f}\n"
-            f"Recommended Short (Perp): {position_size} {asset}\n"
-            f"Estimated Hedge Cost: ${hedge_cost:,.2f}\n\n"
-            
+            f"Best {touch_label} Price: ${touch_price:,.2f}\n"
+            f"VWAP Fill Price: ${hedge_price:,.2f} ({fill['slippage_bps']:.1f} bps, {fill['levels_consumed']} levels)\n"
+            f"Venue Split: {venue_split}\n"
+            f"Recommended {direction} (Perp): {abs(hedge_size):,.4f} {asset} ({hedge_basis})\n"
+            f"Estimated Hedge Cost: ${hedge_cost:,.2f}\n"
         )
+        if fill["unfilled"]:
+            message += f"Unfilled at Available Depth: {fill['unfilled']:g} {asset}\n"
+        message += f"\nVenue Latency: {format_venue_latencies(quote)}"
+
+        await update.effective_message.reply_text(message)
 
     except Exception as e:
         logging.error(f"[hedge_now] {e}")
         await update.effective_message.reply_text("Error processing hedge request. Please try again.")
 
 
+# --- Command: /optimize_hedge ---
+async def optimize_hedge(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    include_options = len(context.args) > 0 and context.args[0].lower() == "options"
+    await update.message.reply_text("Solving portfolio cross-hedge...")
+    try:
+        plan = await optimize_portfolio_hedge(include_options=include_options)
+        await update.message.reply_text(format_hedge_plan(plan))
+    except Exception as e:
+        logging.error(f"[optimize_hedge] {e}")
+        await update.message.reply_text("Failed to optimize hedge.")
+
+
 async def hedge_now_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
@@ -169,7 +240,7 @@ async def hedge_options(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
 
         size = row[0]
-        spot_price = await get_price(asset, source="okx")
+        spot_price = await get_price(asset, source="okx", priority=PRIORITY_HEDGE)
         message = f"Hedging Strategy: {strategy.replace('_', ' ').title()} for {asset}\n\n"
         message += f"Spot Price: ${spot_price:.2f}\nPosition Size: {size} {asset}\n"
         buttons = []
@@ -457,6 +528,38 @@ async def forecast_volatility_cmd(update: Update, context: ContextTypes.DEFAULT_
         await update.message.reply_text(f"Error: {e}")
 
 
+# --- Command: /vol_dashboard ---
+async def vol_dashboard(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    try:
+        steps = int(context.args[0]) if context.args else 10
+        if steps < 1:
+            raise ValueError(steps)
+    except ValueError:
+        await update.message.reply_text("Usage: /vol_dashboard [steps_ahead]\nSteps must be a positive integer.")
+        return
+
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT asset FROM monitored_positions")
+    assets = [row[0] for row in cur.fetchall()]
+    conn.close()
+
+    if not assets:
+        await update.message.reply_text("No monitored positions. Use /monitor_risk first.")
+        return
+
+    try:
+        table, chart = await forecast_volatility_batch(assets, forecast_steps=steps)
+        await update.message.reply_text(
+            f"Volatility Dashboard (% per hour, {steps}h horizon):\n\n"
+            + table.round(3).to_string(na_rep="-")
+        )
+        await update.message.reply_photo(InputFile(io.BytesIO(chart), filename="vol_dashboard.png"))
+    except Exception as e:
+        logging.error(f"[vol_dashboard] {e}")
+        await update.message.reply_text(f"Error: {e}")
+
+
 # --- Command: /greeks ---
 async def show_greeks(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
@@ -511,6 +614,60 @@ async def pnl_report(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("Failed to calculate P&L report.")
 
 
+# --- Command: /risk_report ---
+async def risk_report(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.message.reply_text("Building portfolio risk report...")
+    try:
+        report = await generate_risk_report()
+        await update.message.reply_text(report)
+    except Exception as e:
+        logging.error(f"[risk_report] {e}")
+        await update.message.reply_text("Failed to build risk report.")
+
+
+# --- Command: /mc_var ---
+async def mc_var(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    try:
+        n_paths = int(context.args[0]) if len(context.args) > 0 else DEFAULT_PATHS
+        seed = int(context.args[1]) if len(context.args) > 1 else None
+        if not MIN_PATHS <= n_paths <= MAX_PATHS:
+            raise ValueError(n_paths)
+    except ValueError:
+        await update.message.reply_text(f"Usage: /mc_var [paths] [seed]\nPaths must be between {MIN_PATHS:,} and {MAX_PATHS:,}.")
+        return
+
+    await update.message.reply_text(f"Simulating {n_paths:,} correlated paths...")
+    try:
+        report = await calculate_monte_carlo_var(n_paths=n_paths, seed=seed)
+        await update.message.reply_text(report)
+    except Exception as e:
+        logging.error(f"[mc_var] {e}")
+        await update.message.reply_text("Failed to calculate Monte Carlo VaR.")
+
+
+# --- Command: /stress_test ---
+async def stress_test(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    def parse(i, scale):
+        if len(context.args) <= i:
+            return None
+        return [float(x) / scale for x in context.args[i].split(",")]
+
+    try:
+        spot_shocks, vol_shocks, time_shocks = parse(0, 100), parse(1, 100), parse(2, 1)
+    except ValueError:
+        await update.message.reply_text("Usage: /stress_test [spot%,...] [vol_pts,...] [days,...]\nExample: /stress_test -30,-10,0 0,20 0,7")
+        return
+
+    try:
+        report = await simulate_stress_scenarios(
+            spot_shocks=spot_shocks, vol_shocks=vol_shocks, time_shocks_days=time_shocks
+        )
+        await update.message.reply_text(report)
+    except Exception as e:
+        logging.error(f"[stress_test] {e}")
+        await update.message.reply_text("Failed to run stress test.")
+
+
 
 
 
@@ -551,6 +708,7 @@ def register_handlers(app):
     app.add_handler(CommandHandler("help", help_cmd))
     app.add_handler(CommandHandler("monitor_risk", monitor_risk))
     app.add_handler(CommandHandler("hedge_now", hedge_now))
+    app.add_handler(CommandHandler("optimize_hedge", optimize_hedge))
     app.add_handler(CommandHandler("hedge_options", hedge_options))
     app.add_handler(CommandHandler("forecast_volatility", forecast_volatility_cmd))
     app.add_handler(CommandHandler("status", hedge_status))
@@ -566,4 +724,8 @@ def register_handlers(app):
     app.add_handler(CallbackQueryHandler(hedge_now_callback, pattern=r"^hedge_now_"))
     app.add_handler(CallbackQueryHandler(hedge_options_callback, pattern=r"^options_hedge_"))
     app.add_handler(CommandHandler("pnl_report", pnl_report))
+    app.add_handler(CommandHandler("risk_report", risk_report))
+    app.add_handler(CommandHandler("mc_var", mc_var))
+    app.add_handler(CommandHandler("stress_test", stress_test))
     app.add_handler(CommandHandler("predict_hedge", predict_hedge))
+    app.add_handler(CommandHandler("vol_dashboard", vol_dashboard))
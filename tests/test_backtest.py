@@ -0,0 +1,107 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+import services.backtest as backtest
+from db.candle_store import OHLCV_DTYPE
+from services.backtest import _fit_refit_chunk, _next_step_variance, evaluate_timing_rule
+
+
+def _garch_returns(n, params=(0.0, 0.05, 0.1, 0.85), seed=0):
+    mu, omega, alpha, beta = params
+    rng = np.random.default_rng(seed)
+    returns, variance = np.empty(n), omega / (1 - alpha - beta)
+    for t in range(n):
+        returns[t] = mu + np.sqrt(variance) * rng.standard_normal()
+        variance = omega + alpha * (returns[t] - mu) ** 2 + beta * variance
+    return returns
+
+
+def _fit(params, last_resid, last_variance):
+    return {"params": np.array(params), "last_resid": last_resid, "last_variance": last_variance}
+
+
+def test_next_step_variance_matches_the_garch_recursion():
+    returns = _garch_returns(300)
+    refit_points = [100, 160, 250]
+    fits = [
+        _fit((0.01, 0.05, 0.10, 0.85), 0.3, 1.1),
+        _fit((0.02, 0.04, 0.12, 0.80), -0.5, 0.9),
+        _fit((0.00, 0.06, 0.08, 0.88), 1.2, 1.4),
+    ]
+    variance, params = _next_step_variance(returns, refit_points, fits, len(returns))
+
+    expected = []
+    bounds = refit_points[1:] + [len(returns)]
+    for t0, t1, fit in zip(refit_points, bounds, fits):
+        mu, omega, alpha, beta = fit["params"]
+        sigma2 = omega + alpha * fit["last_resid"] ** 2 + beta * fit["last_variance"]
+        for t in range(t0, t1):
+            expected.append(sigma2)
+            sigma2 = omega + alpha * (returns[t] - mu) ** 2 + beta * sigma2
+    np.testing.assert_allclose(variance, expected, rtol=1e-12)
+    np.testing.assert_array_equal(params[refit_points[1] - refit_points[0]], fits[1]["params"])
+
+
+def test_timing_rule_flags_windows_whose_forecast_is_above_threshold():
+    horizon, n_windows = 4, 3
+    returns = np.concatenate([np.full(horizon, 0.1), np.full(horizon, -3.0), np.full(horizon, 3.0)])
+    # Flat forecasts at the long-run level: low, high, high
+    long_run = np.repeat([0.01, 16.0, 16.0], horizon)
+    zeros = np.zeros(len(returns))
+    params = np.column_stack([zeros, long_run * 0.1, zeros, zeros + 0.9])
+
+    report = evaluate_timing_rule(returns, long_run, params, 0, horizon, threshold=2.5, cost_bps=5.0)
+    assert report["windows"] == n_windows
+    assert report["signals"] == 2
+    assert report["high_vol_windows"] == 2
+    assert report["hit_rate"] == 1.0
+    assert report["recall"] == 1.0
+    assert report["hedge_cost_bps"] == 10.0
+    assert report["baseline_cost_bps"] == 15.0
+    # Only the falling window loses money, and it was hedged
+    assert report["loss_covered_pct"] == pytest.approx(100.0)
+    assert report["unhedged_loss_pct"] == 0.0
+
+
+def test_refit_chunk_returns_one_fit_per_point():
+    returns = _garch_returns(700, seed=1)
+    fits = _fit_refit_chunk(returns, [500, 600], 500)
+    assert len(fits) == 2
+    for fit in fits:
+        assert fit["params"].shape == (4,)
+        assert fit["last_variance"] > 0
+
+
+def test_backtest_hedge_timing_walks_forward(monkeypatch):
+    n = 800
+    closes = 100 * np.exp(np.cumsum(np.r_[0.0, _garch_returns(n - 1, seed=2)]) / 100)
+    candles = np.zeros(n, dtype=OHLCV_DTYPE)
+    candles["timestamp"] = np.arange(n) * 3_600_000
+    candles["close"] = closes
+
+    async def fake_history(*args, **kwargs):
+        return candles
+
+    async def inline(func, *args, timeout=None):
+        return func(*args)
+
+    monkeypatch.setattr(backtest, "get_historical_prices", fake_history)
+    monkeypatch.setattr(backtest, "run_in_process", inline)
+
+    report = asyncio.run(backtest.backtest_hedge_timing("btc", fit_window=500, refit_stride=100, forecast_horizon=12))
+    assert report["asset"] == "BTC"
+    assert report["refits"] == 3
+    assert report["bars"] == n - 1 - 500
+    assert report["windows"] == report["bars"] // 12
+    assert report["baseline_cost_bps"] == report["windows"] * 5.0
+
+
+def test_backtest_needs_enough_history(monkeypatch):
+    async def fake_history(*args, **kwargs):
+        return np.zeros(100, dtype=OHLCV_DTYPE)
+
+    monkeypatch.setattr(backtest, "get_historical_prices", fake_history)
+    with pytest.raises(ValueError):
+        asyncio.run(backtest.backtest_hedge_timing("BTC"))
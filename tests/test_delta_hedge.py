@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from services.greeks import calculate_greeks, calculate_greeks_batch
+
+
+def test_greeks_batch_matches_scalar():
+    is_call = np.array([True, False, True, False, True, False, True])
+    S = np.array([100.0, 100.0, 50_000.0, 3_000.0, 100.0, 100.0, 100.0])
+    K = np.array([95.0, 105.0, 45_000.0, 3_200.0, 100.0, 100.0, 100.0])
+    T = np.array([0.25, 1.0, 7 / 365, 30 / 365, 0.0, -0.1, 0.5])
+    sigma = np.array([0.2, 0.35, 0.6, 0.8, 0.5, 0.5, 0.0])
+    r = 0.05
+
+    batch = calculate_greeks_batch(is_call, S, K, T, r, sigma)
+    for i in range(len(S)):
+        scalar = calculate_greeks("call" if is_call[i] else "put", S[i], K[i], T[i], r, sigma[i])
+        for greek in ("delta", "gamma", "vega", "theta"):
+            assert batch[greek][i] == pytest.approx(scalar[greek], rel=1e-9, abs=1e-12)
+
+
+def test_greeks_batch_zero_when_expired_or_zero_vol():
+    batch = calculate_greeks_batch([True, False, True], 100.0, 100.0, [0.0, -1.0, 0.5], 0.05, [0.5, 0.5, -0.2])
+    for greek in ("delta", "gamma", "vega", "theta"):
+        assert np.all(batch[greek] == 0.0)
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from services.drawdown import drawdown_series, drawdown_stats, max_drawdown, rolling_max_drawdown
+
+
+def _reference_max_drawdown(values):
+    peak, worst = values[0], 0.0
+    for v in values:
+        peak = max(peak, v)
+        worst = max(worst, 1 - v / peak)
+    return worst
+
+
+def test_max_drawdown_matches_a_running_peak_loop():
+    rng = np.random.default_rng(0)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (5, 300)), axis=1))
+    np.testing.assert_allclose(max_drawdown(prices), [_reference_max_drawdown(p) for p in prices])
+
+
+def test_stats_of_a_hand_checked_path():
+    stats = drawdown_stats(np.array([100.0, 120.0, 90.0, 60.0, 100.0, 130.0, 110.0]))
+    assert stats["max_drawdown"] == pytest.approx(0.5)
+    assert stats["peak_index"] == 1
+    assert stats["trough_index"] == 3
+    assert stats["recovery_time"] == 2
+    assert stats["longest_duration"] == 3
+    assert stats["current_duration"] == 1
+    assert stats["current_drawdown"] == pytest.approx(1 - 110 / 130)
+
+
+def test_unrecovered_drawdown_has_negative_recovery_time():
+    stats = drawdown_stats(np.array([100.0, 80.0, 90.0]))
+    assert stats["recovery_time"] == -1
+
+
+@pytest.mark.parametrize("values", [[1.0, 2.0, 3.0], [5.0, 5.0, 5.0], [7.0]])
+def test_no_drawdown_means_zero_recovery_time(values):
+    stats = drawdown_stats(np.array(values))
+    assert stats["max_drawdown"] == 0.0
+    assert stats["recovery_time"] == 0
+
+
+def test_stats_are_computed_per_row():
+    stats = drawdown_stats(np.array([[1.0, 2.0, 3.0], [3.0, 1.0, 3.0]]))
+    np.testing.assert_array_equal(stats["recovery_time"], [0, 1])
+    np.testing.assert_allclose(stats["max_drawdown"], [0.0, 2 / 3])
+
+
+def test_fractional_drawdown_rejects_non_positive_peaks():
+    with pytest.raises(ValueError):
+        drawdown_series(np.array([-10.0, -5.0, -8.0]))
+    with pytest.raises(ValueError):
+        max_drawdown(np.array([0.0, 0.0]))
+
+
+def test_absolute_drawdown_handles_curves_through_zero():
+    equity = np.array([-100.0, 50.0, -20.0, 10.0, 60.0])
+    np.testing.assert_allclose(drawdown_series(equity, absolute=True), [0.0, 0.0, 70.0, 40.0, 0.0])
+    stats = drawdown_stats(equity, absolute=True)
+    assert stats["max_drawdown"] == pytest.approx(70.0)
+    assert stats["peak_index"] == 1
+    assert stats["trough_index"] == 2
+    assert stats["recovery_time"] == 2
+
+
+def test_rolling_max_drawdown_matches_each_window():
+    rng = np.random.default_rng(1)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, 200)))
+    rolling = rolling_max_drawdown(prices, 30)
+    assert len(rolling) == len(prices) - 29
+    np.testing.assert_allclose(rolling, [_reference_max_drawdown(prices[i:i + 30]) for i in range(len(rolling))])
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from db.candle_store import OHLCV_DTYPE
+from services.ewma_covariance import EwmaCovarianceStore, _align_on_timestamps
+
+DAY_MS = 86_400_000
+COV = np.array([[4e-4, 3e-4], [3e-4, 9e-4]])
+
+
+def _closes(n, seed=0):
+    rng = np.random.default_rng(seed)
+    returns = rng.multivariate_normal(np.zeros(2), COV, n - 1)
+    return np.vstack([np.ones(2), np.exp(np.cumsum(returns, axis=0))]) * [50_000.0, 3_000.0]
+
+
+def _recursive(closes, seed_returns, lam):
+    returns = np.diff(np.log(closes), axis=0)
+    cov = seed_returns.T @ seed_returns / len(seed_returns)
+    for r in returns:
+        cov = lam * cov + (1 - lam) * np.outer(r, r)
+    return cov
+
+
+def test_update_matches_the_riskmetrics_recursion_across_batches():
+    closes = _closes(400)
+    timestamps = np.arange(len(closes)) * DAY_MS
+    store = EwmaCovarianceStore(["BTC", "ETH"])
+    for lo, hi in [(0, 50), (50, 51), (51, 300), (300, 400)]:
+        store.update(timestamps[lo:hi], closes[lo:hi])
+
+    seed = np.diff(np.log(closes[:50]), axis=0)
+    np.testing.assert_allclose(store.cov, _recursive(closes, seed, 0.94), rtol=1e-10)
+    assert store.n_obs == len(closes) - 1
+    assert store.last_ts == timestamps[-1]
+
+
+def test_replayed_candles_are_ignored():
+    closes = _closes(100, seed=1)
+    timestamps = np.arange(len(closes)) * DAY_MS
+    store = EwmaCovarianceStore(["BTC", "ETH"])
+    store.update(timestamps, closes)
+    before = store.cov.copy()
+
+    store.update(timestamps[-10:], closes[-10:] * 2)
+    np.testing.assert_array_equal(store.cov, before)
+    assert store.n_obs == len(closes) - 1
+
+
+def test_estimate_converges_to_the_true_covariance():
+    closes = _closes(20_000, seed=2)
+    store = EwmaCovarianceStore(["BTC", "ETH"], lam=0.999)
+    store.update(np.arange(len(closes)) * DAY_MS, closes)
+    np.testing.assert_allclose(store.covariance(), COV, rtol=0.15)
+    np.testing.assert_allclose(store.volatility(["eth"]), [0.03], rtol=0.1)
+    assert store.correlation()[0, 1] == pytest.approx(0.5, abs=0.05)
+
+
+def test_covariance_selects_assets_in_the_requested_order():
+    store = EwmaCovarianceStore(["BTC", "ETH"])
+    store.update(np.arange(50) * DAY_MS, _closes(50, seed=3))
+    cov = store.covariance()
+    np.testing.assert_array_equal(store.covariance(["ETH", "BTC"]), cov[::-1, ::-1])
+
+
+def test_covariance_needs_observations():
+    store = EwmaCovarianceStore(["BTC"])
+    with pytest.raises(ValueError):
+        store.covariance()
+    store.update([0], [[50_000.0]])  # one candle only anchors the close
+    with pytest.raises(ValueError):
+        store.covariance()
+
+
+def test_align_on_timestamps_keeps_shared_candles():
+    a = np.zeros(3, dtype=OHLCV_DTYPE)
+    a["timestamp"], a["close"] = [1, 2, 3], [10, 20, 30]
+    b = np.zeros(3, dtype=OHLCV_DTYPE)
+    b["timestamp"], b["close"] = [2, 3, 4], [200, 300, 400]
+    timestamps, closes = _align_on_timestamps([a, b])
+    np.testing.assert_array_equal(timestamps, [2, 3])
+    np.testing.assert_array_equal(closes, [[20, 200], [30, 300]])
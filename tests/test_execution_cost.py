@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from services.execution_cost import book_levels, estimate_fill, split_across_books
+
+ASKS = [[100.0, 1.0], [101.0, 2.0], [103.0, 5.0]]
+BIDS = [[99.0, 1.0], [98.0, 2.0], [95.0, 5.0]]
+
+
+def test_fill_within_top_level_has_no_slippage():
+    fill = estimate_fill(ASKS, 0.5, "buy")
+    assert fill["vwap"] == 100.0
+    assert fill["slippage_bps"] == 0.0
+    assert fill["levels_consumed"] == 1
+    assert fill["cost"] == pytest.approx(50.0)
+
+
+def test_buy_walks_the_asks():
+    fill = estimate_fill(ASKS, 2.5, "buy")
+    assert fill["cost"] == pytest.approx(100.0 + 1.5 * 101.0)
+    assert fill["vwap"] == pytest.approx(fill["cost"] / 2.5)
+    assert fill["slippage_bps"] == pytest.approx((fill["vwap"] / 100.0 - 1) * 1e4)
+    assert fill["levels_consumed"] == 2
+    assert fill["unfilled"] == 0.0
+
+
+def test_sell_walks_the_bids_with_positive_slippage():
+    fill = estimate_fill(BIDS, 3.0, "sell")
+    assert fill["cost"] == pytest.approx(99.0 + 2 * 98.0)
+    assert fill["slippage_bps"] == pytest.approx((1 - fill["vwap"] / 99.0) * 1e4)
+    assert fill["slippage_bps"] > 0
+
+
+def test_size_beyond_depth_is_priced_at_the_worst_level():
+    fill = estimate_fill(ASKS, 10.0, "buy")
+    assert fill["filled"] == pytest.approx(8.0)
+    assert fill["unfilled"] == pytest.approx(2.0)
+    assert fill["cost"] == pytest.approx(100.0 + 202.0 + 515.0 + 2 * 103.0)
+
+
+def test_book_levels_picks_the_side_and_converts_quote_sized_venues():
+    book = {"asks": ASKS, "bids": [[50_000.0, 100_000.0]]}
+    np.testing.assert_array_equal(book_levels(book, "buy"), np.array(ASKS))
+    np.testing.assert_allclose(book_levels(book, "sell", "deribit"), [[50_000.0, 2.0]])
+
+
+def test_split_across_books_takes_the_best_levels_first():
+    books = {
+        "okx": {"asks": [[100.0, 1.0], [102.0, 5.0]], "bids": []},
+        "bybit": {"asks": [[101.0, 1.0], [103.0, 5.0]], "bids": []},
+    }
+    fill = split_across_books(books, 3.0, "buy")
+    assert fill["cost"] == pytest.approx(100.0 + 101.0 + 102.0)
+    assert fill["allocation"] == pytest.approx({"okx": 2.0, "bybit": 1.0})
+    # A single venue would have paid more for the same size
+    assert fill["cost"] < min(f["cost"] for f in fill["venue_fills"].values())
+
+
+def test_split_across_books_sells_into_the_highest_bids():
+    books = {"okx": {"asks": [], "bids": BIDS}, "bybit": {"asks": [], "bids": [[98.5, 1.0]]}}
+    fill = split_across_books(books, 2.0, "sell")
+    assert fill["cost"] == pytest.approx(99.0 + 98.5)
+    assert fill["allocation"] == pytest.approx({"okx": 1.0, "bybit": 1.0})
+
+
+def test_split_across_books_needs_a_book():
+    with pytest.raises(ValueError):
+        split_across_books({}, 1.0)
@@ -0,0 +1,139 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+import services.hedge_optimizer as hedge_optimizer
+from services.hedge_optimizer import optimize_portfolio_hedge, perp_hedge_sizes, solve_min_variance_hedge
+from services.portfolio_snapshot import PortfolioSnapshot, PositionSnapshot
+
+COV = np.array([[4e-4, 3e-4], [3e-4, 9e-4]])
+WIDE = 1e12
+
+
+def test_single_asset_full_hedge_without_costs():
+    result = solve_min_variance_hedge([50_000.0], [[4e-4]], [[1.0]], [0.0], [-WIDE], [WIDE], 1e-3)
+    assert result["converged"]
+    assert result["notional"][0] == pytest.approx(-50_000.0, rel=1e-4)
+
+
+def test_cross_hedge_matches_closed_form():
+    # Only the second asset has a hedge instrument: the minimum-variance short is e1 * cov12 / cov22
+    exposures = np.array([100_000.0, 0.0])
+    result = solve_min_variance_hedge(exposures, COV, [[0.0, 1.0]], [0.0], [-WIDE], [WIDE], 1e-4)
+    assert result["notional"][0] == pytest.approx(-exposures[0] * COV[0, 1] / COV[1, 1], rel=1e-4)
+
+
+def test_two_perps_hedge_each_asset_one_for_one():
+    exposures = np.array([100_000.0, -30_000.0])
+    result = solve_min_variance_hedge(exposures, COV, np.eye(2), [0.0, 0.0], [-WIDE] * 2, [WIDE] * 2, 1e-4)
+    np.testing.assert_allclose(result["notional"], -exposures, rtol=1e-4)
+
+
+@pytest.mark.parametrize("exposure", [1_000.0, 50_000.0])
+def test_l1_cost_gives_soft_threshold_band(exposure):
+    # One asset: x* = -sign(e) * max(|e| - c / (γσ²), 0), a no-trade band of c / (γσ²) USD
+    var, gamma, cost_bps = 4e-4, 1e-3, 8.0
+    band = cost_bps / 1e4 / (gamma * var)
+    result = solve_min_variance_hedge([exposure], [[var]], [[1.0]], [cost_bps], [-WIDE], [WIDE], gamma)
+    assert result["notional"][0] == pytest.approx(-max(exposure - band, 0.0), abs=1e-6 * exposure)
+
+
+def test_box_limits_cap_the_hedge():
+    exposures = np.array([100_000.0, 80_000.0])
+    lower, upper = np.array([-25_000.0, -WIDE]), np.array([0.0, WIDE])
+    result = solve_min_variance_hedge(exposures, COV, np.eye(2), [0.0, 0.0], lower, upper, 1e-4)
+    x = result["notional"]
+    assert x[0] == pytest.approx(-25_000.0)
+    # The second perp picks up part of the first asset's residual through the correlation
+    assert x[1] == pytest.approx(-80_000.0 - 75_000.0 * COV[0, 1] / COV[1, 1], rel=1e-4)
+    assert np.all(x >= lower - 1e-9) and np.all(x <= upper + 1e-9)
+
+
+def test_solves_many_portfolios_at_once():
+    exposures = np.array([[100_000.0, 0.0], [0.0, 50_000.0]])
+    result = solve_min_variance_hedge(exposures, COV, np.eye(2), [0.0, 0.0], [-WIDE] * 2, [WIDE] * 2, 1e-4)
+    np.testing.assert_allclose(result["notional"], -exposures, rtol=1e-4, atol=1.0)
+
+
+class _Store:
+    def __init__(self, assets, cov):
+        self.assets, self.cov = list(assets), cov
+
+    def covariance(self, assets):
+        idx = [self.assets.index(a) for a in assets]
+        return self.cov[np.ix_(idx, idx)]
+
+
+def _position(asset, size, spot):
+    timestamps = np.arange(10, dtype=np.int64) * 86_400_000
+    return PositionSnapshot(asset=asset, size=size, spot=spot, timestamps=timestamps, closes=np.full(10, spot))
+
+
+def _book(price, depth):
+    return {"bids": [[price * (1 - i * 1e-4), depth] for i in range(1, 6)],
+            "asks": [[price * (1 + i * 1e-4), depth] for i in range(1, 6)]}
+
+
+@pytest.fixture
+def market(monkeypatch):
+    spots = {"BTC": 100_000.0, "ETH": 3_000.0}
+    depth = {"BTC": 100.0, "ETH": 1_000.0}
+
+    async def fake_quote(asset, venues=None, **kwargs):
+        book = _book(spots[asset], depth[asset])
+        return {"books": {"okx": book}, "best_bid": book["bids"][0][0], "bid_venue": "okx",
+                "best_ask": book["asks"][0][0], "ask_venue": "okx"}
+
+    async def fake_covariance(assets, *args, **kwargs):
+        return _Store(["BTC", "ETH"], COV)
+
+    monkeypatch.setattr(hedge_optimizer, "get_best_quote", fake_quote)
+    monkeypatch.setattr(hedge_optimizer, "get_ewma_covariance", fake_covariance)
+    monkeypatch.setattr(hedge_optimizer, "_last_solution", {})
+    return spots, depth
+
+
+def _snapshot(btc_size, eth_size, spots):
+    positions = (_position("BTC", btc_size, spots["BTC"]), _position("ETH", eth_size, spots["ETH"]))
+    return PortfolioSnapshot(taken_at=0.0, days=10, positions=positions)
+
+
+def test_optimize_portfolio_hedge_shorts_both_perps(market):
+    spots, _ = market
+    plan = asyncio.run(optimize_portfolio_hedge(snapshot=_snapshot(1.0, 20.0, spots), include_options=False))
+    shorts = perp_hedge_sizes(plan)
+    assert set(shorts) == {"BTC", "ETH"}
+    # Costs shave a little off a full hedge, never add to it
+    assert 0.95 < shorts["BTC"] <= 1.0
+    assert 0.95 * 20.0 < shorts["ETH"] <= 20.0
+    assert plan["hedged_vol"] < 0.1 * plan["unhedged_vol"]
+    assert plan["total_cost"] == pytest.approx(sum(leg["cost"] for leg in plan["legs"]))
+
+
+def test_optimize_portfolio_hedge_band_scales_with_the_book(market):
+    spots, _ = market
+    small, large = (
+        perp_hedge_sizes(asyncio.run(optimize_portfolio_hedge(snapshot=_snapshot(k, 20.0 * k, spots),
+                                                              include_options=False)))
+        for k in (1.0, 10.0)
+    )
+    for asset in small:
+        assert large[asset] == pytest.approx(10 * small[asset], rel=1e-4)
+
+
+def test_optimize_portfolio_hedge_leaves_small_correlated_leg_to_cross_hedge(market):
+    spots, _ = market
+    # A sliver of ETH next to a large BTC book sits inside the no-trade band
+    plan = asyncio.run(optimize_portfolio_hedge(snapshot=_snapshot(10.0, 0.05, spots), include_options=False))
+    assert perp_hedge_sizes(plan)["ETH"] == 0.0
+    assert perp_hedge_sizes(plan)["BTC"] > 9.0
+
+
+def test_optimize_portfolio_hedge_caps_at_book_depth(market, monkeypatch):
+    spots, depth = market
+    monkeypatch.setitem(depth, "BTC", 0.1)  # 0.5 BTC of bids across five levels
+    plan = asyncio.run(optimize_portfolio_hedge(snapshot=_snapshot(2.0, 0.0, spots), include_options=False))
+    btc = next(leg for leg in plan["legs"] if leg["asset"] == "BTC")
+    assert btc["at_limit"]
+    assert -btc["units"] == pytest.approx(0.5, rel=1e-3)
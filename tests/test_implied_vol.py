@@ -0,0 +1,29 @@
+import numpy as np
+
+from services.greeks import calculate_option_price_batch
+from services.implied_vol import implied_volatility_batch
+
+
+def test_implied_vol_round_trip():
+    rng = np.random.default_rng(7)
+    n = 200
+    is_call = rng.random(n) < 0.5
+    S = np.full(n, 100.0)
+    K = rng.uniform(70, 130, n)
+    T = rng.uniform(7 / 365, 2.0, n)
+    sigma = rng.uniform(0.1, 1.5, n)
+    r = 0.03
+
+    prices = calculate_option_price_batch(is_call, S, K, T, r, sigma)
+    iv, converged = implied_volatility_batch(prices, is_call, S, K, T, r)
+    assert converged.all()
+
+    repriced = calculate_option_price_batch(is_call, S, K, T, r, iv)
+    np.testing.assert_allclose(repriced, prices, rtol=1e-5)
+
+
+def test_implied_vol_rejects_unsolvable_prices():
+    # Below intrinsic, above the spot, and expired
+    iv, converged = implied_volatility_batch([1.0, 150.0, 5.0], True, 110.0, 100.0, [0.5, 0.5, 0.0], 0.0)
+    assert np.isnan(iv).all()
+    assert not converged.any()
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from scipy.special import ndtri
+
+from services.monte_carlo import _merge_tail, covariance_factor, simulate_var_es
+
+COV = np.array([[4e-4, 3e-4], [3e-4, 9e-4]])
+
+
+def test_covariance_factor_reproduces_covariance():
+    factor = covariance_factor(COV)
+    np.testing.assert_allclose(factor @ factor.T, COV)
+
+
+def test_covariance_factor_handles_singular_matrices():
+    # Perfectly correlated assets: Cholesky fails, the eigen fallback must still reproduce cov
+    vol = np.array([0.02, 0.03])
+    cov = np.outer(vol, vol)
+    factor = covariance_factor(cov)
+    np.testing.assert_allclose(factor @ factor.T, cov, atol=1e-12)
+
+
+def test_merge_tail_keeps_the_largest_losses():
+    rng = np.random.default_rng(0)
+    losses = rng.normal(size=10_000)
+    tail = np.empty(0)
+    for chunk in np.array_split(losses, 7):
+        tail = _merge_tail(tail, chunk, 50)
+    np.testing.assert_array_equal(np.sort(tail), np.sort(losses)[-50:])
+
+
+def test_single_asset_var_matches_lognormal_quantile():
+    spot, size, daily_vol = 50_000.0, 2.0, 0.03
+    result = simulate_var_es([spot], [size], [[daily_vol ** 2]], confidences=(0.95, 0.99), horizons=(1, 10),
+                             n_paths=400_000, seed=1)
+    for h, horizon in enumerate((1, 10)):
+        for c, confidence in enumerate((0.95, 0.99)):
+            expected = spot * size * (1 - np.exp(daily_vol * np.sqrt(horizon) * ndtri(1 - confidence)))
+            assert result["var"][h, c] == pytest.approx(expected, rel=0.02)
+    assert result["std_pnl"][0] == pytest.approx(spot * size * daily_vol, rel=0.02)
+
+
+def test_expected_shortfall_exceeds_var_and_grows_with_confidence_and_horizon():
+    result = simulate_var_es([50_000.0, 3_000.0], [1.0, 10.0], COV, n_paths=100_000, seed=2)
+    assert np.all(result["es"] >= result["var"])
+    assert np.all(np.diff(result["var"], axis=1) > 0)
+    assert np.all(np.diff(result["var"], axis=0) > 0)
+
+
+def test_chunking_does_not_change_the_result():
+    args = ([50_000.0, 3_000.0], [1.0, -10.0], COV)
+    whole = simulate_var_es(*args, n_paths=30_000, chunk_size=30_000, seed=3)
+    chunked = simulate_var_es(*args, n_paths=30_000, chunk_size=7_000, seed=3)
+    np.testing.assert_allclose(chunked["var"], whole["var"])
+    np.testing.assert_allclose(chunked["es"], whole["es"])
+
+
+def test_protective_put_reduces_the_tail():
+    spot, vol = 50_000.0, 0.04
+    legs = {"index": [0], "is_call": [False], "strike": [47_500.0], "expiry": [30 / 365], "sigma": [0.6],
+            "size": [1.0]}
+    naked = simulate_var_es([spot], [1.0], [[vol ** 2]], n_paths=100_000, seed=4)
+    hedged = simulate_var_es([spot], [1.0], [[vol ** 2]], option_legs=legs, n_paths=100_000, seed=4)
+    assert np.all(hedged["var"] < naked["var"])
+    assert np.all(hedged["es"] < naked["es"])
+
+
+@pytest.mark.parametrize("n_paths", [0, -5])
+def test_rejects_non_positive_path_counts(n_paths):
+    with pytest.raises(ValueError):
+        simulate_var_es([100.0], [1.0], [[1e-4]], n_paths=n_paths)
@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+import pytest
+
+import exchanges.options_utils as options_utils
+
+DAY_MS = 86_400_000
+
+
+def _market(strike, expiry_ms):
+    return {"symbol": f"BTC-{expiry_ms}-{strike}-P", "option": True, "base": "BTC", "optionType": "put",
+            "strike": strike, "info": {"expiration_timestamp": expiry_ms}}
+
+
+@pytest.fixture
+def option_index(monkeypatch):
+    now_ms = int(time.time() * 1000)
+    expiries = {
+        "expired": now_ms - 60_000,
+        "near": now_ms + 2 * DAY_MS,
+        "far": now_ms + 5 * DAY_MS,
+        "beyond": now_ms + 20 * DAY_MS,
+    }
+    strikes = {
+        "expired": (90_000.0, 95_000.0, 100_000.0),
+        "near": (80_000.0, 100_000.0),
+        "far": (90_000.0, 95_000.0, 100_000.0),
+        "beyond": (90_000.0, 95_000.0, 100_000.0),
+    }
+    markets = [_market(k, expiries[name]) for name in expiries for k in strikes[name]]
+    cache = {"markets": markets, "index": options_utils._build_option_index(markets)}
+
+    async def fake_cache():
+        return cache
+
+    monkeypatch.setattr(options_utils, "_get_market_cache", fake_cache)
+    return expiries
+
+
+def _expiry(market):
+    return market["info"]["expiration_timestamp"]
+
+
+def test_nearest_option_skips_expired_expiries(option_index):
+    best = asyncio.run(options_utils._find_nearest_option("BTC", "put", 100_000.0, 0.85, 0.99))
+    assert _expiry(best) == option_index["far"]
+    assert best["strike"] == 95_000.0
+
+
+def test_nearest_option_takes_earliest_expiry_with_strikes_in_window(option_index):
+    best = asyncio.run(options_utils._find_nearest_option("BTC", "put", 110_000.0, 0.85, 0.99))
+    assert _expiry(best) == option_index["near"]
+    assert best["strike"] == 100_000.0
+
+    assert asyncio.run(options_utils._find_nearest_option("BTC", "put", 100_000.0, 0.97, 0.99)) is None
+
+
+def test_nearest_option_ignores_expiries_beyond_window(monkeypatch):
+    now_ms = int(time.time() * 1000)
+    markets = [_market(95_000.0, now_ms - DAY_MS), _market(95_000.0, now_ms + 20 * DAY_MS)]
+    cache = {"markets": markets, "index": options_utils._build_option_index(markets)}
+
+    async def fake_cache():
+        return cache
+
+    monkeypatch.setattr(options_utils, "_get_market_cache", fake_cache)
+    assert asyncio.run(options_utils._find_nearest_option("BTC", "put", 100_000.0, 0.85, 0.99)) is None
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from scipy.special import ndtri
+
+from services.greeks import calculate_greeks_batch
+from services.monte_carlo import simulate_var_es
+from services.parametric_var import RiskModel, delta_gamma_var, position_var
+from services.portfolio_snapshot import RISK_FREE_RATE
+
+COV = np.array([[4e-4, 3e-4], [3e-4, 9e-4]])
+SPOTS = np.array([50_000.0, 3_000.0])
+PUT = {"index": np.array([0]), "is_call": np.array([False]), "strike": np.array([47_500.0]),
+       "expiry": np.array([20 / 365]), "sigma": np.array([0.6]), "size": np.array([1.0])}
+
+
+def test_without_options_it_is_delta_normal_var():
+    sizes = np.array([1.0, -5.0])
+    result = delta_gamma_var(SPOTS, sizes, COV, confidence=0.99)
+    cash = SPOTS * sizes
+    expected = -ndtri(0.01) * np.sqrt(cash @ COV @ cash)
+    assert result["var"] == pytest.approx(expected)
+    assert result["delta_normal_var"] == pytest.approx(expected)
+    assert result["mean"] == 0.0
+
+
+def test_delta_normal_var_scales_with_sqrt_horizon():
+    one = delta_gamma_var(SPOTS, [1.0, 2.0], COV, horizon_days=1)
+    ten = delta_gamma_var(SPOTS, [1.0, 2.0], COV, horizon_days=10)
+    assert ten["var"] == pytest.approx(one["var"] * np.sqrt(10))
+
+
+def test_moments_match_the_quadratic_pnl():
+    result = delta_gamma_var(SPOTS[:1], [0.0], COV[:1, :1], option_legs=PUT)
+
+    greeks = calculate_greeks_batch(False, SPOTS[0], 47_500.0, 20 / 365, RISK_FREE_RATE, 0.6)
+    d = SPOTS[0] * greeks["delta"]
+    g = SPOTS[0] ** 2 * greeks["gamma"]
+    s2 = COV[0, 0]
+    # P&L = d x + g x^2 / 2 for x ~ N(0, s2)
+    assert result["mean"] == pytest.approx(g * s2 / 2)
+    assert result["std"] == pytest.approx(np.sqrt(d ** 2 * s2 + g ** 2 * s2 ** 2 / 2))
+
+
+def test_long_gamma_shrinks_var_below_delta_normal():
+    result = delta_gamma_var(SPOTS, [1.0, 0.0], COV, option_legs=PUT)
+    assert result["var"] < result["delta_normal_var"]
+
+
+def test_short_gamma_raises_var_above_delta_normal():
+    short_put = dict(PUT, size=np.array([-1.0]))
+    result = delta_gamma_var(SPOTS, [1.0, 0.0], COV, option_legs=short_put)
+    assert result["var"] > result["delta_normal_var"]
+
+
+def test_delta_gamma_var_tracks_full_revaluation():
+    result = delta_gamma_var(SPOTS, [1.0, 0.0], COV, option_legs=PUT, confidence=0.99)
+    simulated = simulate_var_es(SPOTS, [1.0, 0.0], COV, option_legs=PUT, confidences=(0.99,), horizons=(1,),
+                                n_paths=200_000, seed=5)
+    assert result["var"] == pytest.approx(simulated["var"][0, 0], rel=0.1)
+
+
+def _model(option_legs=None):
+    return RiskModel(assets=("BTC", "ETH"), cov=COV, option_legs=option_legs, built_at=0.0)
+
+
+def test_position_var_without_puts_is_delta_normal():
+    var = position_var(_model(), "eth", 3_000.0, -4.0)
+    assert var == pytest.approx(-ndtri(0.01) * 12_000.0 * np.sqrt(COV[1, 1]))
+    assert position_var(_model(), "SOL", 100.0, 1.0) is None
+
+
+def test_position_var_applies_the_asset_own_puts():
+    legs = {key: np.concatenate([value, value]) for key, value in PUT.items()}
+    legs["index"] = np.array([0, 1])
+    legs["strike"] = np.array([47_500.0, 2_800.0])
+    model = _model(legs)
+
+    expected = delta_gamma_var(SPOTS[:1], [1.0], COV[:1, :1], PUT)["var"]
+    assert position_var(model, "BTC", SPOTS[0], 1.0) == pytest.approx(expected)
+    assert position_var(model, "BTC", SPOTS[0], 1.0) < position_var(_model(), "BTC", SPOTS[0], 1.0)
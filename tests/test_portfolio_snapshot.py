@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from services import portfolio_snapshot
+from services.greeks import calculate_option_price_batch
+from services.portfolio_snapshot import RISK_FREE_RATE, OptionLeg, PortfolioSnapshot, PositionSnapshot, _with_put_vols
+
+
+def _position(asset, spot, option=None):
+    return PositionSnapshot(asset=asset, size=1.0, spot=spot, timestamps=np.arange(3), closes=np.full(3, spot),
+                            option=option)
+
+
+def _put(spot, strike, expiry, sigma):
+    premium = float(calculate_option_price_batch(False, spot, strike, expiry, RISK_FREE_RATE, sigma))
+    return OptionLeg(symbol="PUT", strike=strike, expiry_years=expiry, premium_usd=premium)
+
+
+def test_put_vols_are_solved_once_at_build_time(monkeypatch):
+    positions = _with_put_vols([
+        _position("BTC", 50_000.0, _put(50_000.0, 47_500.0, 30 / 365, 0.6)),
+        _position("SOL", 150.0),
+        _position("ETH", 3_000.0, _put(3_000.0, 2_800.0, 14 / 365, 0.8)),
+    ])
+    snapshot = PortfolioSnapshot(taken_at=0.0, days=3, positions=positions)
+
+    def fail(*args):
+        raise AssertionError("option_legs must reuse the solved vols")
+
+    monkeypatch.setattr(portfolio_snapshot, "solve_put_vols", fail)
+    legs = snapshot.option_legs()
+    np.testing.assert_array_equal(legs["index"], [0, 2])
+    np.testing.assert_allclose(legs["sigma"], [0.6, 0.8], rtol=1e-6)
+
+    subset = snapshot.option_legs(snapshot.positions[1:])
+    np.testing.assert_array_equal(subset["index"], [1])
+    assert subset["sigma"][0] == pytest.approx(0.8, rel=1e-6)
+
+
+def test_unsolvable_premium_falls_back():
+    leg = OptionLeg(symbol="PUT", strike=47_500.0, expiry_years=30 / 365, premium_usd=0.0)
+    (position,) = _with_put_vols([_position("BTC", 50_000.0, leg)])
+    assert position.option.sigma == portfolio_snapshot.FALLBACK_SIGMA
+    assert PortfolioSnapshot(taken_at=0.0, days=3, positions=(_position("BTC", 1.0),)).option_legs() is None
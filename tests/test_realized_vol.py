@@ -0,0 +1,85 @@
+import math
+
+import numpy as np
+import pytest
+
+from services.realized_vol import StreamingVolatility
+
+HOUR_MS = 3_600_000
+
+
+def _candles(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    open_ = np.r_[100.0, close[:-1]] * np.exp(rng.normal(0, 0.002, n))
+    high = np.maximum(open_, close) * np.exp(np.abs(rng.normal(0, 0.005, n)))
+    low = np.minimum(open_, close) * np.exp(-np.abs(rng.normal(0, 0.005, n)))
+    return open_, high, low, close
+
+
+def _reference(open_, high, low, close, window):
+    """Batch estimators over the last `window` candles (each needing the close before it)."""
+    o, h, l, c = open_[-window:], high[-window:], low[-window:], close[-window:]
+    prev = close[-window - 1:-1]
+    n = window
+
+    cc = np.log(c / prev)
+    hl = np.log(h / l)
+    co = np.log(c / o)
+    ovn = np.log(o / prev)
+    rs = np.log(h / c) * np.log(h / o) + np.log(l / c) * np.log(l / o)
+
+    k = 0.34 / (1.34 + (n + 1) / (n - 1))
+    return {
+        "close_to_close": math.sqrt(np.var(cc, ddof=1)) * 100,
+        "parkinson": math.sqrt(np.sum(hl ** 2) / (4 * math.log(2) * n)) * 100,
+        "garman_klass": math.sqrt(np.mean(0.5 * hl ** 2 - (2 * math.log(2) - 1) * co ** 2)) * 100,
+        "yang_zhang": math.sqrt(np.var(ovn, ddof=1) + k * np.var(co, ddof=1) + (1 - k) * np.mean(rs)) * 100,
+    }
+
+
+@pytest.mark.parametrize("window", [2, 24, 100])
+def test_streaming_estimators_match_batch(window):
+    open_, high, low, close = _candles(600, seed=window)
+    tracker = StreamingVolatility(window)
+    for i in range(len(close)):
+        tracker.update(i * HOUR_MS, open_[i], high[i], low[i], close[i])
+
+        n = min(i, window)
+        if n < 2:
+            assert tracker.current()["close_to_close"] is None
+            continue
+        if i % 37 and i != len(close) - 1:
+            continue
+        current = tracker.current()
+        assert current["candles"] == n
+        expected = _reference(open_[:i + 1], high[:i + 1], low[:i + 1], close[:i + 1], n)
+        for name, value in expected.items():
+            assert current[name] == pytest.approx(value, rel=1e-9)
+
+
+def test_repeated_timestamp_replaces_the_open_candle():
+    open_, high, low, close = _candles(60, seed=5)
+    streamed, replaced = StreamingVolatility(24), StreamingVolatility(24)
+    for i in range(len(close)):
+        streamed.update(i * HOUR_MS, open_[i], high[i], low[i], close[i])
+        # Intermediate polls of a still-forming candle must leave no trace once it closes
+        replaced.update(i * HOUR_MS, open_[i], open_[i] * 1.05, open_[i] * 0.9, open_[i] * 1.01)
+        replaced.update(i * HOUR_MS, open_[i], high[i], low[i], close[i])
+
+    for name, value in streamed.current().items():
+        assert replaced.current()[name] == pytest.approx(value, rel=1e-12)
+
+
+def test_older_candles_are_ignored():
+    tracker = StreamingVolatility(5)
+    tracker.update(2 * HOUR_MS, 100, 101, 99, 100)
+    tracker.update(3 * HOUR_MS, 100, 102, 98, 101)
+    tracker.update(1 * HOUR_MS, 100, 200, 50, 150)
+    assert tracker.last_ts == 3 * HOUR_MS
+    assert len(tracker.terms) == 1
+
+
+def test_window_must_hold_two_candles():
+    with pytest.raises(ValueError):
+        StreamingVolatility(1)
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from db.candle_store import OHLCV_DTYPE
+from services.rebalance_sim import _align_closes, simulate_rebalance_policy
+
+
+def _replay_one(values, threshold, step, cost_bps):
+    """The auto-hedge rule for a single asset and grid cell, bar by bar."""
+    last = values[0]
+    rebalances, traded, residuals = 0, 0.0, []
+    for t in range(1, len(values)):
+        gap = abs(values[t] - last)
+        if t % step == 0 and gap / values[t] >= threshold:
+            rebalances += 1
+            traded += gap
+            last = values[t]
+            gap = 0.0
+        residuals.append(gap)
+    return rebalances, traded, traded * cost_bps / 1e4, np.mean(residuals), np.max(residuals)
+
+
+def test_grid_matches_bar_by_bar_replay():
+    rng = np.random.default_rng(4)
+    values = 1e4 * np.exp(np.cumsum(rng.normal(0, 0.003, (2, 500)), axis=1))
+    thresholds, steps, cost_bps = (0.002, 0.01, 0.05), (1, 5, 60), (6.0, 9.0)
+
+    result = simulate_rebalance_policy(values, thresholds, steps, cost_bps)
+    assert result["rebalances"].shape == (2, 3, 3)
+    for a in range(2):
+        for t, threshold in enumerate(thresholds):
+            for i, step in enumerate(steps):
+                rebalances, traded, cost, mean_res, max_res = _replay_one(values[a], threshold, step, cost_bps[a])
+                assert result["rebalances"][a, t, i] == rebalances
+                assert result["traded_notional"][a, t, i] == pytest.approx(traded)
+                assert result["transaction_cost"][a, t, i] == pytest.approx(cost)
+                assert result["mean_residual"][a, t, i] == pytest.approx(mean_res)
+                assert result["max_residual"][a, t, i] == pytest.approx(max_res)
+
+
+def test_tighter_policies_trade_more_and_leave_less_exposure():
+    rng = np.random.default_rng(9)
+    values = 1e4 * np.exp(np.cumsum(rng.normal(0, 0.003, (1, 2_000)), axis=1))
+    result = simulate_rebalance_policy(values, (0.001, 0.01, 0.05), (1,), (5.0,))
+    rebalances = result["rebalances"][0, :, 0]
+    residual = result["mean_residual"][0, :, 0]
+    assert np.all(np.diff(rebalances) <= 0)
+    assert np.all(np.diff(residual) >= 0)
+
+
+def test_hand_checked_path():
+    values = np.array([[100.0, 101.0, 103.0, 103.0, 100.0]])
+    result = simulate_rebalance_policy(values, (0.02,), (1, 2), (10.0,))
+    # Every bar: fires at 103 (gap 3) and 100 (gap 3); every other bar: fires at bars 2 and 4
+    assert list(result["rebalances"][0, 0]) == [2, 2]
+    assert result["traded_notional"][0, 0, 0] == pytest.approx(6.0)
+    assert result["transaction_cost"][0, 0, 0] == pytest.approx(6.0 * 10 / 1e4)
+    assert result["mean_residual"][0, 0, 0] == pytest.approx((1.0 + 0 + 0 + 0) / 4)
+    assert result["mean_residual_pct"][0, 0, 0] == pytest.approx(0.25 / values.mean() * 100)
+
+
+def test_align_closes_keeps_shared_timestamps():
+    a = np.zeros(4, dtype=OHLCV_DTYPE)
+    a["timestamp"], a["close"] = [1, 2, 3, 4], [10, 20, 30, 40]
+    b = np.zeros(3, dtype=OHLCV_DTYPE)
+    b["timestamp"], b["close"] = [2, 4, 5], [200, 400, 500]
+    timestamps, closes = _align_closes([a, b])
+    np.testing.assert_array_equal(timestamps, [2, 4])
+    np.testing.assert_array_equal(closes, [[20, 40], [200, 400]])
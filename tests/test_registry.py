@@ -0,0 +1,35 @@
+import asyncio
+
+from exchanges import registry
+
+
+class _SlowClient:
+    def __init__(self, delay):
+        self.delay = delay
+        self.loads = 0
+
+    async def load_markets(self):
+        self.loads += 1
+        await asyncio.sleep(self.delay)
+
+
+def test_market_load_outlives_a_caller_timeout(monkeypatch):
+    client = _SlowClient(0.2)
+    monkeypatch.setattr(registry, "get_exchange", lambda name, market_type: client)
+    monkeypatch.setattr(registry, "_markets_loaded", set())
+    monkeypatch.setattr(registry, "_market_loads", {})
+
+    async def scenario():
+        try:
+            await asyncio.wait_for(registry.get_loaded_exchange("okx", "spot"), 0.05)
+        except asyncio.TimeoutError:
+            pass
+        else:
+            raise AssertionError("load should not finish inside the timeout")
+        # The load keeps running after the caller gave up; the next caller joins it
+        assert await registry.get_loaded_exchange("okx", "spot") is client
+        assert await asyncio.wait_for(registry.get_loaded_exchange("okx", "spot"), 0.01) is client
+
+    asyncio.run(scenario())
+    assert client.loads == 1
+    assert registry._market_loads == {}
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from services.rolling_var import IndexableSkiplist, RollingHistoricalVar
+
+
+def test_skiplist_stays_sorted_under_inserts_and_removes():
+    rng = np.random.default_rng(3)
+    values = list(rng.normal(size=500))
+    skiplist = IndexableSkiplist(len(values))
+    for v in values:
+        skiplist.insert(v)
+    for v in values[::3]:
+        skiplist.remove(v)
+
+    expected = sorted(v for i, v in enumerate(values) if i % 3)
+    assert len(skiplist) == len(expected)
+    assert [skiplist[i] for i in range(len(skiplist))] == expected
+
+
+@pytest.mark.parametrize("window", [1, 2, 50, 720])
+def test_rolling_quantile_matches_percentile(window):
+    rng = np.random.default_rng(window)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 1_500)))
+    tracker = RollingHistoricalVar(window=window, confidence=0.99)
+
+    for i, close in enumerate(closes):
+        tracker.update(i * 3_600_000, float(close))
+        returns = closes[max(i - window, 0):i + 1]
+        returns = returns[1:] / returns[:-1] - 1
+        if not len(returns):
+            assert tracker.quantile() is None
+            continue
+        for q in (0.01, 0.05, 0.5, 0.99):
+            assert tracker.quantile(q) == pytest.approx(np.percentile(returns, q * 100), abs=1e-15)
+
+
+def test_rolling_quantile_replaces_repeated_candle():
+    rng = np.random.default_rng(11)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 300)))
+    tracker = RollingHistoricalVar(window=100, confidence=0.95)
+
+    for i, close in enumerate(closes):
+        # A still-forming candle is polled a few times before it closes
+        for partial in (close * 1.02, close * 0.97):
+            tracker.update(i * 3_600_000, float(partial))
+        tracker.update(i * 3_600_000, float(close))
+
+    returns = closes[-101:]
+    returns = returns[1:] / returns[:-1] - 1
+    assert tracker.quantile() == pytest.approx(np.percentile(returns, 5), abs=1e-15)
+    assert tracker.var(10_000.0) == pytest.approx(-np.percentile(returns, 5) * 10_000.0)
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from services.greeks import calculate_option_price_batch
+from services.portfolio_snapshot import RISK_FREE_RATE
+from services.stress import MIN_STRESSED_VOL, historical_replay, stress_grid
+
+SPOTS = np.array([50_000.0, 3_000.0])
+SIZES = np.array([1.0, 10.0])
+LEGS = {"index": np.array([0, 1]), "is_call": np.array([False, False]), "strike": np.array([45_000.0, 2_700.0]),
+        "expiry": np.array([30 / 365, 14 / 365]), "sigma": np.array([0.55, 0.7]), "size": np.array([1.0, 10.0])}
+
+
+def _leg_pnl(spot_shock, vol_shock, days):
+    """Scalar full revaluation of every leg, for comparison with the broadcast grid."""
+    total = 0.0
+    for j, i in enumerate(LEGS["index"]):
+        base = calculate_option_price_batch(
+            LEGS["is_call"][j], SPOTS[i], LEGS["strike"][j], LEGS["expiry"][j], RISK_FREE_RATE, LEGS["sigma"][j]
+        )
+        stressed = calculate_option_price_batch(
+            LEGS["is_call"][j], SPOTS[i] * (1 + spot_shock), LEGS["strike"][j],
+            max(LEGS["expiry"][j] - days / 365, 0.0), RISK_FREE_RATE,
+            max(LEGS["sigma"][j] + vol_shock, MIN_STRESSED_VOL),
+        )
+        total += float(stressed - base) * LEGS["size"][j]
+    return total
+
+
+def test_grid_matches_scalar_revaluation():
+    spot_shocks, vol_shocks, days = [-0.3, -0.1, 0.0, 0.2], [-0.2, 0.0, 0.3], [0, 7, 60]
+    grid = stress_grid(SPOTS, SIZES, LEGS, spot_shocks, vol_shocks, days)
+    assert grid["hedged_pnl"].shape == (4, 3, 3)
+
+    exposure = float(SPOTS @ SIZES)
+    for s, spot_shock in enumerate(spot_shocks):
+        assert grid["spot_pnl"][s] == pytest.approx(spot_shock * exposure)
+        for v, vol_shock in enumerate(vol_shocks):
+            for t, d in enumerate(days):
+                expected = spot_shock * exposure + _leg_pnl(spot_shock, vol_shock, d)
+                assert grid["hedged_pnl"][s, v, t] == pytest.approx(expected)
+
+
+def test_unshocked_cell_is_flat_and_puts_cushion_a_crash():
+    grid = stress_grid(SPOTS, SIZES, LEGS, [-0.4, 0.0], [0.0], [0])
+    assert grid["hedged_pnl"][1, 0, 0] == pytest.approx(0.0, abs=1e-6)
+    assert grid["hedged_pnl"][0, 0, 0] > grid["spot_pnl"][0]
+
+
+def test_expired_puts_are_worth_intrinsic():
+    grid = stress_grid(SPOTS[:1], SIZES[:1], {k: v[:1] for k, v in LEGS.items()}, [-0.3], [0.0], [365])
+    base = calculate_option_price_batch(False, SPOTS[0], 45_000.0, 30 / 365, RISK_FREE_RATE, 0.55)
+    intrinsic = 45_000.0 - SPOTS[0] * 0.7
+    assert grid["hedged_pnl"][0, 0, 0] == pytest.approx(-0.3 * SPOTS[0] + intrinsic - float(base))
+
+
+def test_grid_without_legs_has_no_hedged_pnl():
+    grid = stress_grid(SPOTS, SIZES, None, [-0.1, 0.1], [0.0], [0])
+    assert grid["hedged_pnl"] is None
+    np.testing.assert_allclose(grid["spot_pnl"], np.array([-0.1, 0.1]) * (SPOTS @ SIZES))
+
+
+def test_historical_replay_moves_each_asset_and_defaults_to_btc():
+    scenarios = {
+        "crash": {"spot": {"BTC": -0.5, "ETH": -0.6}, "vol": 0.4, "days": 1},
+        "btc_only": {"spot": {"BTC": -0.2}},
+    }
+    rows = historical_replay(["BTC", "ETH"], SPOTS, SIZES, LEGS, scenarios)
+    assert [r["name"] for r in rows] == ["crash", "btc_only"]
+    assert rows[0]["spot_pnl"] == pytest.approx(-0.5 * SPOTS[0] - 0.6 * SPOTS[1] * 10)
+    assert rows[1]["spot_pnl"] == pytest.approx(-0.2 * float(SPOTS @ SIZES))
+    assert rows[0]["hedged_pnl"] > rows[0]["spot_pnl"]
+
+    single = stress_grid(SPOTS, SIZES, LEGS, [-0.2], [0.0], [0])
+    assert rows[1]["hedged_pnl"] == pytest.approx(float(single["hedged_pnl"][0, 0, 0]))